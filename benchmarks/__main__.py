@@ -0,0 +1,125 @@
+import json
+from argparse import ArgumentParser
+from sys import exit, stderr
+from tempfile import TemporaryDirectory
+
+from benchmarks.suite import BENCHMARKS, IMAGE_SIZES, WATERMARK_SIZES, run, environment, compare
+
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.1
+
+
+def main() -> int:
+    argument_parser = ArgumentParser(
+        prog='python -m benchmarks',
+        description='Measures wall times of the shadowmark pipeline stages over a matrix of image and watermark sizes.'
+    )
+
+    argument_parser.add_argument(
+        '-s', '--sizes', nargs='+', type=str,
+        default=list(IMAGE_SIZES),
+        metavar='SIZE',
+        help=f'image sizes, either names ({", ".join(f"{name}={size}" for name, size in IMAGE_SIZES.items())}) or '
+             'in the form WxH. Defaults to all named sizes.'
+    )
+
+    argument_parser.add_argument(
+        '-w', '--watermarks', nargs='+', type=str,
+        default=WATERMARK_SIZES,
+        metavar='SIZE',
+        help=f'watermark sizes in the form WxH. Sizes that do not fit an image are skipped for that image. '
+             f'Defaults to {" ".join(WATERMARK_SIZES)}.'
+    )
+
+    argument_parser.add_argument(
+        '-b', '--benchmarks', nargs='+', type=str,
+        choices=BENCHMARKS,
+        metavar='NAME',
+        help=f'benchmarks to run, any of {", ".join(BENCHMARKS)}. Defaults to all of them.'
+    )
+
+    argument_parser.add_argument(
+        '-r', '--repeat', type=int,
+        default=DEFAULT_REPEAT,
+        help=f'number of timed runs of each case, following an untimed warm-up run. '
+             f'The best time counts. Defaults to {DEFAULT_REPEAT}.'
+    )
+
+    argument_parser.add_argument(
+        '-o', '--output', type=str,
+        metavar='PATH',
+        help='path to a JSON file the results are written to, e.g. to be used as a baseline later.'
+    )
+
+    argument_parser.add_argument(
+        '--baseline', type=str,
+        metavar='PATH',
+        help='path to a JSON file with results of a previous run. '
+             'Each case is compared with the same case of the baseline by the best time.'
+    )
+
+    argument_parser.add_argument(
+        '--threshold', type=float,
+        default=DEFAULT_THRESHOLD,
+        help='relative slowdown against the baseline considered a regression, '
+             f'e.g. 0.1 for 10 %%. The exit status is 1 if any case regressed. Defaults to {DEFAULT_THRESHOLD}.'
+    )
+
+    args = argument_parser.parse_args()
+
+    if args.repeat < 1:
+        argument_parser.error('--repeat must be positive')
+
+    baseline = None
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+
+    results = []
+
+    with TemporaryDirectory() as directory:
+        try:
+            for measurement in run(args.sizes, args.watermarks, directory, args.benchmarks, args.repeat):
+                print(
+                    f'{measurement.benchmark:<40} {measurement.image:>11} {measurement.watermark or "-":>9} '
+                    f'{measurement.best * 1000:12.3f} ms',
+                    file=stderr
+                )
+                results.append(measurement.to_json())
+
+        except ValueError as e:
+            argument_parser.error(str(e))
+
+    report = {'environment': environment(), 'repeat': args.repeat, 'results': results}
+    regressions = []
+
+    if baseline is not None:
+        comparisons = compare(results, baseline, args.threshold)
+        regressions = [comparison for comparison in comparisons if comparison.regression]
+        report['comparison'] = {
+            'threshold': args.threshold,
+            'regressions': len(regressions),
+            'cases': [comparison._asdict() for comparison in comparisons],
+        }
+
+        for comparison in regressions:
+            print(
+                f'Regression of {comparison.benchmark} ({comparison.image}, {comparison.watermark or "-"}): '
+                f'{comparison.baseline * 1000:.3f} ms -> {comparison.best * 1000:.3f} ms ({comparison.ratio:.2f}x)',
+                file=stderr
+            )
+
+        print(f'{len(regressions)} of {len(comparisons)} compared cases regressed', file=stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    exit(main())
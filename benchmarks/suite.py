@@ -0,0 +1,380 @@
+import os
+import platform
+import statistics
+from functools import cached_property
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+import numpy as np
+from PIL import Image
+
+from src.embedding.blind_dwt_dct_channel_embedder import BlindDwtDctChannelEmbedder
+from src.embedding.rgb_watermark_embedder import RGBWatermarkEmbedder
+from src.extraction.blind_dwt_dct_channel_extractor import BlindDwtDctChannelExtractor
+from src.extraction.rgb_watermark_extractor import RGBWatermarkExtractor
+from src.randomization.keyed_indices_selector import KeyedIndicesSelector
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+from src.transformation import bipolar, correlation, dct, dwt, zigzag
+from src.transformation.image import image_to_channels, channels_to_image
+
+IMAGE_SIZES = {
+    'vga': '640x480',
+    'hd': '1280x720',
+    'fhd': '1920x1080',
+    '12mp': '4000x3000',
+    '100mp': '11547x8660',
+}
+"""
+Named image sizes (width x height) of the benchmark matrix, from VGA to 100 megapixels.
+"""
+
+WATERMARK_SIZES = ['16x16', '32x32', '64x64', '128x128']
+"""
+Watermark sizes (width x height) of the benchmark matrix.
+"""
+
+_SEED = 1234567890
+_GAIN = 1.0
+
+# The images are the sample image resized to the benchmarked size, so they compress and transform like photographs
+_SAMPLE_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'blob', 'media', 'image.png')
+_SAMPLE_WATERMARK = os.path.join(os.path.dirname(_SAMPLE_IMAGE), 'watermark64x64.png')
+
+
+def parse_size(size: str) -> tuple[int, int]:
+    """
+    Parses a size given by a name from IMAGE_SIZES or in the form WxH.
+
+    :param size: The size, e.g. 'vga' or '640x480'.
+    :raises ValueError: If the size is neither a known name nor in the form WxH.
+    :return: A tuple (height, width).
+    """
+    try:
+        width, height = tuple([int(x) for x in IMAGE_SIZES.get(size, size).split('x', 1)])
+    except ValueError:
+        raise ValueError(f'Size {size} must be one of {", ".join(IMAGE_SIZES)} or in the form WxH') from None
+
+    return height, width
+
+
+def _format_size(shape: tuple[int, int]) -> str:
+    height, width = shape
+    return f'{width}x{height}'
+
+
+class _ImageFixture:
+    """
+    Inputs of the benchmarks of a single image size. Each input is prepared when it is first needed and by the stages
+    preceding it, so every stage is timed on the data it would get from the pipeline.
+    """
+
+    def __init__(self, shape: tuple[int, int], directory: str):
+        self.shape = shape
+        self.directory = directory
+
+    @cached_property
+    def path(self) -> str:
+        path = os.path.join(self.directory, f'image-{_format_size(self.shape)}.png')
+
+        with Image.open(_SAMPLE_IMAGE) as sample:
+            sample.convert('RGB').resize(self.shape[::-1]).save(path)
+
+        return path
+
+    @cached_property
+    def output_path(self) -> str:
+        return os.path.join(self.directory, f'output-{_format_size(self.shape)}.png')
+
+    @cached_property
+    def channels(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return image_to_channels(self.path)
+
+    @cached_property
+    def ll(self) -> np.ndarray:
+        return dwt.first_level_approximation(self.channels[0])
+
+    @cached_property
+    def coefficients(self) -> np.ndarray:
+        return zigzag.scan(self.ll)
+
+    @cached_property
+    def sub_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        return correlation.decompose(self.coefficients)
+
+    @cached_property
+    def sub_vector_dct(self) -> np.ndarray:
+        return dct.transform(self.sub_vectors[0])
+
+    @cached_property
+    def scratch_channel(self) -> np.ndarray:
+        return self.channels[0].astype(np.float64)
+
+    @property
+    def range_size(self) -> int:
+        return len(self.coefficients) // 2
+
+
+class _WatermarkFixture:
+    """
+    Inputs of the benchmarks of a single watermark size.
+    """
+
+    def __init__(self, shape: tuple[int, int]):
+        self.shape = shape
+
+    @cached_property
+    def channels(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with Image.open(_SAMPLE_WATERMARK) as sample:
+            r, g, b = sample.convert('RGB').resize(self.shape[::-1]).split()
+            return np.array(r), np.array(g), np.array(b)
+
+    @property
+    def size(self) -> int:
+        return self.shape[0] * self.shape[1]
+
+
+def _embedded_channels(image: _ImageFixture, watermark: _WatermarkFixture) -> tuple[np.ndarray, ...]:
+    embedder = RGBWatermarkEmbedder(BlindDwtDctChannelEmbedder(_GAIN, PermutationIndicesSelector(_SEED)))
+    return embedder.embed(image.channels, watermark.channels)
+
+
+def _round_trip(image: _ImageFixture, watermark: _WatermarkFixture) -> Callable[[], object]:
+    def round_trip():
+        embedded_channels = _embedded_channels(image, watermark)
+        extractor = RGBWatermarkExtractor(BlindDwtDctChannelExtractor(PermutationIndicesSelector(_SEED)))
+        return extractor.extract(embedded_channels, watermark.shape)
+
+    return round_trip
+
+
+def _rgb_extraction(image: _ImageFixture, watermark: _WatermarkFixture) -> Callable[[], object]:
+    embedded_channels = _embedded_channels(image, watermark)
+    extractor = RGBWatermarkExtractor(BlindDwtDctChannelExtractor(PermutationIndicesSelector(_SEED)))
+    return lambda: extractor.extract(embedded_channels, watermark.shape)
+
+
+def _transform_difference(image: _ImageFixture, watermark: _WatermarkFixture) -> Callable[[], object]:
+    locations = np.asarray(PermutationIndicesSelector(_SEED).indices(image.range_size, 8 * watermark.size))
+    return lambda: dct.transform_difference(*image.sub_vectors)[locations]
+
+
+# Each benchmark prepares its inputs and returns the function to time. Benchmarks of image stages take only the image
+# fixture and are run once per image size, the others are run for each watermark size as well.
+_IMAGE_BENCHMARKS: dict[str, Callable[[_ImageFixture], Callable[[], object]]] = {
+    'image.image_to_channels': lambda image: lambda: image_to_channels(image.path),
+    'dwt.first_level_approximation': lambda image: lambda: dwt.first_level_approximation(image.channels[0]),
+    'dwt.first_level': lambda image: lambda: dwt.first_level(image.channels[0]),
+    'dwt.add_approximation_delta': lambda image: lambda: dwt.add_approximation_delta(image.scratch_channel, image.ll),
+    'zigzag.scan': lambda image: lambda: zigzag.scan(image.ll),
+    'zigzag.inverse': lambda image: lambda: zigzag.inverse(image.coefficients, image.ll.shape),
+    'correlation.decompose': lambda image: lambda: correlation.decompose(image.coefficients),
+    'correlation.compose': lambda image: lambda: correlation.compose(*image.sub_vectors),
+    'dct.transform': lambda image: lambda: dct.transform(image.sub_vectors[0]),
+    'dct.inverse': lambda image: lambda: dct.inverse(image.sub_vector_dct),
+    'image.channels_to_image': lambda image: lambda: channels_to_image(image.output_path, image.channels),
+}
+
+_WATERMARK_BENCHMARKS: dict[str, Callable[[_ImageFixture, _WatermarkFixture], Callable[[], object]]] = {
+    'bipolar.bytes_to_bipolar_bits':
+        lambda image, watermark: lambda: bipolar.bytes_to_bipolar_bits(watermark.channels[0]),
+    'PermutationIndicesSelector.indices':
+        lambda image, watermark: lambda: PermutationIndicesSelector(_SEED).indices(
+            image.range_size, 8 * watermark.size
+        ),
+    'KeyedIndicesSelector.indices':
+        lambda image, watermark: lambda: KeyedIndicesSelector(_SEED).indices(image.range_size, 8 * watermark.size),
+    'dct.transform_difference': _transform_difference,
+    'BlindDwtDctChannelEmbedder.embed':
+        lambda image, watermark: lambda: BlindDwtDctChannelEmbedder(_GAIN, PermutationIndicesSelector(_SEED)).embed(
+            image.channels[0], watermark.channels[0].reshape(-1)
+        ),
+    'BlindDwtDctChannelExtractor.extract':
+        lambda image, watermark: lambda: BlindDwtDctChannelExtractor(PermutationIndicesSelector(_SEED)).extract(
+            image.channels[0], watermark.size
+        ),
+    'RGBWatermarkEmbedder.embed': lambda image, watermark: lambda: _embedded_channels(image, watermark),
+    'RGBWatermarkExtractor.extract': _rgb_extraction,
+    'round_trip': _round_trip,
+}
+
+BENCHMARKS = [*_IMAGE_BENCHMARKS, *_WATERMARK_BENCHMARKS]
+"""
+Names of all benchmarks in the order they are run for each image size.
+"""
+
+
+class Measurement(NamedTuple):
+    """
+    Wall times of a single benchmark case.
+    """
+
+    benchmark: str
+    """
+    The name of the benchmark, see BENCHMARKS.
+    """
+
+    image: str
+    """
+    The image size in the form WxH.
+    """
+
+    watermark: Optional[str]
+    """
+    The watermark size in the form WxH, or None for benchmarks of image stages.
+    """
+
+    times: list[float]
+    """
+    Wall times of the timed runs in seconds.
+    """
+
+    @property
+    def best(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    def to_json(self) -> dict:
+        return {
+            'benchmark': self.benchmark,
+            'image': self.image,
+            'watermark': self.watermark,
+            'best': self.best,
+            'median': self.median,
+            'times': self.times,
+        }
+
+
+def _measure(function: Callable[[], object], repeat: int) -> list[float]:
+    # The first run imports modules and fills caches, e.g. zigzag plans, so it is not timed
+    function()
+    times = []
+
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+
+    return times
+
+
+def run(
+        image_sizes: Iterable[str],
+        watermark_sizes: Iterable[str],
+        directory: str,
+        benchmarks: Optional[Iterable[str]] = None,
+        repeat: int = 3
+) -> Iterator[Measurement]:
+    """
+    Runs the benchmarks for each image size and, where a benchmark depends on the watermark, for each watermark size
+    that fits the image (at most 1/64 of the image size in pixels).
+
+    :param image_sizes: Image sizes, see parse_size.
+    :param watermark_sizes: Watermark sizes in the form WxH.
+    :param directory: A path to a directory for the image files read and written by the benchmarks.
+    :param benchmarks: Names of the benchmarks to run. If None, all benchmarks are run.
+    :param repeat: A number of timed runs of each benchmark case, following an untimed warm-up run.
+    :raises ValueError: If a size or a benchmark name is invalid.
+    :return: An iterator of measurements, yielded as soon as each case is measured.
+    """
+    selected = BENCHMARKS if benchmarks is None else list(benchmarks)
+
+    if unknown := [name for name in selected if name not in BENCHMARKS]:
+        raise ValueError(f'Unknown benchmarks {", ".join(unknown)}')
+
+    image_shapes = [parse_size(size) for size in image_sizes]
+    watermarks = [_WatermarkFixture(parse_size(size)) for size in watermark_sizes]
+
+    for image_shape in image_shapes:
+        # Inputs of the largest images take gigabytes, so they are released before the next size is prepared
+        image = _ImageFixture(image_shape, directory)
+
+        for name in selected:
+            if name in _IMAGE_BENCHMARKS:
+                times = _measure(_IMAGE_BENCHMARKS[name](image), repeat)
+                yield Measurement(name, _format_size(image_shape), None, times)
+                continue
+
+            for watermark in watermarks:
+                if watermark.size > image_shape[0] * image_shape[1] // 64:
+                    continue
+
+                times = _measure(_WATERMARK_BENCHMARKS[name](image, watermark), repeat)
+                yield Measurement(name, _format_size(image_shape), _format_size(watermark.shape), times)
+
+
+def environment() -> dict:
+    """
+    Describes the environment the benchmarks run in, so that results from different machines are not mixed up.
+
+    :return: A JSON serializable dictionary.
+    """
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': os.cpu_count(),
+        'backends': {
+            registry.stage: registry.selected
+            for registry in (dwt.BACKENDS, zigzag.BACKENDS, dct.BACKENDS, bipolar.BACKENDS)
+        },
+    }
+
+
+class Comparison(NamedTuple):
+    """
+    A comparison of a measurement with the baseline measurement of the same case.
+    """
+
+    benchmark: str
+    image: str
+    watermark: Optional[str]
+
+    baseline: float
+    """
+    The best time of the baseline in seconds.
+    """
+
+    best: float
+    """
+    The best time of the measurement in seconds.
+    """
+
+    ratio: float
+    """
+    The best time of the measurement relative to the baseline, e.g. 1.25 for a 25 % slowdown.
+    """
+
+    regression: bool
+    """
+    Whether the slowdown exceeds the threshold.
+    """
+
+
+def compare(results: Iterable[dict], baseline: Iterable[dict], threshold: float) -> list[Comparison]:
+    """
+    Compares results of benchmark cases with a baseline by their best times. Cases missing in either are skipped.
+
+    :param results: Measurements in the JSON form, see Measurement.to_json.
+    :param baseline: Baseline measurements in the JSON form, e.g. the results of the previous release.
+    :param threshold: A relative slowdown considered a regression, e.g. 0.1 for 10 %.
+    :return: A list of comparisons in the order of the results.
+    """
+    baseline_times = {
+        (record['benchmark'], record['image'], record['watermark']): record['best'] for record in baseline
+    }
+    comparisons = []
+
+    for record in results:
+        key = (record['benchmark'], record['image'], record['watermark'])
+
+        if key not in baseline_times:
+            continue
+
+        ratio = record['best'] / baseline_times[key] if baseline_times[key] > 0 else float('inf')
+        comparisons.append(Comparison(*key, baseline_times[key], record['best'], ratio, ratio > 1 + threshold))
+
+    return comparisons
@@ -1,18 +1,35 @@
+import json
 from argparse import ArgumentParser, ArgumentTypeError
-from sys import stderr
+from concurrent.futures import ThreadPoolExecutor
+from os.path import splitext
+from sys import argv, exit, stderr
+from time import perf_counter
+from typing import Optional
 
-from src.embedding.blind_dwt_dct_channel_embedder import BlindDwtDctChannelEmbedder
-from src.embedding.rgb_watermark_embedder import RGBWatermarkEmbedder
-from src.exceptions import WatermarkSizeError, ImageChannelError
-from src.extraction.blind_dwt_dct_channel_extractor import BlindDwtDctChannelExtractor
-from src.extraction.rgb_watermark_extractor import RGBWatermarkExtractor
-from src.randomization.permutation_indices_selector import PermutationIndicesSelector
-from src.transformation.image import image_to_channels, channels_to_image
+# Only modules that do not import NumPy, SciPy, PyWavelets or Pillow are imported here, so that help and validation of
+# arguments are fast. The embedding and extraction modules are imported by the functions running them.
+from src.batch import walk_inputs, output_paths, shard, file_digest, process_batch, Journal, \
+    EmbeddingTask, ExtractionTask, ScanTask, MANIFEST_EXTENSION, DEFAULT_MAX_BIT_ERROR_RATE
+from src.detection import DEFAULT_AGREEMENT, DEFAULT_FALSE_POSITIVE_RATE, DEFAULT_FALSE_NEGATIVE_RATE
+from src.exceptions import WatermarkSizeError, ImageChannelError, ServerError, HeaderError
+from src.randomization.selection import create_indices_selector, SelectionMode, KEYED_SELECTION, SELECTIONS
+from src.transformation.precision import Precision
 
 DEFAULT_SEED = 1234567890
 DEFAULT_GAIN = 1.0
 DEFAULT_WATERMARK_SHAPE = '32x32'
 DEFAULT_CHANNELS = 'rgb'
+DEFAULT_SELECTION = SelectionMode.COMPATIBLE.value
+DEFAULT_THREADS = 1
+DEFAULT_PRECISION = Precision.FLOAT64.value
+BATCH_COMMAND = 'batch'
+SERVE_COMMAND = 'serve'
+CLIENT_COMMAND = 'client'
+DETECT_COMMAND = 'detect'
+SCAN_COMMAND = 'scan'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_SERVER = f'http://{DEFAULT_HOST}:{DEFAULT_PORT}'
 
 
 def _parse_shape(arg: str):
@@ -25,10 +42,379 @@ def _parse_shape(arg: str):
     return height, width
 
 
-def main():
+def _autotune(args, shape: tuple[int, ...]):
+    if args.autotune is not None:
+        from src.transformation.tuning import tuned_backends
+
+        tuned_backends(shape, args.autotune or None)
+
+
+def _run_stacked(args):
+    from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+    from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+    from src.transformation.image import image_to_array, array_to_image, open_image_array
+
+    input_image = open_image_array(args.image)
+    indices_selector = create_indices_selector(args.seed, args.selection)
+    _autotune(args, input_image.shape)
+
+    if args.embed:
+        embedder = BlindDwtDctStackedEmbedder(
+            args.gain, indices_selector, args.channels, args.precision, args.header
+        )
+        watermark = image_to_array(args.embed)
+
+        try:
+            array_to_image(args.output, embedder.embed(input_image, watermark))
+
+        except (ImageChannelError, WatermarkSizeError) as e:
+            print(e, file=stderr)
+
+    else:
+        extractor = BlindDwtDctStackedExtractor(
+            indices_selector, args.channels, precision=args.precision, header=args.header
+        )
+
+        try:
+            array_to_image(args.output, extractor.extract(input_image, args.extract))
+
+        except (ImageChannelError, WatermarkSizeError, HeaderError) as e:
+            print(e, file=stderr)
+
+
+def _run_tiled(args, executor):
+    from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+    from src.embedding.tiled_watermark_embedder import TiledWatermarkEmbedder
+    from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+    from src.extraction.tiled_watermark_extractor import TiledWatermarkExtractor
+    from src.transformation.image import image_to_array, array_to_image, open_image_array, create_image_array, \
+        save_image_array, discard_image_array
+
+    input_image = open_image_array(args.image)
+    indices_selector = create_indices_selector(args.seed, args.selection)
+    _autotune(args, tuple(min(args.tile, size) for size in input_image.shape[0:2]) + input_image.shape[2:])
+
+    if args.embed:
+        embedder = TiledWatermarkEmbedder(
+            BlindDwtDctStackedEmbedder(args.gain, indices_selector, args.channels, args.precision), args.tile, executor
+        )
+        watermark = image_to_array(args.embed)
+
+        output_image = create_image_array(args.output, input_image.shape)
+
+        try:
+            save_image_array(args.output, embedder.embed(input_image, watermark, output_image))
+
+        except (ImageChannelError, WatermarkSizeError) as e:
+            discard_image_array(args.output, output_image)
+            print(e, file=stderr)
+
+    else:
+        extractor = TiledWatermarkExtractor(
+            BlindDwtDctStackedExtractor(indices_selector, args.channels, precision=args.precision), args.tile, executor
+        )
+
+        try:
+            array_to_image(args.output, extractor.extract(input_image, args.extract))
+
+        except (ImageChannelError, WatermarkSizeError) as e:
+            print(e, file=stderr)
+
+
+def _run_concurrent(args, executor):
+    from src.embedding.blind_dwt_dct_channel_embedder import BlindDwtDctChannelEmbedder
+    from src.embedding.rgb_watermark_embedder import RGBWatermarkEmbedder
+    from src.extraction.blind_dwt_dct_channel_extractor import BlindDwtDctChannelExtractor
+    from src.extraction.rgb_watermark_extractor import RGBWatermarkExtractor
+    from src.transformation.image import image_to_channels, channels_to_image
+
+    input_image_channels = image_to_channels(args.image)
+    indices_selector = create_indices_selector(args.seed, args.selection)
+    _autotune(args, input_image_channels[0].shape)
+
+    if args.embed:
+        embedder = RGBWatermarkEmbedder(
+            BlindDwtDctChannelEmbedder(args.gain, indices_selector, args.precision, args.header), args.channels,
+            executor
+        )
+        watermark_channels = image_to_channels(args.embed)
+
+        try:
+            embedded_channels = embedder.embed(input_image_channels, watermark_channels)
+            channels_to_image(args.output, embedded_channels)
+
+        except (ImageChannelError, WatermarkSizeError) as e:
+            print(e, file=stderr)
+
+    else:
+        extractor = RGBWatermarkExtractor(
+            BlindDwtDctChannelExtractor(indices_selector, precision=args.precision, header=args.header), args.channels,
+            executor
+        )
+
+        try:
+            extracted_watermark_channels = extractor.extract(input_image_channels, args.extract)
+            channels_to_image(args.output, extracted_watermark_channels)
+
+        except (ImageChannelError, WatermarkSizeError, HeaderError) as e:
+            print(e, file=stderr)
+
+
+def _analysis_output(output: str, seed: int, watermark_shape: tuple[int, int]) -> str:
+    root, extension = splitext(output)
+    height, width = watermark_shape
+    return f'{root}-{seed}-{width}x{height}{extension}'
+
+
+def _run_analysis(args):
+    from src.extraction.coefficient_analysis import CoefficientAnalysis
+    from src.transformation.image import array_to_image, open_image_array
+
+    input_image = open_image_array(args.image)
+    _autotune(args, input_image.shape)
+
+    try:
+        analysis = CoefficientAnalysis(input_image, args.channels, precision=args.precision, header=args.header)
+
+        # The header does not depend on the seed, so it is read once for all seeds
+        shapes = [analysis.read_header()] if args.header else args.shapes
+
+    except (ImageChannelError, HeaderError) as e:
+        print(e, file=stderr)
+        return
+
+    # The image is transformed only once, each pair of a seed and a shape then costs only a selection of indices
+    for seed in args.seeds:
+        for watermark_shape in shapes:
+            indices_selector = create_indices_selector(seed, args.selection)
+
+            try:
+                watermark = analysis.extract(indices_selector, watermark_shape)
+                array_to_image(_analysis_output(args.output, seed, watermark_shape), watermark)
+
+            except WatermarkSizeError as e:
+                print(e, file=stderr)
+
+
+def _run(args):
+    if not args.embed and len(args.seeds) * len(args.shapes) > 1:
+        _run_analysis(args)
+    elif args.threads > 1:
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            if args.tile is not None:
+                _run_tiled(args, executor)
+            else:
+                _run_concurrent(args, executor)
+    elif args.tile is not None:
+        _run_tiled(args, None)
+    else:
+        # All selected channels are transformed at once, which is faster than one after another in a single thread
+        _run_stacked(args)
+
+
+def _parse_shard(arg: str):
+    try:
+        index, count = tuple([int(x) for x in arg.split('/', 1)])
+    except ValueError:
+        raise ArgumentTypeError("Value must be provided in the form i/N, where i is shard number and N is shard count")
+
+    if not 1 <= index <= count:
+        raise ArgumentTypeError("Shard number must be in the range from 1 to the shard count")
+
+    # Shards are numbered from 1 on the command line, but from 0 in the implementation
+    return index - 1, count
+
+
+def _batch_parameters(args, watermark_shape: tuple[int, int], watermark_path: Optional[str]) -> dict:
+    height, width = watermark_shape
+    parameters = {
+        'operation': 'embed' if watermark_path else 'extract',
+        'seed': args.seed,
+        'channels': ''.join(channel for channel in 'rgb' if channel in args.channels),
+        'shape': f'{width}x{height}',
+        'selection': args.selection,
+        'precision': args.precision,
+    }
+
+    if watermark_path:
+        parameters['gain'] = args.gain
+        parameters['watermark'] = file_digest(watermark_path)
+
+    return parameters
+
+
+def _run_batch(args) -> int:
+    # All paths are needed to map the outputs below their common directory
+    all_input_paths = list(walk_inputs(args.input))
+
+    if not all_input_paths:
+        print(f'No input images found in {args.input}', file=stderr)
+        return 1
+
+    # Outputs are mapped before sharding, so that all shards share the same output directory structure
+    all_output_paths = dict(zip(all_input_paths, output_paths(all_input_paths, args.output)))
+    input_paths = shard(all_input_paths, *args.shard) if args.shard else all_input_paths
+
+    indices_selector = create_indices_selector(args.seed, args.selection)
+
+    if args.embed:
+        from src.transformation.image import image_to_array
+
+        # The watermark is decoded once here and handed over to each worker process once
+        watermark = image_to_array(args.embed)
+        task = EmbeddingTask(args.gain, indices_selector, watermark, args.channels, args.precision)
+        watermark_shape = watermark.shape[0:2]
+    else:
+        task = ExtractionTask(indices_selector, args.extract, args.channels, args.precision)
+        watermark_shape = args.extract
+
+    journal = Journal(args.journal, _batch_parameters(args, watermark_shape, args.embed)) if args.journal else None
+    completed = journal.completed() if journal else None
+
+    jobs = ((input_path, all_output_paths[input_path]) for input_path in input_paths)
+    failed = 0
+    skipped = 0
+    start = perf_counter()
+
+    try:
+        for result in process_batch(task, jobs, args.processes, completed):
+            if result.error is not None:
+                failed += 1
+                print(f'{result.input_path}: {result.error}', file=stderr)
+            elif result.skipped:
+                skipped += 1
+            elif journal:
+                journal.record(result.input_path, result.digest)
+    finally:
+        if journal:
+            journal.close()
+
+    elapsed = perf_counter() - start
+    processed = len(input_paths) - skipped
+    print(
+        f'Processed {processed} images ({failed} failed, {skipped} skipped as completed) in {elapsed:.2f} s, '
+        f'{processed / elapsed:.2f} images/s'
+    )
+
+    return failed
+
+
+def _batch(batch_args: list[str]):
     argument_parser = ArgumentParser(
-        prog='shadowmark',
-        description='Embeds/extracts watermark to/from image using blind DWR-DCT approach.'
+        prog=f'shadowmark {BATCH_COMMAND}',
+        description='Embeds/extracts watermark to/from many images using a pool of worker processes. '
+                    'Failures of individual images are reported without aborting the batch. '
+                    'Exits with status 1 if any image failed.'
+    )
+
+    argument_parser.add_argument(
+        '-i', '--input', required=True, type=str,
+        metavar='SOURCE',
+        help='input images for watermark embedding/extraction. '
+             'Value is a directory (all its files and files of its subdirectories are processed), '
+             f'a manifest file with the \'{MANIFEST_EXTENSION}\' extension listing one image path per line, '
+             'or a quoted glob pattern like \'images/**/*.png\'.'
+    )
+
+    argument_parser.add_argument(
+        '-o', '--output', required=True, type=str,
+        metavar='DIR',
+        help='directory where the output images will be stored under the same names as the input images. '
+             'Subdirectories of the input images are preserved below their closest common directory. '
+             'If the -e or --embed option is used, the outputs are images with embedded watermark. '
+             'If the -x or --extract option is used, the outputs are images of the extracted watermarks.'
+    )
+
+    _add_common_arguments(argument_parser)
+
+    argument_parser.add_argument(
+        '-p', '--processes', required=False, type=int,
+        metavar='N',
+        help='number of worker processes. Defaults to the number of CPUs.'
+    )
+
+    argument_parser.add_argument(
+        '--shard', required=False, type=_parse_shard,
+        metavar='i/N',
+        help='processes only the i-th of N disjoint shards of the input images, e.g. 1/4, 2/4, 3/4 and 4/4. '
+             'Images are assigned to shards by their paths, so each shard gets the same images on every run '
+             'and on every machine, provided the input paths are the same.'
+    )
+
+    argument_parser.add_argument(
+        '--journal', required=False, type=str,
+        metavar='PATH',
+        help='path to an append-only journal of completed images. '
+             'Completed images are recorded together with a hash of their content and the parameters of the batch '
+             '(seed, gain, channels, watermark shape etc.). '
+             'A rerun with the same journal and parameters skips images that were completed and not modified since. '
+             'Each concurrently running shard should use its own journal.'
+    )
+
+    args = argument_parser.parse_args(batch_args)
+
+    if args.processes is not None and args.processes < 1:
+        argument_parser.error('--processes must be positive')
+
+    if _run_batch(args):
+        exit(1)
+
+
+def _serve(serve_args: list[str]):
+    argument_parser = ArgumentParser(
+        prog=f'shadowmark {SERVE_COMMAND}',
+        description='Runs a server embedding/extracting watermark to/from images sent by '
+                    f'\'shadowmark {CLIENT_COMMAND}\'. '
+                    'The server imports all modules and caches decoded watermarks and selected coefficients once, '
+                    'so small images are processed much faster than by separate runs of shadowmark.'
+    )
+
+    argument_parser.add_argument(
+        '--host', required=False, type=str,
+        default=DEFAULT_HOST,
+        help='host name or address to listen on. '
+             'The server has no authentication, so it should listen on a local address only. '
+             f'Defaults to {DEFAULT_HOST}.'
+    )
+
+    argument_parser.add_argument(
+        '--port', required=False, type=int,
+        default=DEFAULT_PORT,
+        help=f'port to listen on. Defaults to {DEFAULT_PORT}.'
+    )
+
+    argument_parser.add_argument(
+        '-w', '--workers', required=False, type=int,
+        metavar='N',
+        help='number of requests served concurrently. Defaults to a number derived from the number of CPUs.'
+    )
+
+    args = argument_parser.parse_args(serve_args)
+
+    if args.workers is not None and args.workers < 1:
+        argument_parser.error('--workers must be positive')
+
+    from src.server import WatermarkServer
+
+    with WatermarkServer((args.host, args.port), args.workers) as server:
+        print(f'Serving on http://{args.host}:{server.server_port}', file=stderr)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def _client(client_args: list[str]):
+    argument_parser = ArgumentParser(
+        prog=f'shadowmark {CLIENT_COMMAND}',
+        description=f'Embeds/extracts watermark to/from image by a server started by \'shadowmark {SERVE_COMMAND}\'.'
+    )
+
+    argument_parser.add_argument(
+        '--server', required=False, type=str,
+        default=DEFAULT_SERVER, metavar='URL',
+        help=f'URL of the server. Defaults to {DEFAULT_SERVER}.'
     )
 
     argument_parser.add_argument(
@@ -40,11 +426,253 @@ def main():
     argument_parser.add_argument(
         '-o', '--output', required=True, type=str,
         metavar='PATH',
-        help='path where the output image will be stored. '
+        help='path where the output image will be stored. Its format is given by the file extension. '
              'If the -e or --embed option is used, the output is image with embedded watermark. '
              'If the -x or --extract option is used, the output is image of the extracted watermark.'
     )
 
+    _add_common_arguments(argument_parser)
+
+    args = argument_parser.parse_args(client_args)
+
+    from urllib.error import URLError
+    from src.client import WatermarkClient
+
+    client = WatermarkClient(args.server)
+    parameters = {
+        'seed': args.seed,
+        'channels': args.channels,
+        'selection': args.selection,
+        'precision': args.precision,
+        'format': splitext(args.output)[1],
+    }
+
+    with open(args.image, 'rb') as input_file:
+        image = input_file.read()
+
+    try:
+        if args.embed:
+            with open(args.embed, 'rb') as watermark_file:
+                output = client.embed(image, watermark_file.read(), {**parameters, 'gain': args.gain})
+        else:
+            height, width = args.extract
+            output = client.extract(image, {**parameters, 'shape': f'{width}x{height}'})
+
+    except ServerError as e:
+        print(e, file=stderr)
+        return
+
+    except URLError as e:
+        print(f'Cannot connect to {args.server}: {e.reason}', file=stderr)
+        return
+
+    with open(args.output, 'wb') as output_file:
+        output_file.write(output)
+
+
+def _detect(detect_args: list[str]):
+    argument_parser = ArgumentParser(
+        prog=f'shadowmark {DETECT_COMMAND}',
+        description='Detects whether an image carries a known watermark. '
+                    'Bits are compared with the watermark one by one until a sequential test establishes presence or '
+                    'absence of the watermark, which usually takes only a fraction of the bits. '
+                    'Prints the result as JSON with the decision, the fraction of agreeing bits (score), a p-value '
+                    'and the number of bits read. '
+                    'Exits with status 0 if the watermark is present, 1 if it is not and 2 on errors.'
+    )
+
+    argument_parser.add_argument(
+        '-i', '--image', required=True, type=str,
+        metavar='PATH',
+        help='path to the image to be checked'
+    )
+
+    argument_parser.add_argument(
+        '-w', '--watermark', required=True, type=str,
+        metavar='PATH',
+        help='path to the watermark image expected in the image'
+    )
+
+    _add_selection_arguments(argument_parser)
+
+    argument_parser.add_argument(
+        '--header', required=False, action='store_true',
+        help='expects the watermark to be embedded with a header, see \'shadowmark --help\'.'
+    )
+
+    argument_parser.add_argument(
+        '--agreement', required=False, type=float,
+        default=DEFAULT_AGREEMENT,
+        help='fraction of bits of a watermarked image expected to agree with the watermark. '
+             'Lower values detect watermarks damaged by attacks, but need more bits. '
+             f'Must be between 0.5 and 1. Defaults to {DEFAULT_AGREEMENT}.'
+    )
+
+    argument_parser.add_argument(
+        '--false-positive-rate', required=False, type=float,
+        default=DEFAULT_FALSE_POSITIVE_RATE, metavar='RATE',
+        help='tolerated probability of detecting the watermark in an image without it. '
+             f'Defaults to {DEFAULT_FALSE_POSITIVE_RATE}.'
+    )
+
+    argument_parser.add_argument(
+        '--false-negative-rate', required=False, type=float,
+        default=DEFAULT_FALSE_NEGATIVE_RATE, metavar='RATE',
+        help='tolerated probability of missing the watermark in an image carrying it with the expected agreement. '
+             f'Defaults to {DEFAULT_FALSE_NEGATIVE_RATE}.'
+    )
+
+    args = argument_parser.parse_args(detect_args)
+
+    from src.extraction.watermark_detector import WatermarkDetector
+    from src.transformation.image import image_to_array, open_image_array
+
+    try:
+        detector = WatermarkDetector(
+            create_indices_selector(args.seed, args.selection), args.channels, args.agreement,
+            args.false_positive_rate, args.false_negative_rate, args.precision, args.header
+        )
+
+    except ValueError as e:
+        argument_parser.error(str(e))
+
+    try:
+        detection = detector.detect(open_image_array(args.image), image_to_array(args.watermark))
+
+    except (ImageChannelError, WatermarkSizeError) as e:
+        print(e, file=stderr)
+        exit(2)
+
+    print(json.dumps(detection._asdict()))
+    exit(0 if detection.present else 1)
+
+
+def _scan_record(result) -> dict:
+    if result.error is not None:
+        return {'path': result.input_path, 'error': result.error}
+
+    return {
+        'path': result.input_path,
+        'ber': result.value.bit_error_rates,
+        'match': result.value.match,
+        'timing': {'decode': result.value.decoding_time, 'extract': result.value.extraction_time},
+    }
+
+
+def _run_scan(args, task: ScanTask) -> int:
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    scanned = 0
+    matched = 0
+    failed = 0
+    start = perf_counter()
+
+    try:
+        for result in process_batch(task, ((path, None) for path in walk_inputs(args.input)), args.processes):
+            scanned += 1
+            failed += result.error is not None
+            matched += result.error is None and result.value.match
+
+            # Records are flushed one by one, so that they can be consumed while the scan is running
+            print(json.dumps(_scan_record(result)), file=output, flush=True)
+    finally:
+        if output:
+            output.close()
+
+    elapsed = perf_counter() - start
+    print(
+        f'Scanned {scanned} images ({matched} matched, {failed} failed) in {elapsed:.2f} s, '
+        f'{scanned / elapsed:.2f} images/s',
+        file=stderr
+    )
+
+    return failed
+
+
+def _scan(scan_args: list[str]):
+    argument_parser = ArgumentParser(
+        prog=f'shadowmark {SCAN_COMMAND}',
+        description='Scans many images for a known watermark using a pool of worker processes. '
+                    'The watermark is extracted from each image and compared with the reference watermark. '
+                    'One JSON record per image is written as soon as the image is scanned, with its path, '
+                    'the bit error rate of each channel, whether it matches the reference watermark and the time of '
+                    'decoding and extraction, or an error message. '
+                    'Inputs are walked lazily and only a few images per worker are pending at any time, so the memory '
+                    'needed does not grow with the number of images. '
+                    'Exits with status 1 if any image failed.'
+    )
+
+    argument_parser.add_argument(
+        '-i', '--input', required=True, type=str,
+        metavar='SOURCE',
+        help='images to be scanned. '
+             'Value is a directory (all its files and files of its subdirectories are scanned), '
+             f'a manifest file with the \'{MANIFEST_EXTENSION}\' extension listing one image path per line, '
+             'or a quoted glob pattern like \'images/**/*.png\'.'
+    )
+
+    argument_parser.add_argument(
+        '-w', '--watermark', required=True, type=str,
+        metavar='PATH',
+        help='path to the reference watermark image. Its shape is the expected shape of the embedded watermark.'
+    )
+
+    argument_parser.add_argument(
+        '-o', '--output', required=False, type=str,
+        metavar='PATH',
+        help='path to the JSON Lines file the records are written to. Defaults to the standard output.'
+    )
+
+    _add_selection_arguments(argument_parser)
+
+    argument_parser.add_argument(
+        '--header', required=False, action='store_true',
+        help='expects the watermark to be embedded with a header, see \'shadowmark --help\'.'
+    )
+
+    argument_parser.add_argument(
+        '--max-bit-error-rate', required=False, type=float,
+        default=DEFAULT_MAX_BIT_ERROR_RATE, metavar='RATE',
+        help='largest mean bit error rate of the selected channels of an image matching the reference watermark. '
+             'Attacks like JPEG compression flip some bits, while images without the watermark yield about 0.5. '
+             f'Must be in the range [0, 0.5). Defaults to {DEFAULT_MAX_BIT_ERROR_RATE}.'
+    )
+
+    argument_parser.add_argument(
+        '-p', '--processes', required=False, type=int,
+        metavar='N',
+        help='number of worker processes. Defaults to the number of CPUs.'
+    )
+
+    args = argument_parser.parse_args(scan_args)
+
+    if args.processes is not None and args.processes < 1:
+        argument_parser.error('--processes must be positive')
+
+    from src.transformation.image import image_to_array
+
+    try:
+        # The watermark is decoded once here and handed over to each worker process once
+        task = ScanTask(
+            create_indices_selector(args.seed, args.selection), image_to_array(args.watermark), args.channels,
+            args.max_bit_error_rate, args.precision, args.header
+        )
+
+    except ValueError as e:
+        argument_parser.error(str(e))
+
+    if _run_scan(args, task):
+        exit(1)
+
+
+_COMMANDS = {
+    BATCH_COMMAND: _batch, SERVE_COMMAND: _serve, CLIENT_COMMAND: _client, DETECT_COMMAND: _detect, SCAN_COMMAND: _scan
+}
+
+
+def _add_common_arguments(argument_parser: ArgumentParser, multiple: bool = False):
+    # Several seeds and shapes are accepted by single runs only, which extract all their pairs from a single analysis
+    multiple_shapes_help = 'Several shapes may be given, see --seed. ' if multiple else ''
+
     argument_parser.add_argument(
         '-e', '--embed', required=False, type=str,
         metavar='PATH',
@@ -53,22 +681,14 @@ def main():
 
     argument_parser.add_argument(
         '-x', '--extract', required=False, type=_parse_shape,
-        default=DEFAULT_WATERMARK_SHAPE, metavar="WxH",
+        nargs='+' if multiple else None,
+        default=[_parse_shape(DEFAULT_WATERMARK_SHAPE)] if multiple else DEFAULT_WATERMARK_SHAPE, metavar="WxH",
         help='extracts watermark from the input image. '
              'Value is expected shape of the embedded watermark in the form WxH, where W is width and H is height. '
+             f'{multiple_shapes_help}'
              f'The default is {DEFAULT_WATERMARK_SHAPE}.'
     )
 
-    argument_parser.add_argument(
-        '-s', '--seed', required=False, type=int,
-        default=DEFAULT_SEED,
-        help='integer seed for the pseudorandom number generator (PRNG). '
-             'Using the same seed value for embedding and extraction is essential for successful watermark detection. '
-             'The seed may be used as a secret key to protect the watermark from tampering, '
-             'but bear in mind that it is not strong cryptographic safeguard. '
-             f'If not set, the default seed {DEFAULT_SEED} is applied.'
-    )
-
     argument_parser.add_argument(
         '-g', '--gain', required=False, type=float,
         default=DEFAULT_GAIN,
@@ -79,6 +699,28 @@ def main():
              f'Defaults to {DEFAULT_GAIN}.'
     )
 
+    _add_selection_arguments(argument_parser, multiple)
+
+
+def _add_selection_arguments(argument_parser: ArgumentParser, multiple: bool = False):
+    multiple_seeds_help = (
+        'Several seeds may be given for extraction. Then a watermark is extracted for each pair of a seed and a shape '
+        '(see --extract) from a single analysis of the input image and stored in the output path extended by the seed '
+        'and the shape, e.g. extracted-1234-32x32.png. '
+    ) if multiple else ''
+
+    argument_parser.add_argument(
+        '-s', '--seed', required=False, type=int,
+        nargs='+' if multiple else None,
+        default=[DEFAULT_SEED] if multiple else DEFAULT_SEED,
+        help='integer seed for the pseudorandom number generator (PRNG). '
+             'Using the same seed value for embedding and extraction is essential for successful watermark detection. '
+             'The seed may be used as a secret key to protect the watermark from tampering, '
+             'but bear in mind that it is not strong cryptographic safeguard. '
+             f'{multiple_seeds_help}'
+             f'If not set, the default seed {DEFAULT_SEED} is applied.'
+    )
+
     argument_parser.add_argument(
         '-c', '--channels', required=False, type=lambda s: s.lower(),
         default=DEFAULT_CHANNELS,
@@ -89,30 +731,137 @@ def main():
              f'Default is {DEFAULT_CHANNELS}.'
     )
 
+    argument_parser.add_argument(
+        '--selection', required=False, choices=SELECTIONS,
+        default=DEFAULT_SELECTION,
+        help='strategy of spreading the watermark across the image. '
+             '\'compatible\' selects the same coefficients as previous versions, so it is required for extraction of '
+             'watermarks embedded by them. '
+             '\'sparse\' is faster and needs less memory on large images, but is not compatible with the former. '
+             '\'keyed\' is as fast as \'sparse\' and selects coefficients of each channel independently of other '
+             'channels, so any subset of embedded channels can be extracted. '
+             'Using the same selection for embedding and extraction is essential for successful watermark detection. '
+             f'Defaults to {DEFAULT_SELECTION}.'
+    )
+
+    argument_parser.add_argument(
+        '--precision', required=False, choices=[precision.value for precision in Precision],
+        default=DEFAULT_PRECISION,
+        help='floating-point precision of the transformations. '
+             '\'float32\' halves the memory needed for large images, but may rarely flip bits of weak embeddings. '
+             f'Defaults to {DEFAULT_PRECISION}.'
+    )
+
+
+def main():
+    if len(argv) > 1 and argv[1] in _COMMANDS:
+        _COMMANDS[argv[1]](argv[2:])
+        return
+
+    argument_parser = ArgumentParser(
+        prog='shadowmark',
+        description='Embeds/extracts watermark to/from image using blind DWR-DCT approach.',
+        epilog=f'Run \'shadowmark {BATCH_COMMAND} --help\' to embed/extract watermark to/from many images at once. '
+               f'Run \'shadowmark {SERVE_COMMAND} --help\' and \'shadowmark {CLIENT_COMMAND} --help\' to embed/extract '
+               'watermark by a long-running server. '
+               f'Run \'shadowmark {DETECT_COMMAND} --help\' to detect whether an image carries a known watermark. '
+               f'Run \'shadowmark {SCAN_COMMAND} --help\' to scan many images for a known watermark.'
+    )
+
+    argument_parser.add_argument(
+        '-i', '--image', required=True, type=str,
+        metavar='PATH',
+        help='path to input image for watermark embedding/extraction'
+    )
+
+    argument_parser.add_argument(
+        '-o', '--output', required=True, type=str,
+        metavar='PATH',
+        help='path where the output image will be stored. '
+             'If the -e or --embed option is used, the output is image with embedded watermark. '
+             'If the -x or --extract option is used, the output is image of the extracted watermark.'
+    )
+
+    _add_common_arguments(argument_parser, multiple=True)
+
+    argument_parser.add_argument(
+        '-t', '--threads', required=False, type=int,
+        default=DEFAULT_THREADS,
+        help='number of threads used to process the selected channels (or tiles, see --tile) concurrently. '
+             f'Values greater than 1 require --selection {KEYED_SELECTION}, '
+             'because other selections depend on the order in which channels are processed. '
+             f'Defaults to {DEFAULT_THREADS}.'
+    )
+
+    argument_parser.add_argument(
+        '--tile', required=False, type=int,
+        metavar='SIZE',
+        help='processes the input image in tiles of at least SIZE x SIZE pixels, each carrying the whole watermark, '
+             'so that the memory needed does not grow with the image size. '
+             'Extraction combines the watermarks of all tiles. '
+             'Input and output images in the NumPy format (.npy) are memory-mapped, so even images that do not fit '
+             'into memory can be processed. '
+             'Using the same tile size for embedding and extraction is essential for successful watermark detection.'
+    )
+
+    argument_parser.add_argument(
+        '--header', required=False, action='store_true',
+        help='embeds a header with the watermark shape next to the watermark, or reads the shape from the header '
+             'for extraction instead of the -x or --extract option. '
+             'Watermarks embedded with a header can be extracted only with this option and vice versa. '
+             'The header takes up a few hundred coefficients of each channel, so it slightly lowers the largest '
+             'watermark that fits the image.'
+    )
+
+    argument_parser.add_argument(
+        '--autotune', required=False, type=str, nargs='?', const='',
+        metavar='PATH',
+        help='selects the fastest implementations of the DWT, DCT, zigzag and bit conversion for the shape of the '
+             'input image (or tile). They are timed once per shape and the choice is stored in the JSON file PATH, '
+             'which defaults to shadowmark/backends.json in the user cache directory. '
+             'All implementations yield the same output up to floating-point rounding.'
+    )
+
+    argument_parser.add_argument(
+        '--profile', required=False, type=str,
+        metavar='PATH',
+        help='writes a JSON report of the wall time and allocated memory of each stage (image decoding, DWT, zigzag, '
+             'DCT, selection of indices, modulation, inverse transforms and image encoding) to PATH. '
+             'Tracing the memory slows down the run slightly.'
+    )
+
     args = argument_parser.parse_args()
-    input_image_channels = image_to_channels(args.image)
-    indices_selector = PermutationIndicesSelector(args.seed)
 
-    if args.embed:
-        embedder = RGBWatermarkEmbedder(BlindDwtDctChannelEmbedder(args.gain, indices_selector), args.channels)
-        watermark_channels = image_to_channels(args.embed)
+    if args.threads > 1 and args.selection != KEYED_SELECTION:
+        argument_parser.error(f'--threads greater than 1 requires --selection {KEYED_SELECTION}')
 
-        try:
-            embedded_channels = embedder.embed(input_image_channels, watermark_channels)
-            channels_to_image(args.output, embedded_channels)
+    if args.tile is not None and args.tile < 1:
+        argument_parser.error('--tile must be positive')
 
-        except (ImageChannelError, WatermarkSizeError) as e:
-            print(e, file=stderr)
+    if args.embed and len(args.seed) > 1:
+        argument_parser.error('--embed accepts a single --seed')
 
-    elif args.extract:
-        extractor = RGBWatermarkExtractor(BlindDwtDctChannelExtractor(indices_selector), args.channels)
+    if args.tile is not None and len(args.seed) * len(args.extract) > 1:
+        argument_parser.error('--tile accepts a single --seed and a single --extract shape')
 
-        try:
-            extracted_watermark_channels = extractor.extract(input_image_channels, args.extract)
-            channels_to_image(args.output, extracted_watermark_channels)
+    if args.tile is not None and args.header:
+        argument_parser.error('--header is not supported with --tile')
 
-        except (ImageChannelError, WatermarkSizeError) as e:
-            print(e, file=stderr)
+    # A single seed and shape are processed as before, several ones share a single analysis of the input image. The
+    # shape is read from the header instead, if there is one.
+    args.seeds, args.shapes = args.seed, [None] if args.header else args.extract
+    args.seed, args.extract = args.seeds[0], args.shapes[0]
+
+    if args.profile:
+        from src.profiling import Profiler
+
+        with Profiler() as profiler:
+            _run(args)
+
+        with open(args.profile, 'w', encoding='utf-8') as file:
+            json.dump({'arguments': vars(args), **profiler.report()}, file, indent=2, default=str)
+    else:
+        _run(args)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,466 @@
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
+from copy import deepcopy
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Callable, Collection, Iterable, Iterator, NamedTuple, Optional
+
+from src.indices import IndicesSelector
+from src.transformation.precision import Precision
+
+# The batch is set up by the command line tool, so the embedding and extraction modules are imported by the tasks,
+# i.e. by the worker processes only
+if TYPE_CHECKING:
+    import numpy as np
+
+MANIFEST_EXTENSION = '.txt'
+
+DEFAULT_MAX_BIT_ERROR_RATE = 0.35
+
+# Number of files submitted to the pool per worker process in advance, so that workers never wait for the next file
+# while the memory of pending submissions stays bounded even for huge inputs
+_PENDING_PER_PROCESS = 4
+
+_DIGEST_CHUNK_SIZE = 1 << 20
+
+
+def walk_inputs(source: str) -> Iterator[str]:
+    """
+    Lazily iterates over paths of input images in a directory tree, a glob pattern or a manifest file. The paths are
+    never held in memory at once, so the source may list any number of images.
+
+    :param source: One of:
+    - A path to a directory. All regular files in the directory and its subdirectories, except hidden ones, are
+      iterated. Entries of each directory are sorted, files come before subdirectories and symbolic links to
+      directories are not followed.
+    - A path to a manifest file with the '.txt' extension, listing one image path per line. Empty lines and lines
+      starting with '#' are skipped.
+    - A glob pattern, e.g. 'images/**/*.png'. Recursive '**' patterns are supported.
+    :return: An iterator of paths of the input images.
+    """
+    if os.path.isdir(source):
+        directories = [source]
+
+        while directories:
+            with os.scandir(directories.pop()) as entries:
+                entries = sorted((entry for entry in entries if not entry.name.startswith('.')), key=lambda e: e.name)
+
+            yield from (entry.path for entry in entries if entry.is_file())
+            # Subdirectories are pushed in reverse, so that they are walked in the sorted order
+            directories.extend(entry.path for entry in reversed(entries) if entry.is_dir(follow_symlinks=False))
+
+    elif os.path.isfile(source) and source.lower().endswith(MANIFEST_EXTENSION):
+        with open(source, encoding='utf-8') as manifest:
+            yield from (line.strip() for line in manifest if line.strip() and not line.lstrip().startswith('#'))
+
+    else:
+        yield from (path for path in glob.iglob(source, recursive=True) if os.path.isfile(path))
+
+
+def output_paths(input_paths: list[str], output_dir: str) -> list[str]:
+    """
+    Maps paths of input images to paths in the output directory. The directory structure below the closest common
+    directory of all inputs is preserved, so that equally named images from different directories do not collide.
+
+    :param input_paths: Paths of the input images.
+    :param output_dir: A path to the output directory.
+    :return: A list of output paths in the order of the input paths.
+    """
+    if not input_paths:
+        return []
+
+    absolute_paths = [os.path.abspath(path) for path in input_paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in absolute_paths])
+
+    return [os.path.join(output_dir, os.path.relpath(path, root)) for path in absolute_paths]
+
+
+def shard(input_paths: list[str], index: int, count: int) -> list[str]:
+    """
+    Selects a deterministic slice of input paths. Paths are assigned to shards by a hash of the path, so the
+    assignment of a path does not change when other paths are added to or removed from the input set.
+
+    :param input_paths: Paths of the input images.
+    :param index: A zero-based index of the selected shard.
+    :param count: A total number of shards.
+    :raises ValueError: If the index is not in the range [0, count).
+    :return: A list of paths assigned to the selected shard, in the order of the input paths.
+    """
+    if not 0 <= index < count:
+        raise ValueError('Shard index must be in the range [0, count)')
+
+    return [
+        path for path in input_paths
+        if int.from_bytes(hashlib.blake2b(path.encode('utf-8'), digest_size=8).digest(), 'big') % count == index
+    ]
+
+
+def file_digest(path: str) -> str:
+    """
+    Computes the SHA-256 digest of the file content.
+
+    :param path: A path to the file.
+    :return: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        while chunk := file.read(_DIGEST_CHUNK_SIZE):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class Journal:
+    """
+    An append-only journal of completed inputs of a batch, stored as one JSON record per line.
+
+    Each record holds the input path, the digest of its content and the parameters of the batch. A rerun with the same
+    parameters skips inputs that are recorded with the same content, while modified inputs are processed again. Records
+    are flushed one by one, so an interrupted batch loses at most the record being written.
+    """
+
+    def __init__(self, path: str, parameters: dict):
+        """
+        Creates a new instance.
+
+        :param path: A path to the journal file. It is created if it does not exist.
+        :param parameters: JSON serializable parameters of the batch, e.g. seed, gain, channels and watermark shape.
+        Only records with equal parameters count as completed.
+        """
+        self._path = path
+        self._parameters = parameters
+        self._file = None
+
+    def completed(self) -> set[tuple[str, str]]:
+        """
+        Reads inputs completed with the parameters of this journal.
+
+        :return: A set of pairs of the input path and the digest of its content.
+        """
+        if not os.path.exists(self._path):
+            return set()
+
+        completed = set()
+
+        with open(self._path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last record of an interrupted batch may be incomplete
+                    continue
+
+                if record.get('parameters') == self._parameters:
+                    completed.add((record['input'], record['sha256']))
+
+        return completed
+
+    def record(self, input_path: str, digest: str):
+        """
+        Appends a record of a completed input to the journal.
+
+        :param input_path: A path to the completed input.
+        :param digest: The digest of the input content, see file_digest.
+        """
+        if self._file is None:
+            self._file = open(self._path, 'a', encoding='utf-8')
+
+            # Terminate an incomplete last record of an interrupted batch, so that it does not corrupt the next one
+            if self._file.tell() > 0:
+                with open(self._path, 'rb') as file:
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b'\n':
+                        self._file.write('\n')
+
+        record = {'input': input_path, 'sha256': digest, 'parameters': self._parameters}
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class BatchResult(NamedTuple):
+    """
+    A result of processing a single input of a batch.
+    """
+
+    input_path: str
+    """
+    The path of the input.
+    """
+
+    error: Optional[str] = None
+    """
+    An error message if the processing failed, otherwise None.
+    """
+
+    digest: Optional[str] = None
+    """
+    The digest of the input content if it was computed, see process_batch.
+    """
+
+    skipped: bool = False
+    """
+    Whether the input was skipped as already completed.
+    """
+
+    value: Any = None
+    """
+    The value returned by the task, e.g. a ScanResult of ScanTask.
+    """
+
+
+class EmbeddingTask:
+    """
+    A picklable task embedding a watermark into a single image file and saving the result to another file.
+
+    The watermark is decoded once by the caller and carried by the task, so it is transferred to each worker process
+    only once.
+    """
+
+    def __init__(
+            self,
+            gain: float,
+            selector: IndicesSelector,
+            watermark: 'np.ndarray',
+            channels: str = 'rgb',
+            precision: Precision = Precision.FLOAT64
+    ):
+        """
+        Creates a new instance.
+
+        :param gain: A float value specifying how strong the embedding would be.
+        :param selector: An unused instance of IndicesSelector. Each image is embedded by a copy of it, so stateful
+        selectors yield the same indices for every image, as if each image was embedded by a separate run.
+        :param watermark: A 3D numpy array of shape (height, width, 3) containing RGB watermark values in range
+        0 - 255.
+        :param channels: A string specifying which image channels should be used for watermark embedding.
+        :param precision: A floating-point precision of the transformations.
+        """
+        if watermark is None:
+            raise TypeError('watermark is required')
+
+        self._gain = gain
+        self._selector = selector
+        self._watermark = watermark
+        self._channels = channels
+        self._precision = precision
+
+    def __call__(self, input_path: str, output_path: str):
+        from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+        from src.transformation.image import open_image_array, array_to_image
+
+        embedder = BlindDwtDctStackedEmbedder(self._gain, deepcopy(self._selector), self._channels, self._precision)
+        array_to_image(output_path, embedder.embed(open_image_array(input_path), self._watermark))
+
+
+class ExtractionTask:
+    """
+    A picklable task extracting a watermark from a single image file and saving it to another file.
+    """
+
+    def __init__(
+            self,
+            selector: IndicesSelector,
+            watermark_shape: tuple[int, int],
+            channels: str = 'rgb',
+            precision: Precision = Precision.FLOAT64
+    ):
+        """
+        Creates a new instance.
+
+        :param selector: An unused instance of IndicesSelector. Each image is extracted by a copy of it, see
+        EmbeddingTask.
+        :param watermark_shape: The expected shape of the watermark.
+        :param channels: A string specifying which image channels should be used for watermark extraction.
+        :param precision: A floating-point precision of the transformations.
+        """
+        self._selector = selector
+        self._watermark_shape = watermark_shape
+        self._channels = channels
+        self._precision = precision
+
+    def __call__(self, input_path: str, output_path: str):
+        from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+        from src.transformation.image import open_image_array, array_to_image
+
+        extractor = BlindDwtDctStackedExtractor(deepcopy(self._selector), self._channels, precision=self._precision)
+        array_to_image(output_path, extractor.extract(open_image_array(input_path), self._watermark_shape))
+
+
+class ScanResult(NamedTuple):
+    """
+    A result of comparing a watermark extracted from a single image with a reference watermark, see ScanTask.
+    """
+
+    bit_error_rates: dict[str, float]
+    """
+    The fraction of bits of the extracted watermark differing from the reference watermark for each selected channel,
+    e.g. {'r': 0.0, 'g': 0.01, 'b': 0.0}. Images without the watermark yield about 0.5.
+    """
+
+    match: bool
+    """
+    Whether the mean bit error rate of the selected channels is at most the maximal bit error rate of the task.
+    """
+
+    decoding_time: float
+    """
+    The wall time of reading and decoding the image in seconds.
+    """
+
+    extraction_time: float
+    """
+    The wall time of extracting and comparing the watermark in seconds.
+    """
+
+
+class ScanTask:
+    """
+    A picklable task extracting a watermark from a single image file and comparing it with a reference watermark.
+    Nothing is written, the task returns a ScanResult instead.
+    """
+
+    def __init__(
+            self,
+            selector: IndicesSelector,
+            watermark: 'np.ndarray',
+            channels: str = 'rgb',
+            max_bit_error_rate: float = DEFAULT_MAX_BIT_ERROR_RATE,
+            precision: Precision = Precision.FLOAT64,
+            header: bool = False
+    ):
+        """
+        Creates a new instance.
+
+        :param selector: An unused instance of IndicesSelector. Each image is extracted by a copy of it, see
+        EmbeddingTask.
+        :param watermark: A 3D numpy array of shape (height, width, 3) containing RGB values of the reference watermark
+        in range 0 - 255. Its shape is the expected shape of the embedded watermark.
+        :param channels: A string specifying which image channels should be used for watermark extraction.
+        :param max_bit_error_rate: The largest mean bit error rate of an image carrying the watermark. Attacks like JPEG
+        compression flip some bits, while images without the watermark yield about 0.5. Must be in the range
+        [0, 0.5). Defaults to DEFAULT_MAX_BIT_ERROR_RATE.
+        :param precision: A floating-point precision of the transformations.
+        :param header: Whether the watermark was embedded with a header, see BlindDwtDctStackedEmbedder.
+        """
+        if watermark is None:
+            raise TypeError('watermark is required')
+
+        if not 0 <= max_bit_error_rate < 0.5:
+            raise ValueError('max_bit_error_rate must be in the range [0, 0.5)')
+
+        self._selector = selector
+        self._watermark = watermark
+        self._channels = channels
+        self._max_bit_error_rate = max_bit_error_rate
+        self._precision = precision
+        self._header = header
+
+    def __call__(self, input_path: str, _output_path: Optional[str] = None) -> ScanResult:
+        import numpy as np
+        from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+        from src.transformation.image import open_image_array
+
+        start = perf_counter()
+        image = open_image_array(input_path)
+        decoded = perf_counter()
+
+        extractor = BlindDwtDctStackedExtractor(
+            deepcopy(self._selector), self._channels, precision=self._precision, header=self._header
+        )
+        extracted = extractor.extract(image, self._watermark.shape[0:2])
+        bit_error_rates = {
+            channel_id: float(np.unpackbits(extracted[..., i] ^ self._watermark[..., i]).mean())
+            for i, channel_id in enumerate('rgb') if channel_id in self._channels
+        }
+        mean_bit_error_rate = sum(bit_error_rates.values()) / len(bit_error_rates) if bit_error_rates else 1.0
+        match = mean_bit_error_rate <= self._max_bit_error_rate
+
+        return ScanResult(bit_error_rates, match, decoded - start, perf_counter() - decoded)
+
+
+_worker_task: Optional[Callable[[str, Optional[str]], Any]] = None
+_worker_completed: Optional[Collection[tuple[str, str]]] = None
+
+
+def _initialize_worker(task: Callable[[str, Optional[str]], Any], completed: Optional[Collection[tuple[str, str]]]):
+    global _worker_task, _worker_completed
+    _worker_task = task
+    _worker_completed = completed
+
+
+def _process(input_path: str, output_path: Optional[str]) -> BatchResult:
+    digest = None
+
+    try:
+        if _worker_completed is not None:
+            digest = file_digest(input_path)
+
+            if (input_path, digest) in _worker_completed:
+                return BatchResult(input_path, digest=digest, skipped=True)
+
+        if output_path is not None:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+        value = _worker_task(input_path, output_path)
+
+    # A broken file must not abort the whole batch, so every failure is reported as a result instead
+    except Exception as e:
+        return BatchResult(input_path, f'{type(e).__name__}: {e}', digest)
+
+    return BatchResult(input_path, digest=digest, value=value)
+
+
+def process_batch(
+        task: Callable[[str, Optional[str]], Any],
+        jobs: Iterable[tuple[str, Optional[str]]],
+        processes: Optional[int] = None,
+        completed: Optional[Collection[tuple[str, str]]] = None
+) -> Iterator[BatchResult]:
+    """
+    Runs a task for each pair of input and output paths on a pool of worker processes.
+
+    The task is sent to each worker once, when the worker starts. Only a bounded number of jobs is submitted in
+    advance, so the jobs may be a lazy iterable of any length.
+
+    :param task: A picklable callable taking an input and an output path, e.g. EmbeddingTask or ExtractionTask. Its
+    return value is reported in the result.
+    :param jobs: Pairs of input and output paths. Missing directories of output paths are created. Output paths may be
+    None for tasks that write nothing, e.g. ScanTask.
+    :param processes: A number of worker processes. If None, the number of CPUs is used.
+    :param completed: Optional pairs of input paths and digests of their content that are already completed, e.g.
+    read by Journal.completed. If given, the content of every input is hashed by the workers, matching inputs are
+    skipped, and the digests are reported in the results.
+    :return: An iterator of results in the order of completion.
+    """
+    # Importing process pools imports multiprocessing, which is not needed until a batch is run
+    from concurrent.futures import ProcessPoolExecutor
+
+    processes = processes or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(processes, initializer=_initialize_worker, initargs=(task, completed)) as executor:
+        pending = set()
+
+        for input_path, output_path in jobs:
+            if len(pending) >= processes * _PENDING_PER_PROCESS:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+
+            pending.add(executor.submit(_process, input_path, output_path))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
@@ -0,0 +1,56 @@
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from src.exceptions import ServerError
+
+# The client imports the standard library only, so it starts fast. The server imports the paths from here.
+EMBED_PATH = '/embed'
+EXTRACT_PATH = '/extract'
+
+
+class WatermarkClient:
+    """
+    A client embedding/extracting watermarks to/from images by a running WatermarkServer.
+    """
+
+    def __init__(self, server_url: str):
+        """
+        Creates a new instance.
+
+        :param server_url: A base URL of the server, e.g. 'http://127.0.0.1:8765'.
+        """
+        self._server_url = server_url.rstrip('/')
+
+    def embed(self, image: bytes, watermark: bytes, parameters: dict) -> bytes:
+        """
+        Embeds a watermark into an image.
+
+        :param image: The content of the input image file.
+        :param watermark: The content of the watermark image file.
+        :param parameters: The seed, gain, channels, selection, precision and format of the output image.
+        :raises ServerError: If the server rejected the request.
+        :return: The content of the image file with embedded watermark.
+        """
+        return self._post(EMBED_PATH, {**parameters, 'watermark_length': len(watermark)}, watermark + image)
+
+    def extract(self, image: bytes, parameters: dict) -> bytes:
+        """
+        Extracts a watermark from an image.
+
+        :param image: The content of the input image file.
+        :param parameters: The seed, channels, selection, precision, shape (WxH) and format of the output image.
+        :raises ServerError: If the server rejected the request.
+        :return: The content of the image file of the extracted watermark.
+        """
+        return self._post(EXTRACT_PATH, parameters, image)
+
+    def _post(self, path: str, parameters: dict, body: bytes) -> bytes:
+        request = Request(f'{self._server_url}{path}?{urlencode(parameters)}', body, method='POST')
+
+        try:
+            with urlopen(request) as response:
+                return response.read()
+
+        except HTTPError as e:
+            raise ServerError(e.read().decode(errors='replace') or e.reason)
@@ -0,0 +1,6 @@
+# Defaults of the sequential test of WatermarkDetector (see src.extraction.watermark_detector). They are kept apart
+# from the detector, so that the command line tool shows them in its help without importing NumPy.
+
+DEFAULT_AGREEMENT = 0.6
+DEFAULT_FALSE_POSITIVE_RATE = 1e-6
+DEFAULT_FALSE_NEGATIVE_RATE = 1e-3
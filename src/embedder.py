@@ -4,12 +4,13 @@ from abc import ABC, abstractmethod
 class ChannelEmbedder(ABC):
 
     @abstractmethod
-    def embed(self, channel, watermark_data):
+    def embed(self, channel, watermark_data, channel_id=None):
         """
         Embeds watermark data to an image channel.
 
         :param channel: An image channel.
         :param watermark_data: A watermark data for embedding.
+        :param channel_id: An optional identifier of the image channel, e.g. 'r', 'g' or 'b'.
         :return: An image channel with embedded watermark data.
         """
         pass
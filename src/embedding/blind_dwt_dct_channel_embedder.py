@@ -1,11 +1,16 @@
+from typing import Optional
+
 import numpy as np
 
 from src.embedder import ChannelEmbedder
 from src.exceptions import WatermarkSizeError, ImageChannelError
+from src.header import select_indices, prepend_header
 from src.indices import IndicesSelector
+from src.profiling import span
 from src.transformation import correlation
 from src.transformation import dct, zigzag, dwt
-from src.transformation.bipolar import vector_to_bipolar_bits
+from src.transformation.bipolar import bytes_to_bipolar_bits
+from src.transformation.precision import Precision
 
 
 class BlindDwtDctChannelEmbedder(ChannelEmbedder):
@@ -13,12 +18,23 @@ class BlindDwtDctChannelEmbedder(ChannelEmbedder):
     A class for embedding watermark data into a single channel of an input image.
     """
 
-    def __init__(self, gain: float, selector: IndicesSelector):
+    def __init__(
+            self,
+            gain: float,
+            selector: IndicesSelector,
+            precision: Precision = Precision.FLOAT64,
+            header: bool = False
+    ):
         """
         Creates a new instance.
 
         :param gain: A float value specifying how strong the embedding would be.
         :param selector: An instance of IndicesSelector that is used to spread watermark data across the channel data.
+        :param precision: A floating-point precision of the transformations and of the output. Defaults to
+        Precision.FLOAT64.
+        :param header: Whether to embed a header with the watermark shape (see src.header), so that the shape need
+        not be known for extraction. The watermark bits are then spread after the header, so such watermarks are
+        extracted only by extractors expecting the header. Defaults to False.
         """
         if gain is None:
             raise TypeError('gain is required')
@@ -28,57 +44,93 @@ class BlindDwtDctChannelEmbedder(ChannelEmbedder):
 
         self._gain = gain
         self._selector = selector
+        self._dtype = Precision(precision).dtype
+        self._header = header
 
-    def embed(self, channel: np.ndarray, watermark_values: list[int]) -> np.ndarray:
+    def embed(
+            self, channel: np.ndarray, watermark_values: np.ndarray | bytes, channel_id: Optional[str] = None
+    ) -> np.ndarray:
         """
         Embeds watermark data using the blind DWT-DCT approach.
 
         :param channel: A 2D numpy array representing image channel and containing pixel values in range 0 - 255.
-        :param watermark_values: A list of watermark values in range 0 - 255 that will be embedded to the channel.
+        :param watermark_values: A numpy array (or bytes) of watermark values in range 0 - 255 that will be embedded to
+        the channel. If a header is embedded, it carries the shape of a 2D array, or (1, length) otherwise.
+        :param channel_id: An optional identifier of the channel passed to the indices selector.
         :return: A 2D numpy array representing image channel with embedded watermark.
         """
         if channel is None or channel.size < 1:
             raise ImageChannelError('Empty input image channel provided for embedding')
 
-        if watermark_values is None or len(watermark_values) < 1:
+        if isinstance(watermark_values, (bytes, bytearray, memoryview)):
+            watermark_size = len(watermark_values)
+        else:
+            watermark_size = 0 if watermark_values is None else np.size(watermark_values)
+
+        if watermark_size < 1:
             raise ImageChannelError('Empty watermark provided for embedding')
 
-        if len(watermark_values) > int(channel.size / 64):
+        if watermark_size > int(channel.size / 64):
             raise WatermarkSizeError(
                 'The watermark is too large.'
                 'Its total size should be at most 1/64 of the total size of the input image in pixels.'
             )
 
-        ll, hl, lh, hh = dwt.first_level(channel)
-
-        approximation_coefficients = zigzag.scan(ll)
-
-        sub_vector_x1, sub_vector_x2 = correlation.decompose(approximation_coefficients)
-
-        x1_dct = dct.transform(sub_vector_x1)
-        x2_dct = dct.transform(sub_vector_x2)
-
-        embedded_x1_dct = x1_dct.copy()
-        embedded_x2_dct = x2_dct.copy()
-
-        watermark_bits = vector_to_bipolar_bits(watermark_values)
-
-        embedding_indices = self._selector.indices(int(len(approximation_coefficients) / 2), len(watermark_bits))
-
-        for i, bit in enumerate(watermark_bits):
-            j = embedding_indices[i]
-            embedded_x1_dct[j] = ((x1_dct[j] + x2_dct[j]) / 2) + (self._gain * bit)
-            embedded_x2_dct[j] = ((x1_dct[j] + x2_dct[j]) / 2) - (self._gain * bit)
-
-        embedded_sub_vector_x1 = dct.inverse(embedded_x1_dct)
-        embedded_sub_vector_x2 = dct.inverse(embedded_x2_dct)
-
-        embedded_approximation_coefficients = correlation.compose(embedded_sub_vector_x1, embedded_sub_vector_x2)
-
-        ll_embedded = zigzag.inverse(embedded_approximation_coefficients, ll.shape)
-
-        channel_embedded = dwt.first_level_inverse(ll_embedded, hl, lh, hh)
-
-        # Inverse dwt pads channel to be of even size, so we slice it to the original size
-        height, width = channel.shape
-        return channel_embedded[:height, :width]
+        with span('embed'):
+            dwt.prepare()
+            dct.prepare()
+
+            # Embedding changes only the approximation, so the detail coefficients are never computed
+            with span('dwt'):
+                ll = dwt.first_level_approximation(channel, dtype=self._dtype)
+
+            with span('zigzag'):
+                approximation_coefficients = zigzag.scan(ll)
+                sub_vector_x1, sub_vector_x2 = correlation.decompose(approximation_coefficients)
+
+            # Both DCT vectors are freshly allocated by the transform, so they are modulated in place
+            with span('dct'):
+                x1_dct = dct.transform(sub_vector_x1)
+                x2_dct = dct.transform(sub_vector_x2)
+
+            with span('bits'):
+                watermark_bits = bytes_to_bipolar_bits(watermark_values)
+
+            with span('selection'):
+                embedding_indices = select_indices(
+                    self._selector, int(len(approximation_coefficients) / 2), len(watermark_bits), channel_id,
+                    self._header
+                )
+
+            # The header precedes the watermark at the first coefficients, which do not depend on the selector
+            if self._header:
+                with span('header'):
+                    watermark_shape = (
+                        np.shape(watermark_values) if np.ndim(watermark_values) == 2 else (1, watermark_size)
+                    )
+                    watermark_bits, embedding_indices = prepend_header(
+                        watermark_shape, watermark_bits, embedding_indices
+                    )
+
+            with span('modulation'):
+                mean = (x1_dct[embedding_indices] + x2_dct[embedding_indices]) / 2
+                modulation = self._gain * watermark_bits
+                x1_dct[embedding_indices] = mean + modulation
+                x2_dct[embedding_indices] = mean - modulation
+
+            with span('inverse_dct'):
+                embedded_sub_vector_x1 = dct.inverse(x1_dct)
+                embedded_sub_vector_x2 = dct.inverse(x2_dct)
+
+            with span('inverse_zigzag'):
+                embedded_approximation_coefficients = correlation.compose(
+                    embedded_sub_vector_x1, embedded_sub_vector_x2
+                )
+                ll_delta = zigzag.inverse(embedded_approximation_coefficients, ll.shape, self._dtype)
+                ll_delta -= ll
+
+            with span('inverse_dwt'):
+                channel_embedded = channel.astype(self._dtype)
+                dwt.add_approximation_delta(channel_embedded, ll_delta)
+
+            return channel_embedded
@@ -0,0 +1,361 @@
+from copy import deepcopy
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import numpy as np
+
+from src.exceptions import WatermarkSizeError, ImageChannelError
+from src.header import select_indices, prepend_header
+from src.indices import IndicesSelector
+from src.profiling import span
+from src.transformation import correlation
+from src.transformation import dct, zigzag, dwt
+from src.transformation.bipolar import bytes_to_bipolar_bits
+from src.transformation.precision import Precision
+
+_CHANNEL_IDS = 'rgb'
+
+DEFAULT_BATCH_SIZE = 8
+
+# Images are transformed over a batch axis in chunks of at most this many pixels. The transformations are bound by
+# memory bandwidth, so stacking larger images only evicts them from the CPU caches, while stacking small images saves
+# the overhead of the calls.
+_CHUNK_PIXELS = 1 << 16
+
+
+class _BatchPlan(NamedTuple):
+    # The watermark bits and the indices of the coefficients they modulate, the number of images transformed at once,
+    # and if it is more than one, the flat indices of the approximation forming both concatenated sub-vectors and
+    # their inverse
+    bits: np.ndarray
+    indices: np.ndarray
+    chunk_size: int
+    order: Optional[np.ndarray] = None
+    inverse_order: Optional[np.ndarray] = None
+
+
+class BlindDwtDctStackedEmbedder:
+    """
+    A class for embedding RGB channels of a watermark image into RGB channels of the input image at once.
+
+    Unlike RGBWatermarkEmbedder with BlindDwtDctChannelEmbedder, the selected channels are not split, but transformed
+    together by single DWT and DCT calls over the stacked (height, width, channels) array.
+    """
+
+    def __init__(
+            self,
+            gain: float,
+            selector: IndicesSelector,
+            channels: str = 'rgb',
+            precision: Precision = Precision.FLOAT64,
+            header: bool = False
+    ):
+        """
+        Creates a new instance.
+
+        :param gain: A float value specifying how strong the embedding would be.
+        :param selector: An instance of IndicesSelector that is used to spread watermark data across the channel data.
+        :param channels: A string specifying which image channels should be used for watermark embedding.
+        Allowed values are:
+        - Character 'r' specifies the red image channel.
+        - Character 'g' specifies the green image channel.
+        - Character 'b' specifies the blue image channel.
+        :param precision: A floating-point precision of the transformations and of the output. Defaults to
+        Precision.FLOAT64.
+        :param header: Whether to embed a header with the watermark shape into each selected channel, see
+        BlindDwtDctChannelEmbedder. Defaults to False.
+        """
+        if gain is None:
+            raise TypeError('gain is required')
+
+        if selector is None:
+            raise TypeError('selector is required')
+
+        self._gain = gain
+        self._selector = selector
+        self._channels = channels
+        self._dtype = Precision(precision).dtype
+        self._header = header
+
+    def embed(self, image: np.ndarray, watermark: np.ndarray) -> np.ndarray:
+        """
+        Embeds a watermark using the blind DWT-DCT approach.
+
+        :param image: A 3D numpy array of shape (height, width, 3) containing RGB pixel values in range 0 - 255.
+        :param watermark: A 3D numpy array of shape (height, width, 3) containing RGB watermark values in range
+        0 - 255.
+        :return: A 3D numpy array of the image shape containing RGB channels with embedded watermark.
+        """
+        if image is None or image.size < 1:
+            raise ImageChannelError('Empty input image provided for embedding')
+
+        self._validate_watermark(image.shape[0:2], watermark)
+
+        with span('embed'):
+            embedded_image = image.astype(self._dtype)
+            self._embed_image(embedded_image, image, watermark, None)
+            return embedded_image
+
+    def embed_batch(self, images: np.ndarray, watermark: np.ndarray) -> np.ndarray:
+        """
+        Embeds a watermark into a stack of equally sized images using the blind DWT-DCT approach.
+
+        The watermark bits and the selected indices are computed only once for all images. Small images are
+        transformed and modulated in chunks by single calls over a batch axis, while larger images, whose
+        transformations are bound by memory bandwidth rather than by the calls, are embedded one after another. Each
+        image is embedded by a fresh copy of the selector, so the result equals embedding each image by a separate
+        instance with an unused selector, e.g. by separate runs of shadowmark. The selector of this instance stays
+        unused.
+
+        :param images: A 4D numpy array of shape (count, height, width, 3) containing RGB pixel values in range
+        0 - 255.
+        :param watermark: A 3D numpy array of shape (height, width, 3) containing RGB watermark values in range
+        0 - 255.
+        :return: A 4D numpy array of the shape of the images containing RGB channels with embedded watermark.
+        """
+        if images is None or images.size < 1:
+            raise ImageChannelError('Empty input images provided for embedding')
+
+        if images.ndim != 4:
+            raise ImageChannelError('Images must be stacked in an array of shape (count, height, width, 3)')
+
+        self._validate_watermark(images.shape[1:3], watermark)
+
+        with span('embed'):
+            return self._embed_batch(images, watermark, self._batch_plan(images.shape[1:3], watermark))
+
+    def embed_all(
+            self, images: Iterable[np.ndarray], watermark: np.ndarray, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[np.ndarray]:
+        """
+        Lazily embeds a watermark into images of an iterable, e.g. images decoded one by one from files.
+
+        Consecutive images of the same shape are embedded in stacks of up to batch_size images by embed_batch, so at
+        most batch_size images are held in memory at once. The watermark bits and the selected indices are computed
+        only once for each shape of the images.
+
+        :param images: An iterable of 3D numpy arrays of shape (height, width, 3) containing RGB pixel values in range
+        0 - 255. Their shapes may differ, but runs of images of the same shape are embedded faster.
+        :param watermark: A 3D numpy array of shape (height, width, 3) containing RGB watermark values in range
+        0 - 255.
+        :param batch_size: The largest number of images embedded at once. Defaults to DEFAULT_BATCH_SIZE.
+        :raises ValueError: If the batch size is not positive.
+        :return: An iterator of 3D numpy arrays containing RGB channels with embedded watermark, in the order of the
+        images.
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be positive')
+
+        plans = {}
+        batch = []
+
+        for image in images:
+            if image is None or image.size < 1:
+                raise ImageChannelError('Empty input image provided for embedding')
+
+            if batch and (len(batch) == batch_size or image.shape != batch[0].shape):
+                yield from self._embed_cached(np.stack(batch), watermark, plans)
+                batch = []
+
+            batch.append(image)
+
+        if batch:
+            yield from self._embed_cached(np.stack(batch), watermark, plans)
+
+    def _embed_cached(self, images: np.ndarray, watermark: np.ndarray, plans: dict) -> np.ndarray:
+        shape = images.shape[1:3]
+
+        # Each stack is embedded in a span of its own, as embed_all is a generator and a span of it would enclose
+        # the code consuming the embedded images as well
+        with span('embed'):
+            if shape not in plans:
+                self._validate_watermark(shape, watermark)
+                plans[shape] = self._batch_plan(shape, watermark)
+
+            return self._embed_batch(images, watermark, plans[shape])
+
+    def _batch_plan(self, shape: tuple[int, int], watermark: np.ndarray) -> Optional[_BatchPlan]:
+        selected = self._selected()
+
+        if not selected:
+            return None
+
+        # The approximation has half the height and width of the image, rounded up, see dwt.first_level_approximation
+        approximation_shape = ((shape[0] + 1) // 2, (shape[1] + 1) // 2)
+        coefficients = approximation_shape[0] * approximation_shape[1]
+        chunk_size = max(1, _CHUNK_PIXELS // (shape[0] * shape[1]))
+        watermark_bits, embedding_indices = self._plan(
+            deepcopy(self._selector), int(coefficients / 2), watermark, selected
+        )
+
+        if chunk_size == 1:
+            return _BatchPlan(watermark_bits, embedding_indices, chunk_size)
+
+        # The zigzag order of the flat indices of the approximation, split into both sub-vectors the same way as by
+        # correlation.decompose. Gathering by the inverse order of the concatenated sub-vectors composes and un-scans
+        # them at once.
+        with span('zigzag'):
+            order = zigzag.scan(np.arange(coefficients).reshape(approximation_shape))
+            order = np.concatenate(correlation.decompose(order))
+            inverse_order = np.empty_like(order)
+            inverse_order[order] = np.arange(coefficients)
+
+        return _BatchPlan(watermark_bits, embedding_indices, chunk_size, order, inverse_order)
+
+    def _embed_batch(self, images: np.ndarray, watermark: np.ndarray, plan: Optional[_BatchPlan]) -> np.ndarray:
+        embedded_images = images.astype(self._dtype)
+
+        if plan is None:
+            return embedded_images
+
+        for start in range(0, len(images), plan.chunk_size):
+            chunk = slice(start, start + plan.chunk_size)
+
+            if plan.chunk_size == 1:
+                self._embed_image(embedded_images[start], images[start], watermark, plan)
+            else:
+                self._embed_chunk(embedded_images[chunk], images[chunk], plan)
+
+        return embedded_images
+
+    def _embed_image(
+            self, embedded_image: np.ndarray, image: np.ndarray, watermark: np.ndarray, plan: Optional[_BatchPlan]
+    ):
+        selected = self._selected()
+
+        if not selected:
+            return
+
+        dwt.prepare()
+        dct.prepare()
+
+        # Embedding changes only the approximation, so the detail coefficients are never computed
+        with span('dwt'):
+            ll = dwt.first_level_approximation(image[..., selected], dtype=self._dtype)
+
+        with span('zigzag'):
+            approximation_coefficients = zigzag.scan(ll)
+            sub_vector_x1, sub_vector_x2 = correlation.decompose(approximation_coefficients)
+
+        # Both DCT stacks are freshly allocated by the transform, so they are modulated in place
+        with span('dct'):
+            x1_dct = dct.transform(sub_vector_x1)
+            x2_dct = dct.transform(sub_vector_x2)
+
+        if plan is None:
+            watermark_bits, embedding_indices = self._plan(
+                self._selector, int(len(approximation_coefficients) / 2), watermark, selected
+            )
+        else:
+            watermark_bits, embedding_indices = plan.bits, plan.indices
+
+        with span('modulation'):
+            columns = np.arange(len(selected))
+            mean = (x1_dct[embedding_indices, columns] + x2_dct[embedding_indices, columns]) / 2
+            modulation = self._gain * watermark_bits
+            x1_dct[embedding_indices, columns] = mean + modulation
+            x2_dct[embedding_indices, columns] = mean - modulation
+
+        with span('inverse_dct'):
+            embedded_sub_vector_x1 = dct.inverse(x1_dct)
+            embedded_sub_vector_x2 = dct.inverse(x2_dct)
+
+        with span('inverse_zigzag'):
+            embedded_approximation_coefficients = correlation.compose(embedded_sub_vector_x1, embedded_sub_vector_x2)
+            ll_delta = zigzag.inverse(embedded_approximation_coefficients, ll.shape, self._dtype)
+            ll_delta -= ll
+
+        with span('inverse_dwt'):
+            for column, i in enumerate(selected):
+                dwt.add_approximation_delta(embedded_image[..., i], ll_delta[..., column])
+
+    def _embed_chunk(self, embedded_images: np.ndarray, images: np.ndarray, plan: _BatchPlan):
+        selected = self._selected()
+        count = len(images)
+        approximation_shape = ((images.shape[1] + 1) // 2, (images.shape[2] + 1) // 2)
+
+        dwt.prepare()
+        dct.prepare()
+
+        # Channels of the images are split into planes of shape (count, channels, height, width), so that the
+        # coefficients of each plane are contiguous along the last axis, along which the DCT is the fastest. The DWT of
+        # the first two axes is computed over a view of the planes with the height and width moved to the front.
+        with span('dwt'):
+            planes = np.moveaxis(images, -1, 1)[:, selected]
+            ll = dwt.first_level_approximation(np.moveaxis(planes, (2, 3), (0, 1)), dtype=self._dtype)
+            ll = np.moveaxis(ll, (0, 1), (2, 3)).reshape(count, len(selected), -1)
+
+        # The zigzag scan and the decomposition are a single gather by the planned order
+        with span('zigzag'):
+            sub_vectors = ll[..., plan.order]
+            sub_vector_x1, sub_vector_x2 = np.split(sub_vectors, [(len(plan.order) + 1) // 2], axis=-1)
+
+        with span('dct'):
+            x1_dct = dct.transform(sub_vector_x1, axis=-1)
+            x2_dct = dct.transform(sub_vector_x2, axis=-1)
+
+        # The bits are broadcast over the images, so all images are modulated by a single step
+        with span('modulation'):
+            columns = np.arange(len(selected))
+            mean = (x1_dct[:, columns, plan.indices] + x2_dct[:, columns, plan.indices]) / 2
+            modulation = self._gain * plan.bits
+            x1_dct[:, columns, plan.indices] = mean + modulation
+            x2_dct[:, columns, plan.indices] = mean - modulation
+
+        with span('inverse_dct'):
+            embedded_sub_vector_x1 = dct.inverse(x1_dct, axis=-1)
+            embedded_sub_vector_x2 = dct.inverse(x2_dct, axis=-1)
+
+        with span('inverse_zigzag'):
+            embedded_sub_vectors = np.concatenate((embedded_sub_vector_x1, embedded_sub_vector_x2), axis=-1)
+            embedded_sub_vectors -= sub_vectors
+            ll_delta = embedded_sub_vectors[..., plan.inverse_order].reshape(
+                (count, len(selected)) + approximation_shape
+            )
+
+        with span('inverse_dwt'):
+            for column, i in enumerate(selected):
+                dwt.add_approximation_delta(
+                    np.moveaxis(embedded_images[..., i], 0, -1), np.moveaxis(ll_delta[:, column], 0, -1)
+                )
+
+    def _selected(self) -> list[int]:
+        return [i for i, channel_id in enumerate(_CHANNEL_IDS) if channel_id in self._channels]
+
+    @staticmethod
+    def _validate_watermark(shape: tuple[int, int], watermark: np.ndarray):
+        if watermark is None or watermark.size < 1:
+            raise ImageChannelError('Empty watermark provided for embedding')
+
+        height, width = shape
+        watermark_height, watermark_width = watermark.shape[0:2]
+
+        if watermark_height * watermark_width > int(height * width / 64):
+            raise WatermarkSizeError(
+                'The watermark is too large.'
+                'Its total size should be at most 1/64 of the total size of the input image in pixels.'
+            )
+
+    def _plan(
+            self, selector: IndicesSelector, total_range_size: int, watermark: np.ndarray, selected: list[int]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # The bits of the watermark, preceded by the header if enabled, and the indices of the coefficients they
+        # modulate, both of shape (bits, channels)
+        with span('bits'):
+            watermark_bits = np.stack([bytes_to_bipolar_bits(watermark[..., i]) for i in selected], axis=1)
+
+        # Indices are selected channel by channel in the RGB order, the same way as by RGBWatermarkEmbedder
+        with span('selection'):
+            embedding_indices = np.stack([
+                select_indices(selector, total_range_size, len(watermark_bits), _CHANNEL_IDS[i], self._header)
+                for i in selected
+            ], axis=1)
+
+        # The header precedes the watermark at the first coefficients of each channel, which do not depend on the
+        # selector
+        if self._header:
+            with span('header'):
+                watermark_bits, embedding_indices = prepend_header(
+                    watermark.shape[0:2], watermark_bits, embedding_indices
+                )
+
+        return watermark_bits, embedding_indices
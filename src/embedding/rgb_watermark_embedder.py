@@ -1,4 +1,5 @@
-from typing import TypeAlias
+from concurrent.futures import Executor
+from typing import Optional, TypeAlias
 
 import numpy as np
 
@@ -12,7 +13,7 @@ class RGBWatermarkEmbedder:
     A class for embedding RGB channels of a watermark image into RGB channels of the input image.
     """
 
-    def __init__(self, embedder: ChannelEmbedder, channels: str = 'rgb'):
+    def __init__(self, embedder: ChannelEmbedder, channels: str = 'rgb', executor: Optional[Executor] = None):
         """
         Creates a new instance.
 
@@ -22,12 +23,16 @@ class RGBWatermarkEmbedder:
         - Character 'r' specifies the red image channel.
         - Character 'g' specifies the green image channel.
         - Character 'b' specifies the blue image channel.
+        :param executor: An optional executor (e.g. ThreadPoolExecutor) used to embed the selected channels
+        concurrently. If None, channels are embedded one after another. Concurrent embedding is deterministic only if
+        the channel embedder does not depend on the order of channels, e.g. it uses KeyedIndicesSelector.
         """
         if embedder is None:
             raise TypeError('embedder is required')
 
         self._embedder = embedder
         self._channels = channels
+        self._executor = executor
 
     def embed(self, input_channels: RGBChannels, watermark_channels: RGBChannels) -> RGBChannels:
         """
@@ -37,18 +42,27 @@ class RGBWatermarkEmbedder:
         :param watermark_channels: A tuple of RGB channels if a watermark image.
         :return: Tuple of RGB channels of the input image containing embedded watermark data.
         """
-        r, g, b = input_channels
-        wr, wg, wb = watermark_channels
+        output_channels = list(input_channels)
+        selected = [i for i, channel_id in enumerate('rgb') if channel_id in self._channels]
 
-        if 'r' in self._channels:
-            r = self._embed(r, wr)
-        if 'g' in self._channels:
-            g = self._embed(g, wg)
-        if 'b' in self._channels:
-            b = self._embed(b, wb)
+        arguments = (
+            [input_channels[i] for i in selected],
+            [watermark_channels[i] for i in selected],
+            ['rgb'[i] for i in selected]
+        )
 
+        if self._executor is None:
+            embedded_channels = map(self._embed, *arguments)
+        else:
+            embedded_channels = self._executor.map(self._embed, *arguments)
+
+        # Results are collected in the order of channels, regardless of the order they were completed in
+        for i, embedded_channel in zip(selected, embedded_channels):
+            output_channels[i] = embedded_channel
+
+        r, g, b = output_channels
         return r, g, b
 
-    def _embed(self, image_channel: np.ndarray, watermark_channel: np.ndarray) -> np.ndarray:
-        watermark_bytes = [byte for row in watermark_channel for byte in row]
-        return self._embedder.embed(image_channel, watermark_bytes)
+    def _embed(self, image_channel: np.ndarray, watermark_channel: np.ndarray, channel_id: str) -> np.ndarray:
+        # The channel is passed whole, so that its shape may be embedded in a header, see BlindDwtDctChannelEmbedder
+        return self._embedder.embed(image_channel, watermark_channel, channel_id)
@@ -0,0 +1,68 @@
+from concurrent.futures import Executor
+from typing import Optional
+
+import numpy as np
+
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.tiling import tiles
+
+
+class TiledWatermarkEmbedder:
+    """
+    A class for embedding a watermark into large images tile by tile.
+
+    Every tile carries the whole watermark, so the memory needed by the transformations is bounded by the tile size
+    instead of the image size. Each tile is embedded independently and written to the output as soon as it is done.
+    """
+
+    def __init__(self, embedder: BlindDwtDctStackedEmbedder, tile_size: int, executor: Optional[Executor] = None):
+        """
+        Creates a new instance.
+
+        :param embedder: An embedder that embeds the watermark into a single tile.
+        :param tile_size: A minimal size of a tile in pixels in both dimensions. Tiles need to be large enough to carry
+        the watermark, i.e. tile_size * tile_size must be at least 64 times the watermark size.
+        :param executor: An optional executor (e.g. ThreadPoolExecutor) used to embed tiles concurrently. If None,
+        tiles are embedded one after another. Concurrent embedding is deterministic only if the embedder does not
+        depend on the order of tiles, e.g. it uses KeyedIndicesSelector.
+        """
+        if embedder is None:
+            raise TypeError('embedder is required')
+
+        if tile_size < 1:
+            raise ValueError('tile_size must be positive')
+
+        self._embedder = embedder
+        self._tile_size = tile_size
+        self._executor = executor
+
+    def embed(self, image: np.ndarray, watermark: np.ndarray, output: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Embeds a watermark into every tile of the image.
+
+        :param image: A 3D numpy array (or a memory-mapped array) of shape (height, width, 3) containing RGB pixel
+        values in range 0 - 255.
+        :param watermark: A 3D numpy array of shape (height, width, 3) containing RGB watermark values in range
+        0 - 255.
+        :param output: An optional uint8 array (e.g. a memory-mapped array) of the image shape the watermarked tiles
+        are written to. If None, a new array is allocated.
+        :return: A uint8 array of the image shape containing the watermarked image, i.e. the output array.
+        """
+        if output is None:
+            output = np.empty(image.shape, dtype=np.uint8)
+
+        def _embed_tile(tile: tuple[slice, slice]):
+            embedded_tile = self._embedder.embed(np.asarray(image[tile]), watermark)
+            output[tile] = embedded_tile.clip(0, 255).astype(np.uint8)
+
+        tile_grid = tiles(image.shape, self._tile_size)
+
+        if self._executor is None:
+            for tile in tile_grid:
+                _embed_tile(tile)
+        else:
+            # Tiles are written by the tasks themselves, so no embedded tile waits in memory for its predecessors
+            for _ in self._executor.map(_embed_tile, tile_grid):
+                pass
+
+        return output
@@ -4,3 +4,11 @@ class WatermarkSizeError(ValueError):
 
 class ImageChannelError(ValueError):
     pass
+
+
+class ServerError(Exception):
+    pass
+
+
+class HeaderError(ValueError):
+    pass
@@ -1,11 +1,17 @@
+from typing import Optional
+
 import numpy as np
 
 from src.exceptions import WatermarkSizeError, ImageChannelError
+from src.header import HEADER_COEFFICIENTS, decode_header, select_indices
 from src.extractor import ChannelExtractor
 from src.indices import IndicesSelector
+from src.profiling import span
 from src.transformation import dct, zigzag, dwt
-from src.transformation.bipolar import bipolar_bits_to_vector
+from src.transformation.dwt import DwtBackend
+from src.transformation.bipolar import bipolar_bits_to_bytes
 from src.transformation.correlation import decompose
+from src.transformation.precision import Precision
 
 
 class BlindDwtDctChannelExtractor(ChannelExtractor):
@@ -13,53 +19,104 @@ class BlindDwtDctChannelExtractor(ChannelExtractor):
     A class for extracting watermark data from a single channel of an input image.
     """
 
-    def __init__(self, selector: IndicesSelector):
+    def __init__(
+            self,
+            selector: IndicesSelector,
+            approximation_backend: Optional[DwtBackend] = None,
+            precision: Precision = Precision.FLOAT64,
+            header: bool = False
+    ):
         """
         Creates a new instance.
 
         :param selector: An instance of IndicesSelector for collecting spread watermark data from the channel data.
+        :param approximation_backend: A name of the DWT backend in dwt.BACKENDS computing the approximation. If None,
+        the selected backend is used, by default DwtBackend.HAAR, which computes only the approximation coefficients
+        that are needed for extraction.
+        :param precision: A floating-point precision of the transformations. Defaults to Precision.FLOAT64.
+        :param header: Whether the watermark was embedded with a header, see BlindDwtDctChannelEmbedder. Defaults to
+        False.
         """
         if selector is None:
             raise TypeError('selector is required')
 
+        # An unknown backend is rejected now rather than by the first extraction
+        if approximation_backend is not None:
+            dwt.BACKENDS.get(approximation_backend)
+
         self._selector = selector
+        self._approximation_backend = approximation_backend
+        self._dtype = Precision(precision).dtype
+        self._header = header
 
-    def extract(self, channel: np.ndarray, watermark_size: int) -> list[int]:
+    def extract(
+            self, channel: np.ndarray, watermark_size: Optional[int], channel_id: Optional[str] = None
+    ) -> np.ndarray:
         """
         Extracts watermark data using the blind DWT-DCT approach.
 
         :param channel: A 2D numpy array representing image channel and containing pixel values in range 0 - 255.
-        :param watermark_size: An expected size of the extracted watermark.
-        :return: A list of watermark data values in range 0 - 255.
+        :param watermark_size: An expected size of the extracted watermark. If None, the watermark shape is read from
+        the header, which requires the extractor to be created with header=True.
+        :param channel_id: An optional identifier of the channel passed to the indices selector.
+        :raises HeaderError: If the watermark shape is read from the header, but no valid header is found.
+        :return: A 1D numpy array of watermark data values in range 0 - 255, or a 2D numpy array of the shape read
+        from the header.
         """
         if channel is None or channel.size < 1:
             raise ImageChannelError('Empty image channel provided for extraction')
 
-        if watermark_size > int(channel.size / 64):
+        if watermark_size is None and not self._header:
+            raise TypeError('watermark_size is required without a header')
+
+        if watermark_size is not None and watermark_size > int(channel.size / 64):
             raise WatermarkSizeError(
                 'The specified size of the watermark is too large. '
                 'Its total size should be at most 1/64 of the total size of the input image in pixels.'
             )
 
-        if watermark_size < 1:
-            return []
+        if watermark_size is not None and watermark_size < 1:
+            return np.empty(0, dtype=np.uint8)
+
+        with span('extract'):
+            dwt.prepare(self._approximation_backend)
+            dct.prepare()
+
+            with span('dwt'):
+                ll = dwt.first_level_approximation(channel, self._approximation_backend, self._dtype)
+
+            with span('zigzag'):
+                approximation_coefficients = zigzag.scan(ll)
+                sub_vector_x1, sub_vector_x2 = decompose(approximation_coefficients)
+
+            watermark_shape = None
+            differences = None
+
+            # All differences are needed for the header anyway, so the watermark bits are gathered from them later
+            if watermark_size is None:
+                with span('dct'):
+                    differences = dct.transform_difference(sub_vector_x1, sub_vector_x2)
 
-        ll, _, _, _ = dwt.first_level(channel)
+                with span('header'):
+                    watermark_shape = decode_header(differences[:HEADER_COEFFICIENTS])
+                    watermark_size = watermark_shape[0] * watermark_shape[1]
 
-        approximation_coefficients = zigzag.scan(ll)
+            watermark_size_in_bits = watermark_size * 8
 
-        sub_vector_x1, sub_vector_x2 = decompose(approximation_coefficients)
+            with span('selection'):
+                locations = select_indices(
+                    self._selector, int(len(approximation_coefficients) / 2), watermark_size_in_bits, channel_id,
+                    self._header
+                )
 
-        x1_dct = dct.transform(sub_vector_x1)
-        x2_dct = dct.transform(sub_vector_x2)
+            with span('dct'):
+                if differences is None:
+                    differences = dct.transform_difference(sub_vector_x1, sub_vector_x2)
 
-        watermark_size_in_bits = watermark_size * 8
-        locations = self._selector.indices(int(len(approximation_coefficients) / 2), watermark_size_in_bits)
+                delta_x = differences[locations]
 
-        watermark_bipolar_bits = []
-        for i in range(0, watermark_size_in_bits):
-            j = locations[i]
-            delta_x = (x1_dct[j] - x2_dct[j])
-            watermark_bipolar_bits.append(1 if delta_x >= 0 else -1)
+            with span('demodulation'):
+                watermark_bipolar_bits = np.where(delta_x >= 0, 1, -1).astype(np.int8)
+                watermark_bytes = bipolar_bits_to_bytes(watermark_bipolar_bits)
 
-        return bipolar_bits_to_vector(watermark_bipolar_bits)
+            return watermark_bytes if watermark_shape is None else watermark_bytes.reshape(watermark_shape)
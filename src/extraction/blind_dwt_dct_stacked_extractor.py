@@ -0,0 +1,152 @@
+from typing import Optional
+
+import numpy as np
+
+from src.exceptions import WatermarkSizeError, ImageChannelError
+from src.header import HEADER_COEFFICIENTS, decode_header, select_indices
+from src.indices import IndicesSelector
+from src.profiling import span
+from src.transformation import dct, zigzag, dwt
+from src.transformation.dwt import DwtBackend
+from src.transformation.bipolar import bipolar_bits_to_bytes
+from src.transformation.correlation import decompose
+from src.transformation.precision import Precision
+
+_CHANNEL_IDS = 'rgb'
+
+
+class BlindDwtDctStackedExtractor:
+    """
+    A class for extracting RGB channels of a watermark image from RGB channels of the input image at once.
+
+    Unlike RGBWatermarkExtractor with BlindDwtDctChannelExtractor, the selected channels are not split, but transformed
+    together by single DWT and DCT calls over the stacked (height, width, channels) array.
+    """
+
+    def __init__(
+            self,
+            selector: IndicesSelector,
+            channels: str = 'rgb',
+            approximation_backend: Optional[DwtBackend] = None,
+            precision: Precision = Precision.FLOAT64,
+            header: bool = False
+    ):
+        """
+        Creates a new instance.
+
+        :param selector: An instance of IndicesSelector for collecting spread watermark data from the channel data.
+        :param channels: A string specifying which image channels should be used for watermark extraction.
+        Allowed values are:
+        - Character 'r' specifies the red image channel.
+        - Character 'g' specifies the green image channel.
+        - Character 'b' specifies the blue image channel.
+        :param approximation_backend: A name of the DWT backend in dwt.BACKENDS computing the approximation. If None,
+        the selected backend is used, by default DwtBackend.HAAR, which computes only the approximation coefficients
+        that are needed for extraction.
+        :param precision: A floating-point precision of the transformations. Defaults to Precision.FLOAT64.
+        :param header: Whether the watermark was embedded with a header, see BlindDwtDctStackedEmbedder. Defaults to
+        False.
+        """
+        if selector is None:
+            raise TypeError('selector is required')
+
+        # An unknown backend is rejected now rather than by the first extraction
+        if approximation_backend is not None:
+            dwt.BACKENDS.get(approximation_backend)
+
+        self._selector = selector
+        self._channels = channels
+        self._approximation_backend = approximation_backend
+        self._dtype = Precision(precision).dtype
+        self._header = header
+
+    def extract(self, image: np.ndarray, watermark_shape: Optional[tuple[int, int]]) -> np.ndarray:
+        """
+        Extracts a watermark of a given shape using the blind DWT-DCT approach.
+
+        :param image: A 3D numpy array of shape (height, width, 3) containing RGB pixel values in range 0 - 255.
+        :param watermark_shape: The expected shape of the watermark. If None, it is read from the header, which
+        requires the extractor to be created with header=True. The headers of all selected channels are combined.
+        :raises HeaderError: If the watermark shape is read from the header, but no valid header is found.
+        :return: A 3D numpy array of shape (height, width, 3) containing RGB channels of the extracted watermark.
+        Channels that are not selected for extraction are zero.
+        """
+        if image is None or image.size < 1:
+            raise ImageChannelError('Empty image provided for extraction')
+
+        if watermark_shape is None and not self._header:
+            raise TypeError('watermark_shape is required without a header')
+
+        selected = [i for i, channel_id in enumerate(_CHANNEL_IDS) if channel_id in self._channels]
+
+        if watermark_shape is None and not selected:
+            return np.zeros((0, 0, len(_CHANNEL_IDS)), dtype=np.uint8)
+
+        if watermark_shape is not None:
+            watermark = self._validated_watermark(image, watermark_shape)
+
+            if watermark.size < 1 or not selected:
+                return watermark
+
+        with span('extract'):
+            dwt.prepare(self._approximation_backend)
+            dct.prepare()
+
+            with span('dwt'):
+                ll = dwt.first_level_approximation(image[..., selected], self._approximation_backend, self._dtype)
+
+            with span('zigzag'):
+                approximation_coefficients = zigzag.scan(ll)
+                sub_vector_x1, sub_vector_x2 = decompose(approximation_coefficients)
+
+            differences = None
+
+            # All differences are needed for the header anyway, so the watermark bits are gathered from them later
+            if watermark_shape is None:
+                with span('dct'):
+                    differences = dct.transform_difference(sub_vector_x1, sub_vector_x2)
+
+                with span('header'):
+                    watermark_shape = decode_header(differences[:HEADER_COEFFICIENTS])
+                    watermark = self._validated_watermark(image, watermark_shape)
+
+            watermark_size_in_bits = watermark_shape[0] * watermark_shape[1] * 8
+            columns = np.arange(len(selected))
+
+            # Indices are selected channel by channel in the RGB order, the same way as by RGBWatermarkExtractor
+            with span('selection'):
+                locations = np.stack([
+                    select_indices(
+                        self._selector, int(len(approximation_coefficients) / 2), watermark_size_in_bits,
+                        _CHANNEL_IDS[i], self._header
+                    )
+                    for i in selected
+                ], axis=1)
+
+            with span('dct'):
+                if differences is None:
+                    differences = dct.transform_difference(sub_vector_x1, sub_vector_x2)
+
+                delta_x = differences[locations, columns]
+
+            with span('demodulation'):
+                watermark_bipolar_bits = np.where(delta_x >= 0, 1, -1).astype(np.int8)
+
+                for column, i in enumerate(selected):
+                    bits = watermark_bipolar_bits[:, column]
+                    watermark[..., i] = bipolar_bits_to_bytes(bits).reshape(watermark_shape)
+
+            return watermark
+
+    @staticmethod
+    def _validated_watermark(image: np.ndarray, watermark_shape: tuple[int, int]) -> np.ndarray:
+        height, width = image.shape[0:2]
+        watermark_height, watermark_width = watermark_shape
+
+        if watermark_height * watermark_width > int(height * width / 64):
+            raise WatermarkSizeError(
+                'The specified size of the watermark is too large. '
+                'Its total size should be at most 1/64 of the total size of the input image in pixels.'
+            )
+
+        return np.zeros((watermark_height, watermark_width, len(_CHANNEL_IDS)), dtype=np.uint8)
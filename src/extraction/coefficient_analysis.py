@@ -0,0 +1,158 @@
+from typing import Optional
+
+import numpy as np
+
+from src.exceptions import WatermarkSizeError, ImageChannelError, HeaderError
+from src.header import HEADER_COEFFICIENTS, decode_header, select_indices
+from src.indices import IndicesSelector
+from src.profiling import span
+from src.transformation import dct, zigzag, dwt
+from src.transformation.dwt import DwtBackend
+from src.transformation.bipolar import bipolar_bits_to_bytes
+from src.transformation.correlation import decompose
+from src.transformation.precision import Precision
+
+_CHANNEL_IDS = 'rgb'
+
+
+class CoefficientAnalysis:
+    """
+    A class for extracting watermarks of any shape by any indices selector from a single image, e.g. when the seed and
+    the shape of the embedded watermark are unknown and many candidates are tried.
+
+    The DWT, zigzag scan, decomposition and DCT of the image do not depend on the selector nor on the watermark shape,
+    so the differences of the DCT coefficients of both sub-vectors are computed once for all selected channels when the
+    analysis is created. Each extraction then only gathers the differences at the selected indices and takes their
+    signs. The extracted watermarks are the same as those of BlindDwtDctStackedExtractor.
+    """
+
+    def __init__(
+            self,
+            image: np.ndarray,
+            channels: str = 'rgb',
+            approximation_backend: Optional[DwtBackend] = None,
+            precision: Precision = Precision.FLOAT64,
+            header: bool = False
+    ):
+        """
+        Analyses an image.
+
+        :param image: A 3D numpy array of shape (height, width, 3) containing RGB pixel values in range 0 - 255.
+        :param channels: A string specifying which image channels should be used for watermark extraction.
+        Allowed values are:
+        - Character 'r' specifies the red image channel.
+        - Character 'g' specifies the green image channel.
+        - Character 'b' specifies the blue image channel.
+        :param approximation_backend: A name of the DWT backend in dwt.BACKENDS computing the approximation. If None,
+        the selected backend is used.
+        :param precision: A floating-point precision of the transformations. Defaults to Precision.FLOAT64.
+        :param header: Whether the watermark was embedded with a header, see BlindDwtDctStackedEmbedder. The header
+        does not depend on the selector, so it is read only once. Defaults to False.
+        """
+        if image is None or image.size < 1:
+            raise ImageChannelError('Empty image provided for extraction')
+
+        self._pixels = image.shape[0] * image.shape[1]
+        self._selected = [i for i, channel_id in enumerate(_CHANNEL_IDS) if channel_id in channels]
+        self._differences = None
+        self._header = header
+        self._header_shape = None
+
+        if not self._selected:
+            return
+
+        with span('analysis'):
+            dwt.prepare(approximation_backend)
+            dct.prepare()
+
+            with span('dwt'):
+                ll = dwt.first_level_approximation(
+                    image[..., self._selected], approximation_backend, Precision(precision).dtype
+                )
+
+            with span('zigzag'):
+                sub_vector_x1, sub_vector_x2 = decompose(zigzag.scan(ll))
+
+            # Differences of all coefficients are kept, so that the indices of any selector can be gathered from them
+            with span('dct'):
+                self._differences = dct.transform_difference(sub_vector_x1, sub_vector_x2)
+
+    @property
+    def channels(self) -> str:
+        """
+        :return: Identifiers of the analysed channels in the RGB order, e.g. 'rb'.
+        """
+        return ''.join(_CHANNEL_IDS[i] for i in self._selected)
+
+    def read_header(self) -> tuple[int, int]:
+        """
+        Reads the watermark shape from the headers of the analysed channels, which are combined.
+
+        :raises HeaderError: If the analysis was created without a header or no valid header is found.
+        :return: The shape of the watermark, i.e. (height, width).
+        """
+        if not self._header:
+            raise HeaderError('The analysis was created without a header')
+
+        if self._header_shape is None:
+            if not self._selected:
+                return 0, 0
+
+            with span('header'):
+                self._header_shape = decode_header(self._differences[:HEADER_COEFFICIENTS])
+
+        return self._header_shape
+
+    def extract(self, selector: IndicesSelector, watermark_shape: Optional[tuple[int, int]]) -> np.ndarray:
+        """
+        Extracts a watermark of a given shape using the blind DWT-DCT approach.
+
+        :param selector: An instance of IndicesSelector for collecting spread watermark data. Stateful selectors (e.g.
+        PermutationIndicesSelector) select different indices after previous calls, so each extraction needs a fresh
+        one, the same as for BlindDwtDctStackedExtractor.
+        :param watermark_shape: The expected shape of the watermark. If None, it is read from the header, see
+        read_header.
+        :return: A 3D numpy array of shape (height, width, 3) containing RGB channels of the extracted watermark.
+        Channels that are not analysed are zero.
+        """
+        if selector is None:
+            raise TypeError('selector is required')
+
+        if watermark_shape is None:
+            watermark_shape = self.read_header()
+
+        watermark_height, watermark_width = watermark_shape
+        watermark_size = watermark_height * watermark_width
+
+        if watermark_size > int(self._pixels / 64):
+            raise WatermarkSizeError(
+                'The specified size of the watermark is too large. '
+                'Its total size should be at most 1/64 of the total size of the input image in pixels.'
+            )
+
+        watermark = np.zeros((watermark_height, watermark_width, len(_CHANNEL_IDS)), dtype=np.uint8)
+
+        if watermark_size < 1 or not self._selected:
+            return watermark
+
+        watermark_size_in_bits = watermark_size * 8
+
+        with span('extract'):
+            # Indices are selected channel by channel in the RGB order, the same way as by BlindDwtDctStackedExtractor
+            with span('selection'):
+                locations = np.stack([
+                    select_indices(
+                        selector, len(self._differences), watermark_size_in_bits, _CHANNEL_IDS[i], self._header
+                    )
+                    for i in self._selected
+                ], axis=1)
+
+            with span('demodulation'):
+                delta_x = self._differences[locations, np.arange(len(self._selected))]
+                watermark_bipolar_bits = np.where(delta_x >= 0, 1, -1).astype(np.int8)
+
+                for column, i in enumerate(self._selected):
+                    bits = watermark_bipolar_bits[:, column]
+                    watermark[..., i] = bipolar_bits_to_bytes(bits).reshape(watermark_shape)
+
+            return watermark
@@ -1,4 +1,5 @@
-from typing import TypeAlias
+from concurrent.futures import Executor
+from typing import Optional, TypeAlias
 
 import numpy as np
 
@@ -12,7 +13,7 @@ class RGBWatermarkExtractor:
     A class for extracting RGB channels of a watermark image from RGB channels of the input image.
     """
 
-    def __init__(self, extractor: ChannelExtractor, channels: str = 'rgb'):
+    def __init__(self, extractor: ChannelExtractor, channels: str = 'rgb', executor: Optional[Executor] = None):
         """
         Creates a new instance.
 
@@ -22,31 +23,59 @@ class RGBWatermarkExtractor:
         - Character 'r' specifies the red image channel.
         - Character 'g' specifies the green image channel.
         - Character 'b' specifies the blue image channel.
+        :param executor: An optional executor (e.g. ThreadPoolExecutor) used to extract the selected channels
+        concurrently. If None, channels are extracted one after another. Concurrent extraction is deterministic only if
+        the channel extractor does not depend on the order of channels, e.g. it uses KeyedIndicesSelector.
         """
         if extractor is None:
             raise TypeError('ChannelExtractor instance is required')
 
         self._extractor = extractor
         self._channels = channels
+        self._executor = executor
 
-    def extract(self, input_channels: RGBChannels, watermark_shape: tuple[int, int]) -> RGBChannels:
+    def extract(self, input_channels: RGBChannels, watermark_shape: Optional[tuple[int, int]]) -> RGBChannels:
         """
         Extracts a watermark of a given shape from RGB channels of the input image.
 
         :param input_channels: A tuple of RGB image channels.
-        :param watermark_shape: The expected shape of the watermark.
+        :param watermark_shape: The expected shape of the watermark. If None, the channel extractor reads the shape of
+        each channel from its header, see BlindDwtDctChannelExtractor.
         :return: Tuple of RGB channels of the extracted watermark image.
         """
-        r, g, b = input_channels
+        output_channels = [None if watermark_shape is None else np.zeros(watermark_shape) for _ in range(3)]
+        selected = [i for i, channel_id in enumerate('rgb') if channel_id in self._channels]
 
-        wr = self._extract(r, watermark_shape) if 'r' in self._channels else np.zeros(watermark_shape)
-        wg = self._extract(g, watermark_shape) if 'g' in self._channels else np.zeros(watermark_shape)
-        wb = self._extract(b, watermark_shape) if 'b' in self._channels else np.zeros(watermark_shape)
+        arguments = (
+            [input_channels[i] for i in selected],
+            [watermark_shape] * len(selected),
+            ['rgb'[i] for i in selected]
+        )
 
+        if self._executor is None:
+            extracted_channels = map(self._extract, *arguments)
+        else:
+            extracted_channels = self._executor.map(self._extract, *arguments)
+
+        # Results are collected in the order of channels, regardless of the order they were completed in
+        for i, extracted_channel in zip(selected, extracted_channels):
+            output_channels[i] = extracted_channel
+
+        # Channels that are not selected take the shape read from the headers of the selected ones
+        if watermark_shape is None:
+            shape = output_channels[selected[0]].shape if selected else (0, 0)
+            output_channels = [np.zeros(shape) if channel is None else channel for channel in output_channels]
+
+        wr, wg, wb = output_channels
         return wr, wg, wb
 
-    def _extract(self, image_channel: np.ndarray, watermark_shape: tuple[int, int]) -> np.ndarray:
+    def _extract(
+            self, image_channel: np.ndarray, watermark_shape: Optional[tuple[int, int]], channel_id: str
+    ) -> np.ndarray:
+        if watermark_shape is None:
+            return np.asarray(self._extractor.extract(image_channel, None, channel_id), dtype=np.uint8)
+
         watermark_height, watermark_width = watermark_shape
-        watermark_bytes = self._extractor.extract(image_channel, watermark_width * watermark_height)
+        watermark_bytes = self._extractor.extract(image_channel, watermark_width * watermark_height, channel_id)
 
-        return np.array(watermark_bytes, dtype=np.uint8).reshape(watermark_shape)
+        return np.asarray(watermark_bytes, dtype=np.uint8).reshape(watermark_shape)
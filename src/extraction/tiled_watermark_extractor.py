@@ -0,0 +1,63 @@
+from concurrent.futures import Executor
+from typing import Optional
+
+import numpy as np
+
+from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+from src.tiling import tiles
+
+
+class TiledWatermarkExtractor:
+    """
+    A class for extracting a watermark from large images embedded by TiledWatermarkEmbedder.
+
+    The watermark is extracted from every tile independently and the tiles vote on each bit of the result, which makes
+    the extraction more robust than the extraction from a single tile.
+    """
+
+    def __init__(self, extractor: BlindDwtDctStackedExtractor, tile_size: int, executor: Optional[Executor] = None):
+        """
+        Creates a new instance.
+
+        :param extractor: An extractor that extracts the watermark from a single tile.
+        :param tile_size: A minimal size of a tile in pixels in both dimensions. Must be the same as for embedding.
+        :param executor: An optional executor (e.g. ThreadPoolExecutor) used to extract tiles concurrently. If None,
+        tiles are extracted one after another. Concurrent extraction is deterministic only if the extractor does not
+        depend on the order of tiles, e.g. it uses KeyedIndicesSelector.
+        """
+        if extractor is None:
+            raise TypeError('extractor is required')
+
+        if tile_size < 1:
+            raise ValueError('tile_size must be positive')
+
+        self._extractor = extractor
+        self._tile_size = tile_size
+        self._executor = executor
+
+    def extract(self, image: np.ndarray, watermark_shape: tuple[int, int]) -> np.ndarray:
+        """
+        Extracts a watermark of a given shape from every tile of the image and combines them by a majority vote.
+
+        :param image: A 3D numpy array (or a memory-mapped array) of shape (height, width, 3) containing RGB pixel
+        values in range 0 - 255.
+        :param watermark_shape: The expected shape of the watermark.
+        :return: A 3D numpy array of shape (height, width, 3) containing RGB channels of the extracted watermark.
+        """
+        def _extract_tile(tile: tuple[slice, slice]) -> np.ndarray:
+            return self._extractor.extract(np.asarray(image[tile]), watermark_shape)
+
+        tile_grid = tiles(image.shape, self._tile_size)
+
+        if self._executor is None:
+            tile_watermarks = map(_extract_tile, tile_grid)
+        else:
+            tile_watermarks = self._executor.map(_extract_tile, tile_grid)
+
+        votes = None
+        for tile_watermark in tile_watermarks:
+            bits = np.unpackbits(tile_watermark, axis=-1).astype(np.int32)
+            votes = bits if votes is None else votes + bits
+
+        # A bit is set if it is set in more than half of the tiles
+        return np.packbits(votes * 2 > len(tile_grid), axis=-1)
@@ -0,0 +1,199 @@
+from math import exp, log
+from typing import NamedTuple
+
+import numpy as np
+
+from src.detection import DEFAULT_AGREEMENT, DEFAULT_FALSE_POSITIVE_RATE, DEFAULT_FALSE_NEGATIVE_RATE
+from src.exceptions import WatermarkSizeError, ImageChannelError
+from src.header import select_indices
+from src.indices import IndicesSelector
+from src.profiling import span
+from src.transformation import dct, zigzag, dwt
+from src.transformation.bipolar import bytes_to_bipolar_bits
+from src.transformation.correlation import decompose
+from src.transformation.precision import Precision
+
+_CHANNEL_IDS = 'rgb'
+
+# Bits are read in a random order, so that any prefix is a fair sample of the watermark. The order is fixed, so that
+# detection is reproducible.
+_ORDER_SEED = 0
+
+
+class Detection(NamedTuple):
+    """
+    A result of detecting a watermark in an image, see WatermarkDetector.
+    """
+
+    present: bool
+    """
+    Whether the watermark was detected, i.e. the test concluded that the image carries it.
+    """
+
+    score: float
+    """
+    The fraction of the read bits that agree with the watermark, about 0.5 for images without it and 1 for images
+    carrying it undistorted.
+    """
+
+    p_value: float
+    """
+    An upper bound of the probability that an image without the watermark yields as much evidence for it as any
+    prefix of the read bits. It stays valid although the test stops early.
+    """
+
+    bits: int
+    """
+    The number of bits read before the test stopped.
+    """
+
+    total_bits: int
+    """
+    The number of bits of the watermark in all selected channels.
+    """
+
+
+class WatermarkDetector:
+    """
+    A class for detecting whether an image carries a known watermark embedded by BlindDwtDctStackedEmbedder (or
+    RGBWatermarkEmbedder with BlindDwtDctChannelEmbedder).
+
+    Instead of extracting the whole watermark, the bits are compared with the watermark in a random order by Wald's
+    sequential probability ratio test, which stops as soon as the presence or absence of the watermark is established
+    at the configured error rates. Channels are transformed one after another, so the remaining channels are not
+    transformed at all once the test stops. Without the watermark, the extracted bits agree with it by chance (with
+    probability 0.5), while with the watermark, they agree with at least the configured probability.
+    """
+
+    def __init__(
+            self,
+            selector: IndicesSelector,
+            channels: str = 'rgb',
+            agreement: float = DEFAULT_AGREEMENT,
+            false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+            false_negative_rate: float = DEFAULT_FALSE_NEGATIVE_RATE,
+            precision: Precision = Precision.FLOAT64,
+            header: bool = False
+    ):
+        """
+        Creates a new instance.
+
+        :param selector: An instance of IndicesSelector for collecting spread watermark data from the channel data.
+        :param channels: A string specifying which image channels should be used for watermark detection.
+        Allowed values are:
+        - Character 'r' specifies the red image channel.
+        - Character 'g' specifies the green image channel.
+        - Character 'b' specifies the blue image channel.
+        :param agreement: A probability that a bit of an image carrying the watermark agrees with the watermark, at
+        which the test detects the watermark at the configured false negative rate. Lower values detect more distorted
+        watermarks, but need more bits. Must be between 0.5 and 1. Defaults to DEFAULT_AGREEMENT.
+        :param false_positive_rate: A tolerated probability of detecting the watermark in an image without it.
+        Defaults to DEFAULT_FALSE_POSITIVE_RATE.
+        :param false_negative_rate: A tolerated probability of missing the watermark in an image carrying it with the
+        configured agreement. Defaults to DEFAULT_FALSE_NEGATIVE_RATE.
+        :param precision: A floating-point precision of the transformations. Defaults to Precision.FLOAT64.
+        :param header: Whether the watermark was embedded with a header, see BlindDwtDctStackedEmbedder. Defaults to
+        False.
+        """
+        if selector is None:
+            raise TypeError('selector is required')
+
+        if not 0.5 < agreement < 1:
+            raise ValueError('agreement must be between 0.5 and 1')
+
+        if not (0 < false_positive_rate < 1 and 0 < false_negative_rate < 1):
+            raise ValueError('Error rates must be between 0 and 1')
+
+        if false_positive_rate + false_negative_rate >= 1:
+            raise ValueError('The sum of the error rates must be less than 1')
+
+        self._selector = selector
+        self._channels = channels
+        self._dtype = Precision(precision).dtype
+        self._header = header
+
+        # Log-likelihood ratios of an agreeing and a disagreeing bit, and Wald's thresholds of their sum
+        self._agreeing = log(agreement / 0.5)
+        self._disagreeing = log((1 - agreement) / 0.5)
+        self._upper = log((1 - false_negative_rate) / false_positive_rate)
+        self._lower = log(false_negative_rate / (1 - false_positive_rate))
+
+    def detect(self, image: np.ndarray, watermark: np.ndarray) -> Detection:
+        """
+        Detects whether the image carries the watermark.
+
+        :param image: A 3D numpy array of shape (height, width, 3) containing RGB pixel values in range 0 - 255.
+        :param watermark: A 3D numpy array of shape (height, width, 3) containing RGB watermark values in range
+        0 - 255.
+        :return: A Detection. If all bits are read before the test stops, the watermark is reported as not present.
+        """
+        if image is None or image.size < 1:
+            raise ImageChannelError('Empty image provided for detection')
+
+        if watermark is None or watermark.size < 1:
+            raise ImageChannelError('Empty watermark provided for detection')
+
+        height, width = image.shape[0:2]
+        watermark_height, watermark_width = watermark.shape[0:2]
+
+        if watermark_height * watermark_width > int(height * width / 64):
+            raise WatermarkSizeError(
+                'The specified size of the watermark is too large. '
+                'Its total size should be at most 1/64 of the total size of the input image in pixels.'
+            )
+
+        selected = [i for i, channel_id in enumerate(_CHANNEL_IDS) if channel_id in self._channels]
+        channel_bits = watermark_height * watermark_width * 8
+        order = np.random.default_rng(_ORDER_SEED).permutation(channel_bits)
+
+        ratio = 0.0
+        max_ratio = 0.0
+        bits = 0
+        agreeing_bits = 0
+
+        with span('detect'):
+            dwt.prepare()
+            dct.prepare()
+
+            for i in selected:
+                with span('dwt'):
+                    ll = dwt.first_level_approximation(image[..., i], dtype=self._dtype)
+
+                with span('zigzag'):
+                    approximation_coefficients = zigzag.scan(ll)
+                    sub_vector_x1, sub_vector_x2 = decompose(approximation_coefficients)
+
+                # Indices are selected channel by channel in the RGB order, the same way as by RGBWatermarkExtractor
+                with span('selection'):
+                    locations = select_indices(
+                        self._selector, int(len(approximation_coefficients) / 2), channel_bits, _CHANNEL_IDS[i],
+                        self._header
+                    )
+
+                with span('dct'):
+                    delta_x = dct.transform_difference(sub_vector_x1, sub_vector_x2)[locations[order]]
+
+                # The test is evaluated after every bit, by a cumulative sum of the log-likelihood ratios of all bits
+                with span('detection'):
+                    agreement = (delta_x >= 0) == (bytes_to_bipolar_bits(watermark[..., i])[order] > 0)
+                    ratios = ratio + np.cumsum(np.where(agreement, self._agreeing, self._disagreeing))
+                    stops = np.flatnonzero((ratios >= self._upper) | (ratios <= self._lower))
+                    read = stops[0] + 1 if stops.size else channel_bits
+
+                    bits += int(read)
+                    agreeing_bits += int(np.count_nonzero(agreement[:read]))
+                    max_ratio = max(max_ratio, float(ratios[:read].max()))
+                    ratio = float(ratios[read - 1])
+
+                if stops.size:
+                    break
+
+            return Detection(
+                present=ratio >= self._upper,
+                score=agreeing_bits / bits if bits else 0.0,
+                # The likelihood ratio is a martingale without the watermark, so by Ville's inequality, its maximum
+                # exceeds 1/p with probability at most p
+                p_value=min(1.0, exp(-max_ratio)),
+                bits=bits,
+                total_bits=channel_bits * len(selected)
+            )
@@ -4,12 +4,13 @@ from abc import ABC, abstractmethod
 class ChannelExtractor(ABC):
 
     @abstractmethod
-    def extract(self, channel, watermark_size):
+    def extract(self, channel, watermark_size, channel_id=None):
         """
         Extracts watermark data from an image channel.
 
         :param channel: An image channel.
         :param watermark_size: An expected size of the extracted watermark.
+        :param channel_id: An optional identifier of the image channel, e.g. 'r', 'g' or 'b'.
         :return: Extracted watermark data.
         """
         pass
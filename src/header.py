@@ -0,0 +1,151 @@
+import struct
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from src.exceptions import HeaderError, WatermarkSizeError
+from src.indices import IndicesSelector
+from src.transformation.bipolar import bytes_to_bipolar_bits, bipolar_bits_to_bytes
+
+HEADER_VERSION = 1
+
+# Version, height and width of the watermark, followed by a checksum of them
+_FIELDS_FORMAT = '>BHH'
+_CHECKSUM_SIZE = 2
+_MAX_SIDE = 0xFFFF
+
+HEADER_SIZE_IN_BITS = (struct.calcsize(_FIELDS_FORMAT) + _CHECKSUM_SIZE) * 8
+
+# Each bit is embedded this many times and decided by the sum of all its repetitions
+_REPETITIONS = 5
+
+HEADER_COEFFICIENTS = HEADER_SIZE_IN_BITS * _REPETITIONS
+"""
+Number of DCT coefficient differences of each channel occupied by the header. The header occupies the first ones, which
+are independent of the selector, so the header is read before the selector is used.
+"""
+
+
+def _checksum(fields: bytes) -> bytes:
+    return (zlib.crc32(fields) & 0xFFFF).to_bytes(_CHECKSUM_SIZE, 'big')
+
+
+def encode_header(watermark_shape: tuple[int, int]) -> np.ndarray:
+    """
+    Encodes a header describing a watermark into bipolar bits to be embedded at the first HEADER_COEFFICIENTS
+    coefficients.
+
+    The header carries HEADER_VERSION, the watermark shape and a checksum. Each bit is repeated _REPETITIONS times and
+    the repetitions are interleaved, so that a distortion of neighbouring coefficients does not flip all of them.
+
+    :param watermark_shape: The shape of the watermark, i.e. (height, width).
+    :raises WatermarkSizeError: If a side of the watermark does not fit into the header.
+    :return: A 1D numpy array of HEADER_COEFFICIENTS int8 bipolar bits.
+    """
+    height, width = watermark_shape
+
+    if not (0 <= height <= _MAX_SIDE and 0 <= width <= _MAX_SIDE):
+        raise WatermarkSizeError(f'Sides of a watermark with a header must be at most {_MAX_SIDE}')
+
+    fields = struct.pack(_FIELDS_FORMAT, HEADER_VERSION, height, width)
+    return np.tile(bytes_to_bipolar_bits(fields + _checksum(fields)), _REPETITIONS)
+
+
+def decode_header(differences: np.ndarray) -> tuple[int, int]:
+    """
+    Decodes a header embedded by encode_header.
+
+    :param differences: A numpy array of the differences of the first HEADER_COEFFICIENTS DCT coefficients, or a stack
+    of such arrays of shape (HEADER_COEFFICIENTS, C) of channels carrying the same header, which are combined.
+    :raises HeaderError: If the differences do not carry a valid header of a supported version.
+    :return: The shape of the watermark, i.e. (height, width).
+    """
+    if len(differences) < HEADER_COEFFICIENTS:
+        raise HeaderError('The image is too small to carry a header')
+
+    votes = np.reshape(differences[:HEADER_COEFFICIENTS], (_REPETITIONS, HEADER_SIZE_IN_BITS, -1)).sum(axis=(0, 2))
+    header = bipolar_bits_to_bytes(np.where(votes >= 0, 1, -1).astype(np.int8)).tobytes()
+    fields, checksum = header[:-_CHECKSUM_SIZE], header[-_CHECKSUM_SIZE:]
+
+    if _checksum(fields) != checksum:
+        raise HeaderError('No valid header found. The watermark may have been embedded without a header.')
+
+    version, height, width = struct.unpack(_FIELDS_FORMAT, fields)
+
+    if version != HEADER_VERSION:
+        raise HeaderError(f'Unsupported header version {version}')
+
+    return height, width
+
+
+def payload_indices(
+        selector: IndicesSelector, total_range_size: int, selection_size: int, channel_id: Optional[str] = None
+) -> np.ndarray:
+    """
+    Selects indices of the watermark bits following the header, i.e. from HEADER_COEFFICIENTS to total_range_size.
+
+    :param selector: An instance of IndicesSelector spreading the watermark bits.
+    :param total_range_size: The total number of coefficients of the channel.
+    :param selection_size: The number of watermark bits.
+    :param channel_id: An optional identifier of the channel passed to the selector.
+    :raises WatermarkSizeError: If the watermark bits do not fit next to the header.
+    :return: A 1D numpy array of the selected indices.
+    """
+    if selection_size > total_range_size - HEADER_COEFFICIENTS:
+        raise WatermarkSizeError(
+            f'The watermark is too large. With a header, it may have at most '
+            f'{max(0, total_range_size - HEADER_COEFFICIENTS) // 8} values in each channel.'
+        )
+
+    indices = selector.indices(total_range_size - HEADER_COEFFICIENTS, selection_size, channel_id)
+    return np.asarray(indices, dtype=np.intp) + HEADER_COEFFICIENTS
+
+
+def select_indices(
+        selector: IndicesSelector,
+        total_range_size: int,
+        selection_size: int,
+        channel_id: Optional[str] = None,
+        header: bool = False
+) -> np.ndarray:
+    """
+    Selects indices of the watermark bits of a channel, the same way for embedding and extraction.
+
+    :param selector: An instance of IndicesSelector spreading the watermark bits.
+    :param total_range_size: The total number of coefficients of the channel.
+    :param selection_size: The number of watermark bits.
+    :param channel_id: An optional identifier of the channel passed to the selector.
+    :param header: Whether the channel carries a header, so the indices follow it, see payload_indices.
+    :raises WatermarkSizeError: If the watermark bits do not fit next to the header.
+    :return: A 1D numpy array of the selected indices.
+    """
+    if header:
+        return payload_indices(selector, total_range_size, selection_size, channel_id)
+
+    return np.asarray(selector.indices(total_range_size, selection_size, channel_id), dtype=np.intp)
+
+
+def prepend_header(
+        watermark_shape: tuple[int, int], watermark_bits: np.ndarray, indices: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Prepends bits of a header (see encode_header) and the indices of the first HEADER_COEFFICIENTS coefficients, which
+    carry it, to the bits of a watermark and their indices.
+
+    :param watermark_shape: The shape of the watermark, i.e. (height, width).
+    :param watermark_bits: A 1D numpy array of bipolar bits of the watermark, or a stack of such arrays of shape (K, C)
+    of channels, each of which is preceded by the same header.
+    :param indices: A numpy array of the indices of the watermark bits of the same shape.
+    :raises WatermarkSizeError: If a side of the watermark does not fit into the header.
+    :return: A tuple of the bits and the indices, both with the HEADER_COEFFICIENTS items of the header first.
+    """
+    header_bits = encode_header(watermark_shape)
+    header_indices = np.arange(HEADER_COEFFICIENTS)
+
+    if np.ndim(watermark_bits) > 1:
+        columns = np.shape(watermark_bits)[1]
+        header_bits = np.repeat(header_bits[:, np.newaxis], columns, axis=1)
+        header_indices = np.repeat(header_indices[:, np.newaxis], columns, axis=1)
+
+    return np.concatenate((header_bits, watermark_bits)), np.concatenate((header_indices, indices))
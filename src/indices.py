@@ -1,11 +1,15 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class IndicesSelector(ABC):
 
     @abstractmethod
-    def indices(self, total_range_size: int, selection_size: int):
+    def indices(self, total_range_size: int, selection_size: int, channel_id: Optional[str] = None):
         """
         Selects selection_size indices from 0 to total_range_size based on implementation.
+
+        :param channel_id: An optional identifier of the image channel the indices are selected for. Implementations
+        may use it to select independent indices for each channel.
         """
         pass
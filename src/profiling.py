@@ -0,0 +1,224 @@
+import threading
+import tracemalloc
+from time import perf_counter
+from typing import Callable, NamedTuple, Optional
+
+PATH_SEPARATOR = '/'
+
+
+class Span(NamedTuple):
+    """
+    A measurement of a finished stage of the pipeline, see span.
+    """
+
+    name: str
+    """
+    The name of the stage, e.g. 'dct'.
+    """
+
+    path: str
+    """
+    The names of the enclosing spans of the same thread and of this span joined by PATH_SEPARATOR, e.g. 'embed/dct'.
+    """
+
+    start: float
+    """
+    The value of time.perf_counter when the span started.
+    """
+
+    elapsed: float
+    """
+    The wall time of the span in seconds.
+    """
+
+    allocated: Optional[int]
+    """
+    The peak of memory allocated during the span above the memory allocated when it started, in bytes, or None if
+    memory is not traced by tracemalloc. NumPy arrays are traced as well.
+    """
+
+
+# Listeners are replaced rather than modified, so that spans finished by other threads iterate over a stable tuple
+_listeners: tuple[Callable[[Span], None], ...] = ()
+_local = threading.local()
+
+
+class _NoSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ('_name', '_path', '_start', '_memory')
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+
+        if stack is None:
+            stack = _local.stack = []
+
+        self._path = f'{stack[-1]._path}{PATH_SEPARATOR}{self._name}' if stack else self._name
+        self._memory = None
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+
+            # The peak is reset for this span, so the peak reached so far is handed over to the enclosing span first
+            if stack and stack[-1]._memory is not None:
+                stack[-1]._memory[1] = max(stack[-1]._memory[1], peak)
+
+            tracemalloc.reset_peak()
+            self._memory = [current, current]
+
+        stack.append(self)
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        elapsed = perf_counter() - self._start
+        stack = _local.stack
+        stack.pop()
+        allocated = None
+
+        if self._memory is not None and tracemalloc.is_tracing():
+            start, peak = self._memory
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            allocated = peak - start
+
+            if stack and stack[-1]._memory is not None:
+                stack[-1]._memory[1] = max(stack[-1]._memory[1], peak)
+
+            tracemalloc.reset_peak()
+
+        record = Span(self._name, self._path, self._start, elapsed, allocated)
+
+        for listener in _listeners:
+            listener(record)
+
+        return None
+
+
+def span(name: str):
+    """
+    Creates a context manager measuring a stage of the pipeline, e.g. the DCT of the embedding. The wall time and,
+    if tracemalloc is tracing, the allocated memory of the stage are reported to the listeners when it finishes.
+
+    Spans nest within a thread. Memory is traced process-wide, so memory of spans running concurrently in multiple
+    threads is attributed to each other.
+
+    Without listeners, a shared context manager doing nothing is returned, so that the instrumentation costs only a
+    function call and may stay in place in production.
+
+    :param name: A name of the stage, e.g. 'dct'.
+    :return: A context manager.
+    """
+    return _Span(name) if _listeners else _NO_SPAN
+
+
+def add_listener(listener: Callable[[Span], None]):
+    """
+    Registers a function called with every finished span, in the thread that ran the span.
+
+    :param listener: A callable taking a Span. It must be thread-safe if spans run in multiple threads.
+    """
+    global _listeners
+    _listeners = _listeners + (listener,)
+
+
+def remove_listener(listener: Callable[[Span], None]):
+    """
+    Unregisters a function registered by add_listener.
+
+    :param listener: The registered callable.
+    :raises ValueError: If the listener is not registered.
+    """
+    global _listeners
+    listeners = list(_listeners)
+    listeners.remove(listener)
+    _listeners = tuple(listeners)
+
+
+class Profiler:
+    """
+    A context manager collecting all spans finished while it is active, in any thread.
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        """
+        Creates a new instance.
+
+        :param trace_memory: Whether to trace the allocated memory by tracemalloc, if it is not tracing already. It
+        slows down allocations of Python objects, but not the computations of NumPy.
+        """
+        self._trace_memory = trace_memory
+        self._started_tracing = False
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._start = None
+        self._elapsed = None
+
+    @property
+    def spans(self) -> list[Span]:
+        """
+        :return: The collected spans in the order they finished.
+        """
+        with self._lock:
+            return list(self._spans)
+
+    def _collect(self, record: Span):
+        with self._lock:
+            self._spans.append(record)
+
+    def __enter__(self):
+        if self._trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        add_listener(self._collect)
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self._elapsed = perf_counter() - self._start
+        remove_listener(self._collect)
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self) -> dict:
+        """
+        Summarizes the collected spans.
+
+        :return: A JSON serializable dictionary with:
+        - elapsed: The wall time the profiler was active in seconds.
+        - stages: For each span path in the order the paths first finished, the number of spans, their total wall time
+          in seconds and the largest allocated memory in bytes (None if not traced).
+        - spans: All collected spans in the order they finished, with their start relative to the profiler start.
+        """
+        stages = {}
+        spans = self.spans
+
+        for record in spans:
+            stage = stages.setdefault(record.path, {'count': 0, 'elapsed': 0.0, 'allocated': None})
+            stage['count'] += 1
+            stage['elapsed'] += record.elapsed
+
+            if record.allocated is not None:
+                stage['allocated'] = max(stage['allocated'] or 0, record.allocated)
+
+        return {
+            'elapsed': self._elapsed,
+            'stages': stages,
+            'spans': [record._replace(start=record.start - self._start)._asdict() for record in spans],
+        }
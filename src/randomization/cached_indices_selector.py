@@ -0,0 +1,61 @@
+from copy import deepcopy
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from src.indices import IndicesSelector
+from src.randomization.selection import create_indices_selector
+
+_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def _cached_selection(
+        seed: int, selection: str, calls: tuple[tuple[int, int, Optional[str]], ...]
+) -> tuple[np.ndarray, IndicesSelector]:
+    # Indices of stateful selectors depend on the previous calls, so the last call is made by a copy of the selector
+    # left by the cached previous calls, rather than replaying all of them. The cached selectors are only copied.
+    if len(calls) > 1:
+        selector = deepcopy(_cached_selection(seed, selection, calls[:-1])[1])
+    else:
+        selector = create_indices_selector(seed, selection)
+
+    indices = np.asarray(selector.indices(*calls[-1]), dtype=np.intp)
+    indices.setflags(write=False)
+    return indices, selector
+
+
+class CachedIndicesSelector(IndicesSelector):
+    """
+    A class for selecting the same indices as a fresh selector created by create_indices_selector, but from a cache
+    shared by all instances.
+
+    The cache is keyed by the seed, the selection and the whole sequence of calls of the instance, so even the indices
+    of stateful selectors (e.g. PermutationIndicesSelector), which depend on the previous calls, are reproduced exactly.
+    It pays off for long-running processes that select indices for many equally sized images.
+    """
+
+    def __init__(self, seed: int, selection: str):
+        """
+        Creates a new instance.
+
+        :param seed: A seed of the selector, see create_indices_selector.
+        :param selection: A name of the selection, see create_indices_selector.
+        """
+        self._seed = seed
+        self._selection = selection
+        self._calls = ()
+
+    def indices(self, total_range_size: int, selection_size: int, channel_id: Optional[str] = None) -> np.ndarray:
+        """
+        Selects the indices the fresh selector would select after the same sequence of calls.
+
+        :param total_range_size: The total size of the range from which to select indices.
+        :param selection_size: The number of indices to select.
+        :param channel_id: An identifier of the channel, e.g. 'r', 'g' or 'b'.
+        :return: A read-only 1D numpy array of the selected indices.
+        """
+        self._calls += ((total_range_size, selection_size, channel_id),)
+        indices, _ = _cached_selection(self._seed, self._selection, self._calls)
+        return indices
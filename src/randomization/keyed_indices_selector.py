@@ -0,0 +1,58 @@
+from typing import Optional
+
+import numpy as np
+
+from src.indices import IndicesSelector
+
+
+def _channel_key(channel_id: Optional[str]) -> int:
+    return int.from_bytes(channel_id.encode('utf-8'), 'big') if channel_id else 0
+
+
+class KeyedIndicesSelector(IndicesSelector):
+    """
+    A class for selecting a permutation of indices derived from a seed and the selection parameters only.
+
+    Unlike PermutationIndicesSelector, it keeps no random number generator state between calls. Each call creates a
+    counter-based (Philox) generator keyed by the seed, channel identifier, range size and selection size, so the
+    indices of a channel do not depend on whether or in which order other channels were processed. A single instance
+    may therefore be shared across threads.
+    """
+
+    def __init__(self, seed: Optional[int]):
+        """
+        Creates a new instance.
+
+        :param seed: A non-negative seed the indices are derived from. If None, fresh entropy is drawn once and used
+        for the whole lifetime of the instance.
+        """
+        self._entropy = np.random.SeedSequence(seed).entropy
+
+    def indices(self, total_range_size: int, selection_size: int, channel_id: Optional[str] = None) -> np.ndarray:
+        """
+        Selects permuted indices based on the seed, channel identifier, range and selection size. Equal arguments
+        always yield equal indices.
+
+        :param total_range_size: The total size of the range from which to select indices.
+        :param selection_size: The number of indices to select. If larger than the total_range_size, the effective
+        selection will be adjusted to total_range_size.
+        :param channel_id: An identifier of the channel, e.g. 'r', 'g' or 'b'. Different channels get independent
+        indices.
+        :return: A 1D numpy array of permuted indices selected from the specified range.
+        """
+        if total_range_size == 0 or selection_size == 0:
+            return np.empty(0, dtype=np.intp)
+
+        effective_selection = min(selection_size, total_range_size)
+
+        key = np.random.SeedSequence(
+            self._entropy,
+            spawn_key=(_channel_key(channel_id), total_range_size, selection_size)
+        )
+        rng = np.random.Generator(np.random.Philox(key))
+
+        lower_bound = rng.integers(0, total_range_size - effective_selection, endpoint=True)
+        upper_bound = rng.integers(lower_bound + effective_selection, total_range_size, endpoint=True)
+
+        sampled_offsets = rng.choice(upper_bound - lower_bound, effective_selection, replace=False)
+        return (lower_bound + sampled_offsets).astype(np.intp)
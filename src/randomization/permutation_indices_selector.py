@@ -3,6 +3,7 @@ from typing import Optional
 import numpy as np
 
 from src.indices import IndicesSelector
+from src.randomization.selection import SelectionMode
 
 
 class PermutationIndicesSelector(IndicesSelector):
@@ -10,25 +11,34 @@ class PermutationIndicesSelector(IndicesSelector):
     A class for selecting a permutation of indices from a specified range.
     """
 
-    def __init__(self, seed: Optional[int]):
+    def __init__(self, seed: Optional[int], mode: SelectionMode = SelectionMode.COMPATIBLE):
         """
         Creates a new instance.
 
         :param seed: A seed for the random number generator.
+        :param mode: A selection mode. SelectionMode.COMPATIBLE (default) yields the same list of indices as previous
+        versions, so existing watermarks can still be extracted. SelectionMode.SPARSE costs memory and time
+        proportional to the selection size only and yields a numpy array, but selects different indices.
         """
         self._rng = np.random.default_rng(seed)
+        self._mode = SelectionMode(mode)
 
-    def indices(self, total_range_size: int, selection_size: int) -> list[int]:
+    def indices(
+            self, total_range_size: int, selection_size: int, channel_id: Optional[str] = None
+    ) -> list[int] | np.ndarray:
         """
-        Randomly selects a list of permuted indices based on the specified range and selection size.
+        Randomly selects permuted indices based on the specified range and selection size.
 
         :param total_range_size: The total size of the range from which to select indices.
         :param selection_size: The number of indices to select. If larger than the total_range_size, the effective
         selection will be adjusted to total_range_size.
-        :return: A list of permuted indices selected from the specified range.
+        :param channel_id: Ignored. Indices depend on the order of calls instead, as all calls share a single random
+        number generator.
+        :return: Permuted indices selected from the specified range. A list in the compatible mode, a 1D numpy array
+        in the sparse mode.
         """
         if total_range_size == 0 or selection_size == 0:
-            return []
+            return [] if self._mode == SelectionMode.COMPATIBLE else np.empty(0, dtype=np.intp)
 
         effective_selection = selection_size
         if selection_size > total_range_size:
@@ -39,5 +49,12 @@ class PermutationIndicesSelector(IndicesSelector):
         lower_bound = self._rng.integers(0, lower_bound_limit, endpoint=True)
         upper_bound = self._rng.integers(lower_bound + effective_selection, total_range_size, endpoint=True)
 
-        permuted_indices = [i.item() for i in self._rng.permutation(list(range(lower_bound, upper_bound)))]
-        return permuted_indices[0:effective_selection]
+        if self._mode == SelectionMode.COMPATIBLE:
+            # Shuffling does not depend on the values, so permuting offsets gives the same order as permuting the window
+            permuted_offsets = self._rng.permutation(upper_bound - lower_bound)[0:effective_selection]
+            return (lower_bound + permuted_offsets).tolist()
+
+        # Generator.choice samples sparse selections by Floyd's algorithm and shuffles only windows that are at most
+        # a small multiple of the selection, so both time and memory stay proportional to the selection size
+        sampled_offsets = self._rng.choice(upper_bound - lower_bound, effective_selection, replace=False)
+        return (lower_bound + sampled_offsets).astype(np.intp)
@@ -0,0 +1,43 @@
+from enum import Enum
+
+from src.indices import IndicesSelector
+
+
+class SelectionMode(str, Enum):
+    """
+    Strategies of selecting indices from the randomly chosen window of the range.
+    """
+
+    COMPATIBLE = 'compatible'
+    """
+    Permutes the whole window and takes its beginning. Reproduces indices of watermarks embedded by previous versions.
+    """
+
+    SPARSE = 'sparse'
+    """
+    Samples the indices from the window without replacement, without materializing the window.
+    """
+
+
+KEYED_SELECTION = 'keyed'
+SELECTIONS = [mode.value for mode in SelectionMode] + [KEYED_SELECTION]
+
+
+def create_indices_selector(seed: int, selection: str) -> IndicesSelector:
+    """
+    Creates an indices selector by the name of the selection.
+
+    :param seed: A seed of the selector.
+    :param selection: One of SELECTIONS, i.e. a SelectionMode value for PermutationIndicesSelector or KEYED_SELECTION
+    for KeyedIndicesSelector.
+    :raises ValueError: If the selection is unknown.
+    :return: A new instance of IndicesSelector.
+    """
+    # Selections are command line options, so the selectors and NumPy are not imported until a selector is created
+    from src.randomization.keyed_indices_selector import KeyedIndicesSelector
+    from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+
+    if selection == KEYED_SELECTION:
+        return KeyedIndicesSelector(seed)
+
+    return PermutationIndicesSelector(seed, SelectionMode(selection))
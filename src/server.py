@@ -0,0 +1,155 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http import HTTPStatus
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Optional
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from src.client import EMBED_PATH, EXTRACT_PATH
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.exceptions import WatermarkSizeError, ImageChannelError
+from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+from src.randomization.cached_indices_selector import CachedIndicesSelector
+from src.transformation.image import decode_image_array, encode_image_array
+from src.transformation.precision import Precision
+
+_WATERMARK_CACHE_SIZE = 16
+
+
+@lru_cache(maxsize=_WATERMARK_CACHE_SIZE)
+def _decode_watermark(data: bytes) -> np.ndarray:
+    watermark = decode_image_array(data)
+    watermark.setflags(write=False)
+    return watermark
+
+
+def _parameter(parameters: dict[str, str], name: str, parse: Callable = str):
+    if name not in parameters:
+        raise ValueError(f'Missing parameter {name}')
+
+    try:
+        return parse(parameters[name])
+    except ValueError:
+        raise ValueError(f'Invalid value of parameter {name}')
+
+
+def _parse_shape(value: str) -> tuple[int, int]:
+    width, height = tuple([int(x) for x in value.split('x', 1)])
+    return height, width
+
+
+def _embed(parameters: dict[str, str], body: bytes) -> bytes:
+    watermark_length = _parameter(parameters, 'watermark_length', int)
+
+    if not 0 < watermark_length < len(body):
+        raise ValueError('Invalid value of parameter watermark_length')
+
+    # The watermark precedes the image in the body. Decoded watermarks are cached by their content.
+    watermark = _decode_watermark(body[:watermark_length])
+    image = decode_image_array(memoryview(body)[watermark_length:])
+
+    embedder = BlindDwtDctStackedEmbedder(
+        _parameter(parameters, 'gain', float),
+        CachedIndicesSelector(_parameter(parameters, 'seed', int), _parameter(parameters, 'selection')),
+        _parameter(parameters, 'channels'),
+        _parameter(parameters, 'precision', Precision)
+    )
+
+    return encode_image_array(embedder.embed(image, watermark), _parameter(parameters, 'format'))
+
+
+def _extract(parameters: dict[str, str], body: bytes) -> bytes:
+    extractor = BlindDwtDctStackedExtractor(
+        CachedIndicesSelector(_parameter(parameters, 'seed', int), _parameter(parameters, 'selection')),
+        _parameter(parameters, 'channels'),
+        precision=_parameter(parameters, 'precision', Precision)
+    )
+
+    watermark = extractor.extract(decode_image_array(body), _parameter(parameters, 'shape', _parse_shape))
+    return encode_image_array(watermark, _parameter(parameters, 'format'))
+
+
+_OPERATIONS = {EMBED_PATH: _embed, EXTRACT_PATH: _extract}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        operation = _OPERATIONS.get(url.path)
+
+        if operation is None:
+            self._respond(HTTPStatus.NOT_FOUND, f'Unknown operation {url.path}'.encode())
+            return
+
+        try:
+            parameters = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._respond(HTTPStatus.OK, operation(parameters, body))
+
+        except (ImageChannelError, WatermarkSizeError) as e:
+            self._respond(HTTPStatus.UNPROCESSABLE_ENTITY, str(e).encode())
+
+        except ValueError as e:
+            self._respond(HTTPStatus.BAD_REQUEST, str(e).encode())
+
+        except OSError:
+            self._respond(HTTPStatus.BAD_REQUEST, b'Cannot decode image')
+
+        except Exception as e:
+            # Unexpected errors are answered as well, so that the client gets a message rather than a closed connection
+            self.log_error('Failed to process %s: %r', url.path, e)
+            self._respond(HTTPStatus.INTERNAL_SERVER_ERROR, f'Internal server error: {e}'.encode())
+
+    def _respond(self, status: HTTPStatus, content: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream' if status == HTTPStatus.OK else 'text/plain')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class WatermarkServer(HTTPServer):
+    """
+    A HTTP server embedding/extracting watermarks to/from images posted by WatermarkClient.
+
+    Requests are served concurrently by a pool of worker threads. The server stays warm between requests: modules are
+    imported once, and zigzag plans, selected indices and decoded watermarks are cached, so small images are processed
+    without the startup cost of the command line tool.
+
+    Requests are POSTed to EMBED_PATH or EXTRACT_PATH with the parameters in the query and images in the body:
+    - Embedding takes the seed, gain, channels, selection, precision and format parameters, and a watermark_length
+      parameter giving the length of the watermark image file, which precedes the input image file in the body.
+    - Extraction takes the seed, channels, selection, precision, shape (WxH) and format parameters, and the input
+      image file in the body.
+    The response body is an image file of the given format (a file extension, e.g. 'png'). Invalid requests are
+    answered by status 400, watermarks that do not fit the image by status 422 and unexpected failures by status 500,
+    all with an error message in the body.
+    """
+
+    def __init__(self, address: tuple[str, int], workers: Optional[int] = None):
+        """
+        Creates a new instance listening on the given address.
+
+        :param address: A pair of the host and port, e.g. ('127.0.0.1', 8765). Port 0 selects any free port.
+        :param workers: A number of worker threads. If None, ThreadPoolExecutor chooses it by the number of CPUs.
+        """
+        super().__init__(address, _RequestHandler)
+        self._executor = ThreadPoolExecutor(workers)
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown()
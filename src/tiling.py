@@ -0,0 +1,28 @@
+import numpy as np
+
+
+def tiles(shape: tuple[int, ...], tile_size: int) -> list[tuple[slice, slice]]:
+    """
+    Splits the first two dimensions of a shape into a grid of tiles. The grid depends on the shape and tile size only,
+    so the same tiles are obtained for embedding and extraction.
+
+    Tiles have at least tile_size rows and columns (unless the whole shape is smaller) and less than twice as many.
+    Instead of leaving small remnants at the edges, the remaining rows and columns are spread evenly over the tiles.
+
+    :param shape: A shape of the tiled array, e.g. (height, width, channels).
+    :param tile_size: A minimal size of a tile in both dimensions.
+    :return: A list of tiles in row-major order, each given by a pair of row and column slices.
+    """
+    if tile_size < 1:
+        raise ValueError('Tile size must be positive')
+
+    height, width = shape[0:2]
+
+    row_bounds = np.linspace(0, height, max(1, height // tile_size) + 1).astype(int).tolist()
+    col_bounds = np.linspace(0, width, max(1, width // tile_size) + 1).astype(int).tolist()
+
+    return [
+        (slice(row_bounds[i], row_bounds[i + 1]), slice(col_bounds[j], col_bounds[j + 1]))
+        for i in range(len(row_bounds) - 1)
+        for j in range(len(col_bounds) - 1)
+    ]
@@ -1,3 +1,9 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from src.transformation.registry import Registry
+
 _BITS_IN_BYTE = 8
 
 
@@ -45,3 +51,92 @@ def bipolar_bits_to_vector(bipolar_bits: list[int]) -> list[int]:
         int("".join(map(str, bits[i:i + _BITS_IN_BYTE])), 2)
         for i in range(0, len(bits), _BITS_IN_BYTE)
     ]
+
+
+class BitCodec(ABC):
+    """
+    An interface of a backend converting bytes to bipolar bits and back, see BACKENDS and the functions of this module.
+    """
+
+    @abstractmethod
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        """
+        :param data: A 1D numpy array of uint8 values.
+        :return: A 1D numpy array of int8 bipolar bits, 8 bits for each input byte, most significant bit first.
+        """
+        pass
+
+    @abstractmethod
+    def decode(self, bipolar_bits: np.ndarray) -> np.ndarray:
+        """
+        :param bipolar_bits: A 1D numpy array of bipolar bits, where each element is either -1 or 1.
+        :return: A 1D numpy array of uint8 values, see bipolar_bits_to_bytes.
+        """
+        pass
+
+
+class _PackedBitCodec(BitCodec):
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        bits = np.unpackbits(data).view(np.int8)
+        return 2 * bits - 1
+
+    def decode(self, bipolar_bits: np.ndarray) -> np.ndarray:
+        return np.packbits(bipolar_bits > 0)
+
+
+class _ListBitCodec(BitCodec):
+    """
+    Converts the values by the list functions of this module. An incomplete trailing byte is padded on the right.
+    """
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        return np.array(vector_to_bipolar_bits(data.tolist()), dtype=np.int8)
+
+    def decode(self, bipolar_bits: np.ndarray) -> np.ndarray:
+        padding = -len(bipolar_bits) % _BITS_IN_BYTE
+        bipolar_bits = np.concatenate((np.where(bipolar_bits > 0, 1, -1), np.full(padding, -1)))
+        return np.array(bipolar_bits_to_vector(bipolar_bits.tolist()), dtype=np.uint8)
+
+
+BACKENDS: Registry[BitCodec] = Registry('bits', reference='list')
+"""
+Registered backends of the conversion between bytes and bipolar bits. The list functions are the reference, while
+vectorized bit (un)packing by NumPy is selected by default.
+"""
+
+BACKENDS.register('numpy', _PackedBitCodec())
+BACKENDS.register('list', _ListBitCodec(), tunable=False)
+
+
+def bytes_to_bipolar_bits(data: np.ndarray | bytes | memoryview) -> np.ndarray:
+    """
+    Converts bytes into a numpy array of bipolar bits by the backend selected in BACKENDS. By default, the bits are
+    unpacked vectorized.
+
+    Each bit of the input bytes is transformed, most significant bit first, such that:
+    - A bit value of 0 is converted to -1
+    - A bit value of 1 is converted to 1
+
+    :param data: A numpy array of values in range 0 - 255 (of any shape, flattened in row-major order), or a bytes-like
+    object.
+    :return: A 1D numpy array of int8 bipolar bits, 8 bits for each input byte.
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(data, dtype=np.uint8)
+
+    return BACKENDS.get().encode(np.asarray(data, dtype=np.uint8).reshape(-1))
+
+
+def bipolar_bits_to_bytes(bipolar_bits: np.ndarray) -> np.ndarray:
+    """
+    Converts a numpy array of bipolar bits into a numpy array of bytes by the backend selected in BACKENDS. By default,
+    the bits are packed vectorized.
+
+    Positive bipolar bits are converted to 1 and the others to 0. The resulting bits are then grouped into bytes,
+    most significant bit first. An incomplete trailing byte is padded with zero bits on the right.
+
+    :param bipolar_bits: A 1D numpy array of bipolar bits, where each element is either -1 or 1.
+    :return: A 1D numpy array of uint8 values created from the bipolar bits.
+    """
+    return BACKENDS.get().decode(np.asarray(bipolar_bits))
@@ -1,5 +1,3 @@
-from itertools import zip_longest
-
 import numpy as np
 
 
@@ -7,27 +5,35 @@ def decompose(vector: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
     """
     Decomposes a 1D numpy array into two separate arrays containing the even-indexed and odd-indexed elements.
 
-    :param vector: A 1D numpy array to be decomposed.
+    A stack of vectors of shape (N, C) is decomposed along the first axis.
+
+    :param vector: A 1D (or stacked 2D) numpy array to be decomposed.
     :return: Tuple of two numpy arrays. The first array contains elements from the even indices and the second array
     contains elements from the odd indices of the input array.
     """
     return vector[0::2], vector[1::2]
 
 
-def compose(even_items: np.ndarray, odd_items: np.ndarray) -> list:
+def compose(even_items: np.ndarray, odd_items: np.ndarray) -> np.ndarray:
     """
-    Combines two numpy arrays of even-indexed and odd-indexed items into a single list, maintaining the original order.
+    Combines two numpy arrays of even-indexed and odd-indexed items into a single array, maintaining the original
+    order.
 
-    The function interleaves elements from both arrays, filling in gaps from the shorter array with `None`, which are
-    then excluded from the final output.
+    The function interleaves elements from both arrays along the first axis. The array of even-indexed items may be
+    one element longer than the array of odd-indexed items.
 
     :param even_items: A numpy array containing the even-indexed items.
     :param odd_items: A numpy array containing the odd-indexed items.
-    :return: A list of integers formed by interleaving the elements of `even_items` and `odd_items`.
+    :return: A numpy array formed by interleaving the elements of `even_items` and `odd_items`.
     """
-    return [
-        item
-        for zipped in zip_longest(even_items, odd_items)
-        for item in zipped
-        if item is not None
-    ]
+    even_items = np.asarray(even_items)
+    odd_items = np.asarray(odd_items)
+
+    items = np.empty(
+        (len(even_items) + len(odd_items),) + even_items.shape[1:],
+        dtype=np.result_type(even_items, odd_items)
+    )
+    items[0::2] = even_items
+    items[1::2] = odd_items
+
+    return items
@@ -1,22 +1,167 @@
+from abc import ABC, abstractmethod
+
 import numpy as np
-from scipy.fft import dct, idct
+
+from src.profiling import span
+from src.transformation.registry import Registry
 
 
-def transform(vector: np.ndarray) -> np.ndarray:
+class DctImplementation(ABC):
+    """
+    An interface of a backend of the Discrete Cosine Transform (DCT) with the 'ortho' normalization, see BACKENDS.
     """
-    Applies the Discrete Cosine Transform (DCT) with the 'ortho' normalization to the input vector.
 
-    :param vector: A 1D numpy array to be transformed using the DCT.
-    :return: A 1D numpy array containing the DCT coefficients of the input array.
+    @abstractmethod
+    def transform(self, vector: np.ndarray, axis: int) -> np.ndarray:
+        """
+        :param vector: A numpy array to be transformed.
+        :param axis: The axis along which the transform is computed.
+        :return: A numpy array of the same shape containing the DCT coefficients. Single-precision input yields
+        single-precision coefficients, other input double-precision ones.
+        """
+        pass
+
+    @abstractmethod
+    def inverse(self, coefficients: np.ndarray, axis: int) -> np.ndarray:
+        """
+        :param coefficients: A numpy array of DCT coefficients to be transformed back.
+        :param axis: The axis along which the transform is computed.
+        :return: A numpy array of the same shape and data type promotion as by transform.
+        """
+        pass
+
+    def prepare(self):
+        """
+        Imports the modules the backend needs, so that they are not imported by the first transform. Backends needing
+        no lazily imported modules do not need to override it.
+        """
+        pass
+
+
+class _ScipyDct(DctImplementation):
+
+    def prepare(self):
+        import scipy.fft
+
+    def transform(self, vector: np.ndarray, axis: int) -> np.ndarray:
+        # SciPy takes long to import and the NumPy backend does not need it, so it is imported lazily
+        from scipy.fft import dct
+
+        return dct(vector, norm='ortho', axis=axis)
+
+    def inverse(self, coefficients: np.ndarray, axis: int) -> np.ndarray:
+        from scipy.fft import idct
+
+        return idct(coefficients, norm='ortho', axis=axis)
+
+
+def _coefficient_dtype(dtype: np.dtype) -> np.dtype:
+    # The same promotion as by SciPy: floats are kept in at least single precision, other types become doubles
+    return np.result_type(dtype, np.float32) if np.dtype(dtype).kind == 'f' else np.dtype(np.float64)
+
+
+class _NumpyDct(DctImplementation):
+    """
+    Computes the transforms by a single complex FFT of NumPy of the same length (Makhoul's algorithm), so SciPy is not
+    needed. Even items of the vector followed by the reversed odd items are transformed, and the coefficients are
+    obtained by rotating the FFT by a quarter of a sample.
     """
-    return dct(vector, norm='ortho')
 
+    def transform(self, vector: np.ndarray, axis: int) -> np.ndarray:
+        vector = np.moveaxis(np.asarray(vector), axis, 0)
+        size = len(vector)
+
+        spectrum = np.fft.fft(np.concatenate((vector[0::2], vector[1::2][::-1])), axis=0)
+        spectrum *= self._twiddles(size, vector.ndim, -1)
+
+        coefficients = spectrum.real.astype(_coefficient_dtype(vector.dtype))
+        coefficients *= np.sqrt(2 / size)
+        coefficients[0] /= np.sqrt(2)
+
+        return np.moveaxis(coefficients, 0, axis)
+
+    def inverse(self, coefficients: np.ndarray, axis: int) -> np.ndarray:
+        coefficients = np.moveaxis(np.asarray(coefficients), axis, 0)
+        size = len(coefficients)
+
+        # The FFT of the reordered vector is recovered from the real parts of its rotation, which are the unnormalized
+        # coefficients, as the rotated FFT has the mirrored coefficients (times -1) as its imaginary parts
+        scaled = coefficients * np.sqrt(size / 2)
+        scaled[0] *= np.sqrt(2)
+        spectrum = scaled.astype(np.complex128)
+        spectrum[1:] -= 1j * scaled[:0:-1]
+        spectrum *= self._twiddles(size, coefficients.ndim, 1)
+
+        reordered = np.fft.ifft(spectrum, axis=0).real
+        vector = np.empty(coefficients.shape, dtype=_coefficient_dtype(coefficients.dtype))
+        vector[0::2] = reordered[:(size + 1) // 2]
+        vector[1::2] = reordered[(size + 1) // 2:][::-1]
 
-def inverse(coefficients: np.ndarray) -> np.ndarray:
+        return np.moveaxis(vector, 0, axis)
+
+    @staticmethod
+    def _twiddles(size: int, ndim: int, sign: int) -> np.ndarray:
+        twiddles = np.exp(sign * 1j * np.pi * np.arange(size) / (2 * size))
+        return twiddles.reshape((-1,) + (1,) * (ndim - 1))
+
+
+BACKENDS: Registry[DctImplementation] = Registry('dct', reference='scipy')
+"""
+Registered backends of the DCT. SciPy is the reference and selected by default, NumPy is an alternative that does not
+need SciPy.
+"""
+
+BACKENDS.register('scipy', _ScipyDct())
+BACKENDS.register('numpy', _NumpyDct())
+
+
+def prepare():
+    """
+    Prepares the backend selected in BACKENDS, e.g. imports SciPy for it. The preparation is profiled as an 'import'
+    span, so that the import is not attributed to the 'dct' span of the first transform.
+    """
+    with span('import'):
+        BACKENDS.get().prepare()
+
+
+def transform(vector: np.ndarray, axis: int = 0) -> np.ndarray:
+    """
+    Applies the Discrete Cosine Transform (DCT) with the 'ortho' normalization to the input vector. The transform is
+    computed by the backend selected in BACKENDS.
+
+    :param vector: A 1D numpy array to be transformed using the DCT, or a stack of such vectors.
+    :param axis: The axis along which the transform is computed. Defaults to the first axis, so a stack of vectors
+    of shape (N, C) is transformed column by column.
+    :return: A numpy array of the same shape containing the DCT coefficients of the input array.
+    """
+    return BACKENDS.get().transform(vector, axis)
+
+
+def inverse(coefficients: np.ndarray, axis: int = 0) -> np.ndarray:
     """
-    Applies the Inverse Discrete Cosine Transform (IDCT) with the 'ortho' normalization to the input vector.
+    Applies the Inverse Discrete Cosine Transform (IDCT) with the 'ortho' normalization to the input vector. The
+    transform is computed by the backend selected in BACKENDS.
 
-    :param coefficients: A 1D numpy array containing DCT coefficients to be transformed back.
-    :return: A 1D numpy array containing the reconstructed vector from the DCT coefficients.
+    :param coefficients: A 1D numpy array containing DCT coefficients to be transformed back, or a stack of such
+    vectors.
+    :param axis: The axis along which the transform is computed. Defaults to the first axis.
+    :return: A numpy array of the same shape containing the reconstructed vector from the DCT coefficients.
     """
-    return idct(coefficients, norm='ortho')
+    return BACKENDS.get().inverse(coefficients, axis)
+
+
+def transform_difference(vector1: np.ndarray, vector2: np.ndarray) -> np.ndarray:
+    """
+    Computes the differences of the first len(vector2) DCT coefficients of two vectors. As the DCT is linear, vectors
+    of equal length are subtracted first and only their difference is transformed.
+
+    :param vector1: A 1D numpy array, or a stack of such vectors of shape (N, C).
+    :param vector2: A 1D numpy array, or a stack of such vectors, of the same or by one smaller length.
+    :return: A numpy array of the shape of vector2 containing the differences of the DCT coefficients.
+    """
+    if len(vector1) == len(vector2):
+        return transform(np.subtract(vector1, vector2))
+
+    # A trailing coefficient of the longer vector has no counterpart
+    return transform(vector1)[:len(vector2)] - transform(vector2)
+
@@ -1,35 +1,294 @@
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Optional
+
 import numpy as np
-from pywt import wavedec2, waverec2
 
+from src.profiling import span
+from src.transformation.registry import Registry
+
+
+class DwtBackend(str, Enum):
+    """
+    Names of the built-in backends of the single-level 2D Haar discrete wavelet transform, see BACKENDS.
+    """
+
+    HAAR = 'haar'
+    """
+    Computes the coefficients by NumPy arithmetic on 2x2 blocks. Approximations are computed without the detail
+    coefficients.
+    """
+
+    PYWT = 'pywt'
+    """
+    Computes the coefficients by PyWavelets, which needs to be installed. Approximations are computed by the full
+    decomposition and the detail coefficients are discarded.
+    """
+
+
+def _coefficient_dtype(dtype: np.dtype) -> np.dtype:
+    # The same promotion as by PyWavelets: floats are kept in at least single precision, other types become doubles
+    return np.result_type(dtype, np.float32) if np.dtype(dtype).kind == 'f' else np.dtype(np.float64)
+
+
+def _pad_to_even(data: np.ndarray) -> np.ndarray:
+    height, width = data.shape[0:2]
 
-def first_level(data: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    if height % 2 or width % 2:
+        # Repeating the last row or column is equivalent to the symmetric padding of the Haar wavelet by PyWavelets
+        padding = ((0, height % 2), (0, width % 2)) + ((0, 0),) * (data.ndim - 2)
+        data = np.pad(data, padding, mode='edge')
+
+    return data
+
+
+class DwtImplementation(ABC):
+    """
+    An interface of a backend of the single-level 2D Haar discrete wavelet transform, see BACKENDS and the functions
+    of this module of the same names.
+    """
+
+    @abstractmethod
+    def first_level(
+            self, data: np.ndarray, out: Optional[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        pass
+
+    @abstractmethod
+    def first_level_inverse(
+            self, ll: np.ndarray, hl: np.ndarray, lh: np.ndarray, hh: np.ndarray, out: Optional[np.ndarray]
+    ) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def first_level_approximation(self, data: np.ndarray, dtype: np.dtype) -> np.ndarray:
+        pass
+
+    def prepare(self):
+        """
+        Imports the modules the backend needs, so that they are not imported by the first transform. Backends needing
+        no lazily imported modules do not need to override it.
+        """
+        pass
+
+
+class _HaarDwt(DwtImplementation):
+
+    def first_level(
+            self, data: np.ndarray, out: Optional[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        data = _pad_to_even(data)
+        top_left, top_right = data[0::2, 0::2], data[0::2, 1::2]
+        bottom_left, bottom_right = data[1::2, 0::2], data[1::2, 1::2]
+
+        if out is None:
+            dtype = _coefficient_dtype(data.dtype)
+            out = tuple(np.empty(top_left.shape, dtype=dtype) for _ in range(4))
+
+        ll, hl, lh, hh = out
+
+        # Sums and differences of the rows of each block are combined into the bands by their sums and differences.
+        # The ufuncs compute in the data type of the bands, so that integer input does not overflow.
+        scratch = np.add(bottom_left, bottom_right, dtype=ll.dtype)
+        np.add(top_left, top_right, out=ll, dtype=ll.dtype)
+        np.subtract(ll, scratch, out=hl)
+        ll += scratch
+
+        np.subtract(bottom_left, bottom_right, out=scratch, dtype=scratch.dtype)
+        np.subtract(top_left, top_right, out=lh, dtype=lh.dtype)
+        np.subtract(lh, scratch, out=hh)
+        lh += scratch
+
+        for band in out:
+            band /= 2
+
+        return ll, hl, lh, hh,
+
+    def first_level_inverse(
+            self, ll: np.ndarray, hl: np.ndarray, lh: np.ndarray, hh: np.ndarray, out: Optional[np.ndarray]
+    ) -> np.ndarray:
+        if out is None:
+            shape = (2 * ll.shape[0], 2 * ll.shape[1]) + ll.shape[2:]
+            out = np.empty(shape, dtype=_coefficient_dtype(np.result_type(ll, hl, lh, hh)))
+
+        # Each item of a block is a half of a signed sum of the four coefficients of the block
+        upper = np.add(ll, hl, dtype=out.dtype)
+        detail = np.add(lh, hh, dtype=out.dtype)
+        np.add(upper, detail, out=out[0::2, 0::2])
+        np.subtract(upper, detail, out=out[0::2, 1::2])
+
+        lower = np.subtract(ll, hl, out=upper, dtype=out.dtype)
+        np.subtract(lh, hh, out=detail, dtype=out.dtype)
+        np.add(lower, detail, out=out[1::2, 0::2])
+        np.subtract(lower, detail, out=out[1::2, 1::2])
+
+        out /= 2
+        return out
+
+    def first_level_approximation(self, data: np.ndarray, dtype: np.dtype) -> np.ndarray:
+        data = _pad_to_even(data)
+
+        ll = data[0::2, 0::2].astype(dtype)
+        ll += data[0::2, 1::2]
+        ll += data[1::2, 0::2]
+        ll += data[1::2, 1::2]
+        ll /= 2
+
+        return ll
+
+
+class _PywtDwt(DwtImplementation):
+
+    def prepare(self):
+        import pywt
+
+    def first_level(
+            self, data: np.ndarray, out: Optional[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # PyWavelets takes long to import and the default backend does not need it, so it is imported lazily
+        from pywt import wavedec2
+
+        ll, detail_coefficients = wavedec2(data, 'haar', level=1, axes=(0, 1))
+        hl, lh, hh = detail_coefficients
+
+        if out is None:
+            return ll, hl, lh, hh,
+
+        for band, coefficients in zip(out, (ll, hl, lh, hh)):
+            np.copyto(band, coefficients)
+
+        return out
+
+    def first_level_inverse(
+            self, ll: np.ndarray, hl: np.ndarray, lh: np.ndarray, hh: np.ndarray, out: Optional[np.ndarray]
+    ) -> np.ndarray:
+        from pywt import waverec2
+
+        data = waverec2((ll, (hl, lh, hh)), 'haar', axes=(0, 1))
+
+        if out is None:
+            return data
+
+        np.copyto(out, data)
+        return out
+
+    def first_level_approximation(self, data: np.ndarray, dtype: np.dtype) -> np.ndarray:
+        # PyWavelets keeps float32 input in single precision, but promotes integer input to double precision
+        ll, _, _, _ = self.first_level(data.astype(dtype, copy=False), None)
+        return ll
+
+
+BACKENDS: Registry[DwtImplementation] = Registry('dwt', reference=DwtBackend.PYWT)
+"""
+Registered backends of the DWT. PyWavelets is the reference, while the NumPy Haar backend is selected by default.
+"""
+
+BACKENDS.register(DwtBackend.HAAR, _HaarDwt())
+BACKENDS.register(DwtBackend.PYWT, _PywtDwt())
+
+
+def prepare(backend: Optional[str] = None):
+    """
+    Prepares a backend, e.g. imports PyWavelets for it. The preparation is profiled as an 'import' span, so that the
+    import is not attributed to the 'dwt' span of the first transform.
+
+    :param backend: A name of the backend in BACKENDS. If None, the selected backend is prepared.
+    """
+    with span('import'):
+        BACKENDS.get(backend).prepare()
+
+
+def first_level(
+        data: np.ndarray,
+        backend: Optional[str] = None,
+        out: Optional[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
     Performs a single-level 2D discrete wavelet decomposition on the input data. This function uses the Haar wavelet
     to decompose the input 2D numpy array into its approximation (low-low) and detail coefficients (high-low,
     low-high, high-high).
 
-    :param data: A 2D numpy array representing the input data to be decomposed.
+    The decomposition is computed over the first two axes, so a stack of channels of shape (H, W, C) is decomposed
+    by a single call. Odd-sized data is padded by repeating its last row or column, so each band has the shape
+    (ceil(H / 2), ceil(W / 2)), followed by the stacked axes.
+
+    :param data: A 2D (or stacked 3D) numpy array representing the input data to be decomposed.
+    :param backend: A name of the backend in BACKENDS, e.g. DwtBackend.PYWT. If None, the selected backend is used.
+    All backends yield the same coefficients up to floating-point rounding.
+    :param out: Optional arrays of the band shape to store the ll, hl, lh and hh coefficients in. If None, new arrays
+    are allocated. Single-precision input yields single-precision coefficients, other input double-precision ones.
     :return: A tuple containing:
     - ll: The approximation coefficients (low-low).
     - hl: The horizontal detail coefficients (high-low).
     - lh: The vertical detail coefficients (low-high).
     - hh: The diagonal detail coefficients (high-high).
     """
-    ll, detail_coefficients = wavedec2(data, 'haar', level=1)
-    hl, lh, hh = detail_coefficients
-    return ll, hl, lh, hh,
+    return BACKENDS.get(backend).first_level(data, out)
 
 
-def first_level_inverse(ll: np.ndarray, hl: np.ndarray, lh: np.ndarray, hh: np.ndarray):
+def first_level_inverse(
+        ll: np.ndarray,
+        hl: np.ndarray,
+        lh: np.ndarray,
+        hh: np.ndarray,
+        backend: Optional[str] = None,
+        out: Optional[np.ndarray] = None
+) -> np.ndarray:
     """
     Reconstruct a 2D data from its first-level wavelet coefficients using the Haar wavelet. The function takes the
     approximation (LL), high-low (HL), low-high (LH), and high-high (HH) coefficients of a wavelet transform and
-    reconstructs the original data by applying the inverse wavelet transform.
+    reconstructs the original data by applying the inverse wavelet transform over the first two axes.
 
     :param ll: Approximation coefficients (LL) of the wavelet transform.
     :param hl: High-low coefficients (HL) of the wavelet transform.
     :param lh: Low-high coefficients (LH) of the wavelet transform.
     :param hh: High-high coefficients (HH) of the wavelet transform.
-    :return: The reconstructed data as a 2D NumPy array.
+    :param backend: A name of the backend in BACKENDS. If None, the selected backend is used. All backends yield the
+    same data up to floating-point rounding.
+    :param out: An optional array to store the reconstructed data in. Its first two dimensions must be twice as large
+    as the ones of the coefficients. If None, a new array is allocated.
+    :return: The reconstructed data as a 2D (or stacked 3D) NumPy array. Data of odd size that was padded by the
+    decomposition is reconstructed including the padding.
     """
-    return waverec2((ll, (hl, lh, hh)), 'haar')
+    return BACKENDS.get(backend).first_level_inverse(ll, hl, lh, hh, out)
+
+
+def first_level_approximation(
+        data: np.ndarray, backend: Optional[str] = None, dtype: np.dtype = np.float64
+) -> np.ndarray:
+    """
+    Computes only the approximation (low-low) coefficients of a single-level 2D discrete wavelet decomposition using
+    the Haar wavelet. With the DwtBackend.HAAR backend, the detail coefficients are neither computed nor allocated.
+
+    Each coefficient is a half of the sum of a 2x2 block of the input data. Odd-sized data is padded the same way as by
+    first_level. The decomposition is computed over the first two axes, so a stack of channels of shape (H, W, C) is
+    decomposed by a single call.
+
+    :param data: A 2D (or stacked 3D) numpy array representing the input data to be decomposed.
+    :param backend: A name of the backend in BACKENDS. If None, the selected backend is used. All backends yield the
+    same coefficients up to floating-point rounding.
+    :param dtype: A floating-point data type of the coefficients and of all intermediate results.
+    :return: The approximation coefficients (low-low) matching the first element returned by first_level.
+    """
+    return BACKENDS.get(backend).first_level_approximation(data, dtype)
+
+
+def add_approximation_delta(data: np.ndarray, ll_delta: np.ndarray):
+    """
+    Adds a change of the Haar approximation (low-low) coefficients to the data in place. This equals reconstructing
+    the data by first_level_inverse from the changed approximation and unchanged detail coefficients, but the detail
+    coefficients are not needed at all.
+
+    Each approximation coefficient contributes a half of its change to every item of its 2x2 block. Items of blocks
+    padded by the decomposition are not part of the data and are skipped.
+
+    :param data: A 2D (or stacked 3D) float numpy array representing the data that was decomposed. It is modified in
+    place.
+    :param ll_delta: The change of the approximation coefficients, i.e. changed minus original coefficients.
+    """
+    half_delta = ll_delta / 2
+
+    for row in (0, 1):
+        for col in (0, 1):
+            block_items = data[row::2, col::2]
+            block_items += half_delta[:block_items.shape[0], :block_items.shape[1]]
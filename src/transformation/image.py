@@ -1,6 +1,11 @@
+from io import BytesIO
+from os import remove
+
 import numpy as np
 from PIL import Image
 
+from src.profiling import span
+
 
 def image_to_channels(path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
@@ -11,7 +16,7 @@ def image_to_channels(path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     :param path: The file path to the image to be loaded.
     :return: A tuple containing three numpy arrays representing the red, green and blue channels of the image.
     """
-    with Image.open(path) as input_image:
+    with span('image.decode'), Image.open(path) as input_image:
         r, g, b = input_image.convert('RGB').split()
         return np.array(r), np.array(g), np.array(b)
 
@@ -24,4 +29,123 @@ def channels_to_image(path: str, channels: tuple[np.ndarray, np.ndarray, np.ndar
     :param path: The file path where the resulting image will be saved.
     :param channels: A tuple containing three numpy arrays representing the red, green and blue channels of the image.
     """
-    Image.fromarray(np.dstack(channels).clip(0, 255).astype(np.uint8)).save(path)
+    with span('image.encode'):
+        Image.fromarray(np.dstack(channels).clip(0, 255).astype(np.uint8)).save(path)
+
+
+def image_to_array(path: str) -> np.ndarray:
+    """
+    Loads an image from the specified file path as a single array of stacked red, green, and blue (RGB) channels. The
+    image is automatically converted to RGB mode if it is not already in that mode.
+
+    :param path: The file path to the image to be loaded.
+    :return: A 3D numpy array of shape (height, width, 3) containing the red, green and blue channels of the image.
+    """
+    with span('image.decode'), Image.open(path) as input_image:
+        return np.array(input_image.convert('RGB'))
+
+
+def array_to_image(path: str, array: np.ndarray):
+    """
+    Saves an array of stacked red, green, and blue (RGB) channels as an image to the specified file path. The input
+    values are clipped to the valid range [0, 255].
+
+    :param path: The file path where the resulting image will be saved.
+    :param array: A 3D numpy array of shape (height, width, 3) containing the red, green and blue channels of the image.
+    """
+    with span('image.encode'):
+        Image.fromarray(np.asarray(array).clip(0, 255).astype(np.uint8)).save(path)
+
+
+def decode_image_array(data: bytes) -> np.ndarray:
+    """
+    Decodes an image from the content of an image file (e.g. PNG or JPEG) as a single array of stacked red, green, and
+    blue (RGB) channels, see image_to_array.
+
+    :param data: The content of the image file.
+    :return: A 3D numpy array of shape (height, width, 3) containing the red, green and blue channels of the image.
+    """
+    with span('image.decode'), Image.open(BytesIO(data)) as input_image:
+        return np.array(input_image.convert('RGB'))
+
+
+def encode_image_array(array: np.ndarray, extension: str) -> bytes:
+    """
+    Encodes an array of stacked red, green, and blue (RGB) channels as the content of an image file, see
+    array_to_image.
+
+    :param array: A 3D numpy array of shape (height, width, 3) containing the red, green and blue channels of the image.
+    :param extension: A file extension specifying the image format, e.g. 'png' or '.jpg'.
+    :raises ValueError: If the extension does not belong to a supported image format.
+    :return: The content of the image file.
+    """
+    image_format = Image.registered_extensions().get('.' + extension.lower().lstrip('.'))
+
+    if image_format is None:
+        raise ValueError(f'Unsupported image format {extension}')
+
+    output = BytesIO()
+
+    with span('image.encode'):
+        Image.fromarray(np.asarray(array).clip(0, 255).astype(np.uint8)).save(output, image_format)
+
+    return output.getvalue()
+
+
+def _is_array_file(path: str) -> bool:
+    return path.lower().endswith('.npy')
+
+
+def open_image_array(path: str) -> np.ndarray:
+    """
+    Opens an image as an array of stacked red, green, and blue (RGB) channels, see image_to_array. NumPy array files
+    (.npy) of shape (height, width, 3) are memory-mapped instead of being read into memory, so that arbitrarily large
+    images may be processed in tiles.
+
+    :param path: The file path to the image to be opened.
+    :return: A 3D (possibly memory-mapped read-only) numpy array of shape (height, width, 3).
+    """
+    if _is_array_file(path):
+        return np.load(path, mmap_mode='r')
+
+    return image_to_array(path)
+
+
+def create_image_array(path: str, shape: tuple[int, int, int]) -> np.ndarray:
+    """
+    Creates an uint8 array for an image that will be saved by save_image_array. For NumPy array files (.npy), the array
+    is memory-mapped to the file, so that values written to it are written to the file incrementally.
+
+    :param path: The file path where the image will be saved.
+    :param shape: The shape of the image, i.e. (height, width, 3).
+    :return: A 3D (possibly memory-mapped) uint8 numpy array of the given shape.
+    """
+    if _is_array_file(path):
+        return np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=shape)
+
+    return np.empty(shape, dtype=np.uint8)
+
+
+def save_image_array(path: str, array: np.ndarray):
+    """
+    Saves an array created by create_image_array to the specified file path.
+
+    :param path: The file path where the image will be saved.
+    :param array: A 3D uint8 numpy array of shape (height, width, 3).
+    """
+    if isinstance(array, np.memmap):
+        array.flush()
+    else:
+        array_to_image(path, array)
+
+
+def discard_image_array(path: str, array: np.ndarray):
+    """
+    Discards an array created by create_image_array whose image could not be completed. For NumPy array files (.npy),
+    the file created by create_image_array is removed, so that no partially written image is left behind.
+
+    :param path: The file path where the image would have been saved.
+    :param array: A 3D uint8 numpy array created by create_image_array for the path.
+    """
+    if isinstance(array, np.memmap):
+        remove(path)
@@ -0,0 +1,31 @@
+from enum import Enum
+from typing import TYPE_CHECKING
+
+# The precision is a command line option, so the module does not import NumPy until the data type is needed
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class Precision(str, Enum):
+    """
+    Floating-point precisions of the transformation pipeline.
+    """
+
+    FLOAT32 = 'float32'
+    """
+    Single precision. Halves the memory of all intermediate arrays at the cost of rare bit errors of weak embeddings.
+    """
+
+    FLOAT64 = 'float64'
+    """
+    Double precision.
+    """
+
+    @property
+    def dtype(self) -> 'np.dtype':
+        """
+        :return: The numpy data type of the precision.
+        """
+        import numpy as np
+
+        return np.dtype(self.value)
@@ -0,0 +1,129 @@
+from enum import Enum
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+def _key(name: str) -> str:
+    # Enum members (e.g. DwtBackend.HAAR) do not hash like their string values, so they are looked up by the values
+    return name.value if isinstance(name, Enum) else name
+
+
+class Registry(Generic[T]):
+    """
+    A registry of interchangeable implementations (backends) of a single transformation stage, e.g. of the DCT.
+
+    Backends are registered under unique names. One of them is the reference implementation, which the others have to
+    conform to (see src.transformation.tuning.check_conformance), and one of them is selected to be used by the
+    functions of the stage module. The first registered backend is selected until another one is.
+
+    The selection is global to the process and is not synchronized, so it is meant to be made once at startup, e.g. by
+    src.transformation.tuning.tuned_backends.
+    """
+
+    def __init__(self, stage: str, reference: str):
+        """
+        Creates a new empty registry.
+
+        :param stage: A name of the stage, e.g. 'dct'.
+        :param reference: A name of the reference backend. It may be registered later.
+        """
+        self._stage = stage
+        self._reference = _key(reference)
+        self._backends: dict[str, T] = {}
+        self._untunable: set[str] = set()
+        self._selected: Optional[str] = None
+
+    @property
+    def stage(self) -> str:
+        return self._stage
+
+    @property
+    def reference(self) -> str:
+        return self._reference
+
+    @property
+    def selected(self) -> Optional[str]:
+        return self._selected
+
+    @property
+    def default(self) -> Optional[str]:
+        """
+        :return: The name of the first registered backend, which is selected until another one is.
+        """
+        return next(iter(self._backends), None)
+
+    def names(self) -> list[str]:
+        """
+        :return: Names of the registered backends in the order of registration.
+        """
+        return list(self._backends)
+
+    def tunable_names(self) -> list[str]:
+        """
+        :return: Names of the registered backends that may be chosen by autotuning, in the order of registration.
+        """
+        return [name for name in self._backends if name not in self._untunable]
+
+    def register(self, name: str, backend: T, tunable: bool = True):
+        """
+        Registers a backend.
+
+        :param name: A unique name of the backend.
+        :param backend: An implementation of the stage interface.
+        :param tunable: Whether the backend may be chosen by autotuning. Slow backends kept only as references, e.g.
+        straightforward original implementations, should not be, as they may win on warm caches by noise only.
+        Defaults to True.
+        :raises ValueError: If a backend of the same name is already registered.
+        """
+        name = _key(name)
+
+        if name in self._backends:
+            raise ValueError(f'Backend {name} of stage {self._stage} is already registered')
+
+        self._backends[name] = backend
+
+        if not tunable:
+            self._untunable.add(name)
+
+        if self._selected is None:
+            self._selected = name
+
+    def unregister(self, name: str):
+        """
+        Removes a registered backend. If it is selected, the first remaining backend is selected instead.
+
+        :param name: A name of the backend.
+        :raises ValueError: If no backend of the name is registered.
+        """
+        self.get(name)
+        del self._backends[_key(name)]
+        self._untunable.discard(_key(name))
+
+        if self._selected == _key(name):
+            self._selected = next(iter(self._backends), None)
+
+    def select(self, name: str):
+        """
+        Selects a backend to be used by the functions of the stage module.
+
+        :param name: A name of the backend.
+        :raises ValueError: If no backend of the name is registered.
+        """
+        self.get(name)
+        self._selected = _key(name)
+
+    def get(self, name: Optional[str] = None) -> T:
+        """
+        Looks up a backend.
+
+        :param name: A name of the backend. If None, the selected backend is returned.
+        :raises ValueError: If no backend of the name is registered.
+        :return: The backend.
+        """
+        key = self._selected if name is None else _key(name)
+
+        try:
+            return self._backends[key]
+        except KeyError:
+            raise ValueError(f'Unknown backend {key} of stage {self._stage}') from None
@@ -0,0 +1,318 @@
+import json
+import os
+from time import perf_counter
+from typing import Callable, Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from src.transformation import bipolar, dct, dwt, zigzag
+from src.transformation.registry import Registry
+
+DEFAULT_CHOICES_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'shadowmark', 'backends.json'
+)
+
+# Number of timed runs of each backend, the fastest of which counts
+_REPEAT = 3
+
+# Backends whose first run is this many times slower than the fastest backend timed so far are not timed again, so
+# that slow reference backends do not dominate the tuning of huge images
+_SLOW_FACTOR = 4
+
+# A backend other than the default one is chosen only if it is at least this many times faster, so that noise of the
+# timings does not switch backends
+_MARGIN = 1.2
+
+# Size of the crop of the image on which autotune checks conformance before timing, so that slow reference backends
+# do not dominate it either
+_CHECK_SIZE = 64
+
+# Size of the data converted by the bit codecs in bytes, matching a 32x32 RGB watermark
+_WATERMARK_SIZE = 32 * 32 * 3
+
+# Floating-point results may differ from the reference by this many machine epsilons relative to the largest
+# magnitude of the reference result, as backends sum in different orders
+_TOLERANCE_EPSILONS = 1 << 14
+
+
+def _approximation_like(image: np.ndarray) -> np.ndarray:
+    # Data of the shape and magnitude of the approximation coefficients, without depending on any DWT backend
+    return image[0::2, 0::2].astype(np.float64)
+
+
+def _dwt_approximation(backend: dwt.DwtImplementation, image: np.ndarray) -> tuple[np.ndarray, ...]:
+    return backend.first_level_approximation(image, np.float64),
+
+
+def _dwt_outputs(backend: dwt.DwtImplementation, image: np.ndarray) -> tuple[np.ndarray, ...]:
+    bands = backend.first_level(image, None)
+    return backend.first_level_approximation(image, np.float64), *bands, backend.first_level_inverse(*bands, None)
+
+
+def _zigzag_outputs(backend: zigzag.ZigzagImplementation, image: np.ndarray) -> tuple[np.ndarray, ...]:
+    ll = _approximation_like(image)
+    vector = backend.scan(ll)
+    return vector, backend.inverse(vector, ll.shape, np.float64)
+
+
+def _dct_outputs(backend: dct.DctImplementation, image: np.ndarray) -> tuple[np.ndarray, ...]:
+    ll = _approximation_like(image)
+
+    # Every second coefficient, like a sub-vector of the decomposition by the embedding
+    vector = ll.reshape(ll.shape[0] * ll.shape[1], -1)[0::2]
+    coefficients = backend.transform(vector, 0)
+    return coefficients, backend.inverse(coefficients, 0)
+
+
+def _bits_outputs(backend: bipolar.BitCodec, image: np.ndarray) -> tuple[np.ndarray, ...]:
+    bits = backend.encode(image.reshape(-1)[:_WATERMARK_SIZE].astype(np.uint8))
+    return bits, backend.decode(bits)
+
+
+class _Stage(NamedTuple):
+    registry: Registry
+    run: Callable[[object, np.ndarray], tuple[np.ndarray, ...]]
+    outputs: Callable[[object, np.ndarray], tuple[np.ndarray, ...]]
+
+
+def _stages() -> list[_Stage]:
+    # The work timed by autotune is the work of the embedding, while conformance is checked on everything a backend
+    # implements. The registries are looked up on each call, so that they can be replaced, e.g. by tests.
+    return [
+        _Stage(dwt.BACKENDS, _dwt_approximation, _dwt_outputs),
+        _Stage(zigzag.BACKENDS, _zigzag_outputs, _zigzag_outputs),
+        _Stage(dct.BACKENDS, _dct_outputs, _dct_outputs),
+        _Stage(bipolar.BACKENDS, _bits_outputs, _bits_outputs),
+    ]
+
+
+def _mismatch(actual: tuple[np.ndarray, ...], expected: tuple[np.ndarray, ...]) -> Optional[str]:
+    for a, e in zip(actual, expected):
+        a, e = np.asarray(a), np.asarray(e)
+
+        if a.shape != e.shape or a.dtype != e.dtype:
+            return f'Expected {e.dtype} array of shape {e.shape}, got {a.dtype} array of shape {a.shape}'
+
+        if e.size == 0:
+            continue
+
+        tolerance = _TOLERANCE_EPSILONS * np.finfo(e.dtype).eps if e.dtype.kind in 'fc' else 0
+        error = np.max(np.abs(a.astype(np.float64) - e)) / max(1.0, np.max(np.abs(e)))
+
+        if error > tolerance:
+            return f'Relative error {error:.3g} exceeds the tolerance {tolerance:.3g}'
+
+    return None
+
+
+class ConformanceResult(NamedTuple):
+    """
+    A result of checking a single backend against the reference backend of its stage.
+    """
+
+    stage: str
+    """
+    The name of the stage, e.g. 'dct'.
+    """
+
+    backend: str
+    """
+    The name of the backend.
+    """
+
+    error: Optional[str] = None
+    """
+    A description of the first mismatch if the backend does not conform, or of the missing dependency if the backend
+    or the reference backend is unavailable, otherwise None.
+    """
+
+
+def check_conformance(images: Iterable[np.ndarray]) -> list[ConformanceResult]:
+    """
+    Checks every registered backend of every stage against the reference backend of the stage on the given images.
+
+    Each stage is run on data derived from each image, e.g. the zigzag scan of data of the approximation shape, and all
+    results must equal the results of the reference backend in shape and data type, and in value up to floating-point
+    rounding.
+
+    :param images: 3D numpy arrays of shape (height, width, channels) with values in range 0 - 255, e.g. the samples
+    in blob/media.
+    :return: A list of results, one for each registered backend.
+    """
+    images = list(images)
+    results = []
+
+    for stage in _stages():
+        registry = stage.registry
+
+        try:
+            reference = registry.get(registry.reference)
+            expected = [stage.outputs(reference, image) for image in images]
+        except ImportError as e:
+            error = f'Reference backend {registry.reference} is unavailable: {e}'
+            results.extend(ConformanceResult(registry.stage, name, error) for name in registry.names())
+            continue
+
+        for name in registry.names():
+            # The reference conforms to itself by definition
+            if name == registry.reference:
+                results.append(ConformanceResult(registry.stage, name))
+                continue
+
+            error = None
+
+            try:
+                for image, expected_outputs in zip(images, expected):
+                    if error := _mismatch(stage.outputs(registry.get(name), image), expected_outputs):
+                        break
+
+            except ImportError as e:
+                error = f'Backend is unavailable: {e}'
+
+            results.append(ConformanceResult(registry.stage, name, error))
+
+    return results
+
+
+def _elapsed(run: Callable[[object, np.ndarray], tuple[np.ndarray, ...]], backend: object, image: np.ndarray) -> float:
+    start = perf_counter()
+    run(backend, image)
+    return perf_counter() - start
+
+
+def autotune(shape: tuple[int, ...], repeat: int = _REPEAT) -> dict[str, str]:
+    """
+    Times every tunable registered backend of every stage on random data of an image of the given shape and chooses
+    the fastest backend of each stage. Backends that are unavailable or do not conform to the reference backend on a
+    crop of the data are not chosen. Backends are timed in the order of registration, and backends whose first run is
+    much slower than the fastest one timed before are not timed again.
+
+    The choices are reused by later processes, each of which runs a stage on a shape only a few times. So the cost of a
+    backend is its first run on the shape, which fills its caches (e.g. zigzag plans), plus its fastest later run.
+    Another backend than the default one (see Registry.default) is chosen only if it is faster by a margin.
+
+    The backends are neither selected nor persisted, see tuned_backends.
+
+    :param shape: The shape of the image to tune for, i.e. (height, width) or (height, width, channels).
+    :param repeat: A number of timed runs of each backend, the fastest of which counts.
+    :return: A dictionary mapping names of the stages to names of the fastest backends.
+    """
+    image = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    crop = image[:_CHECK_SIZE, :_CHECK_SIZE]
+    choices = {}
+
+    for stage in _stages():
+        registry = stage.registry
+
+        try:
+            expected = stage.outputs(registry.get(registry.reference), crop)
+        except ImportError:
+            expected = None
+
+        timings = {}
+
+        for name in registry.tunable_names():
+            backend = registry.get(name)
+
+            try:
+                # Running the backend on the crop imports its modules, so that the imports are not timed below
+                if expected is not None and _mismatch(stage.outputs(backend, crop), expected):
+                    continue
+
+                first_run = _elapsed(stage.run, backend, image)
+
+                if timings and first_run > _SLOW_FACTOR * min(timings.values()):
+                    continue
+
+                timings[name] = first_run + min(_elapsed(stage.run, backend, image) for _ in range(repeat))
+
+            except ImportError:
+                continue
+
+        if not timings:
+            choices[registry.stage] = registry.selected
+            continue
+
+        fastest = min(timings, key=timings.get)
+
+        if registry.default in timings and timings[fastest] * _MARGIN > timings[registry.default]:
+            fastest = registry.default
+
+        choices[registry.stage] = fastest
+
+    return choices
+
+
+def select_backends(choices: dict[str, str]):
+    """
+    Selects backends of the stages.
+
+    :param choices: A dictionary mapping names of the stages to names of the backends, e.g. returned by autotune.
+    Stages that are not in the dictionary keep their selected backends.
+    :raises ValueError: If a backend is not registered.
+    """
+    for stage in _stages():
+        if stage.registry.stage in choices:
+            stage.registry.select(choices[stage.registry.stage])
+
+
+def load_choices(path: str) -> dict[str, dict[str, str]]:
+    """
+    Loads choices of backends persisted by tuned_backends.
+
+    :param path: A path to the JSON file of the choices.
+    :return: A dictionary mapping image shapes (e.g. '600x800x3' for height x width x channels) to choices of backends,
+    see autotune. It is empty if the file does not exist or is corrupted.
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            choices = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+    return choices if isinstance(choices, dict) else {}
+
+
+def _save_choices(path: str, choices: dict[str, dict[str, str]]):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    # The file is replaced at once, so that concurrent runs never read a partially written file
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(choices, file, indent=2, sort_keys=True)
+
+    os.replace(temporary_path, path)
+
+
+def _is_registered(choices: dict[str, str]) -> bool:
+    return all(stage.registry.stage in choices for stage in _stages()) and all(
+        choices[stage.registry.stage] in stage.registry.names() for stage in _stages()
+    )
+
+
+def tuned_backends(shape: tuple[int, ...], path: Optional[str] = None, repeat: int = _REPEAT) -> dict[str, str]:
+    """
+    Selects the fastest backends of all stages for images of the given shape.
+
+    The choices are persisted per shape, so the backends are timed by autotune only once. They are timed again if
+    a persisted backend is no longer registered. To consider newly registered backends, remove the file.
+
+    :param shape: The shape of the image to tune for, i.e. (height, width) or (height, width, channels).
+    :param path: A path to the JSON file of the persisted choices. If None, DEFAULT_CHOICES_PATH is used.
+    :param repeat: A number of timed runs of each backend, see autotune.
+    :return: A dictionary mapping names of the stages to names of the selected backends.
+    """
+    path = path or DEFAULT_CHOICES_PATH
+    key = 'x'.join(str(size) for size in shape)
+
+    all_choices = load_choices(path)
+    choices = all_choices.get(key)
+
+    if not isinstance(choices, dict) or not _is_registered(choices):
+        choices = autotune(shape, repeat)
+        all_choices[key] = choices
+        _save_choices(path, all_choices)
+
+    select_backends(choices)
+    return choices
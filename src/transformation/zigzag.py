@@ -1,5 +1,36 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Iterator
+
 import numpy as np
 
+from src.transformation.registry import Registry
+
+_PLAN_CACHE_SIZE = 32
+
+
+@lru_cache(maxsize=_PLAN_CACHE_SIZE)
+def _plan(rows: int, cols: int) -> np.ndarray:
+    """
+    Computes flat indices of a matrix of the given shape in the order of the zigzag traversal. The traversal starts
+    in the top left corner, goes to the right and then walks the anti-diagonals alternately down-left (odd diagonals)
+    and up-right (even diagonals).
+
+    Plans are cached per shape with LRU eviction, so repeated scans of equally sized matrices do not recompute them.
+
+    :param rows: Number of rows of the matrix.
+    :param cols: Number of columns of the matrix.
+    :return: A read-only 1D numpy array of flat (row-major) indices in the zigzag order.
+    """
+    y, x = np.indices((rows, cols)).reshape(2, -1)
+    diagonal = x + y
+
+    # Odd diagonals are walked down-left (rising y), even diagonals up-right (falling y)
+    order = np.lexsort((np.where(diagonal % 2 == 1, y, -y), diagonal)).astype(np.intp)
+    order.setflags(write=False)
+    return order
+
+
 _GO_BACK = -1
 _STAY = 0
 _GO_FORWARD = 1
@@ -10,7 +41,13 @@ _DOWN_LEFT = (_GO_BACK, _GO_FORWARD)
 _UP_RIGHT = (_GO_FORWARD, _GO_BACK)
 
 
-def _traverse(shape: tuple[int, int]) -> tuple[int, int]:
+def _traverse(shape: tuple[int, int]) -> Iterator[tuple[int, int]]:
+    """
+    Walks through a matrix of the given shape in the zigzag order, deciding on each step which way to go next.
+
+    :param shape: The shape (rows, cols) of the matrix.
+    :return: An iterator of (x, y) coordinates in the zigzag order.
+    """
     rows, cols = shape
 
     if rows == 1:
@@ -75,36 +112,105 @@ def _traverse(shape: tuple[int, int]) -> tuple[int, int]:
                 raise RuntimeError("Illegal movement to the up-right occurred")
 
 
-def scan(matrix: np.ndarray) -> np.ndarray:
+class ZigzagImplementation(ABC):
+    """
+    An interface of a backend of the zigzag traversal, see BACKENDS and the functions of this module of the same names.
+    The arguments are validated by the functions of this module.
+    """
+
+    @abstractmethod
+    def scan(self, matrix: np.ndarray) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def inverse(self, vector: np.ndarray, shape: tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        pass
+
+
+class _PlannedZigzag(ZigzagImplementation):
+
+    def scan(self, matrix: np.ndarray) -> np.ndarray:
+        rows, cols = matrix.shape[0:2]
+        return matrix.reshape((rows * cols,) + matrix.shape[2:])[_plan(rows, cols)]
+
+    def inverse(self, vector: np.ndarray, shape: tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        rows, cols = shape[0:2]
+
+        matrix = np.empty((rows * cols,) + tuple(shape[2:]), dtype=dtype)
+        matrix[_plan(rows, cols)] = vector
+
+        return matrix.reshape(shape)
+
+
+class _WalkingZigzag(ZigzagImplementation):
     """
-    Traverse a 2D matrix and convert its elements into a 1D array. The elements of the matrix are traversed in a
-    zigzag fashion by simply walking through the matrix while reading its elements and deciding on each step which
-    way to go next.
+    The original implementation walking through the matrix step by step. It is slow, but obviously correct.
+    """
+
+    def scan(self, matrix: np.ndarray) -> np.ndarray:
+        xs, ys = self._coordinates(tuple(matrix.shape[0:2]))
+        return matrix[ys, xs]
+
+    def inverse(self, vector: np.ndarray, shape: tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        xs, ys = self._coordinates(tuple(shape[0:2]))
+
+        matrix = np.empty(shape, dtype=dtype)
+        matrix[ys, xs] = vector
+
+        return matrix
 
-    :param matrix: A 2D numpy array representing the input matrix.
-    :return: A 1D numpy array containing elements from the matrix collected by the zigzag traversal.
+    @staticmethod
+    @lru_cache(maxsize=_PLAN_CACHE_SIZE)
+    def _coordinates(shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+        # Walks are cached per shape like the plans, so that equally sized matrices are not walked through repeatedly
+        xs, ys = np.array(list(_traverse(shape)), dtype=np.intp).reshape(-1, 2).T
+        xs.setflags(write=False)
+        ys.setflags(write=False)
+        return xs, ys
+
+
+BACKENDS: Registry[ZigzagImplementation] = Registry('zigzag', reference='walk')
+"""
+Registered backends of the zigzag traversal. The walk through the matrix is the reference, while the cached plans are
+selected by default.
+"""
+
+BACKENDS.register('plan', _PlannedZigzag())
+BACKENDS.register('walk', _WalkingZigzag(), tunable=False)
+
+
+def scan(matrix: np.ndarray) -> np.ndarray:
     """
-    return np.array([matrix[y][x].item() for x, y in _traverse(matrix.shape[0:2])])
+    Traverse a 2D matrix and convert its elements into a 1D array. The elements of the matrix are collected in a
+    zigzag fashion by the backend selected in BACKENDS. By default, they are collected by a single gather over
+    precomputed (and cached) flat indices of the traversal.
 
+    Only the first two axes are traversed, so a stack of matrices of shape (rows, cols, C) is converted into a stack
+    of vectors of shape (rows * cols, C).
 
-def inverse(vector: list | np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+    :param matrix: A 2D (or stacked 3D) numpy array representing the input matrix.
+    :return: A 1D (or stacked 2D) numpy array containing elements from the matrix collected by the zigzag traversal.
     """
-    Reconstruct a 2D matrix from 1D vector and a desired shape. The matrix is reconstructed in a zigzag fashion by
-    traversing empty matrix and putting elements from the input vector to respective coordinates.
+    return BACKENDS.get().scan(matrix)
+
 
-    :param vector: A 1D vector containing the elements to reshape into a matrix.
-    :param shape:  A tuple specifying the shape (rows, cols) of the desired output matrix.
+def inverse(vector: list | np.ndarray, shape: tuple[int, int], dtype: np.dtype = np.float64) -> np.ndarray:
+    """
+    Reconstruct a 2D matrix from 1D vector and a desired shape. The matrix is reconstructed in a zigzag fashion by the
+    backend selected in BACKENDS. By default, elements from the input vector are scattered to precomputed (and cached)
+    flat indices of the traversal.
+
+    :param vector: A 1D vector containing the elements to reshape into a matrix, or a stack of such vectors of shape
+    (rows * cols, C).
+    :param shape:  A tuple specifying the shape (rows, cols) of the desired output matrix, or (rows, cols, C) for
+    a stack of matrices.
+    :param dtype: A data type of the output matrix.
     :raises ValueError: If the size of the vector does not match `rows * cols`.
-    :return:
+    :return: A 2D (or stacked 3D) numpy array of the given shape.
     """
     rows, cols = shape[0:2]
 
     if len(vector) != rows * cols:
         raise ValueError('Size of the input vector must be equal to rows * cols')
 
-    matrix = np.empty(shape)
-
-    for i, (x, y) in enumerate(_traverse(shape)):
-        matrix[y][x] = vector[i]
-
-    return matrix
+    return BACKENDS.get().inverse(vector, shape, dtype)
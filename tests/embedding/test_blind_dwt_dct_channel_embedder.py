@@ -3,6 +3,7 @@ import pytest
 
 from src.embedding.blind_dwt_dct_channel_embedder import BlindDwtDctChannelEmbedder
 from src.exceptions import ImageChannelError, WatermarkSizeError
+from src.transformation.precision import Precision
 from tests.stub.indices_selector_stub import IndicesSelectorStub
 
 
@@ -86,3 +87,13 @@ class TestBlindDwtDctChannelEmbedder:
 
         # Uses uint8 due to floating-point rounding errors
         assert np.array_equal(actual.astype(np.uint8), expected)
+
+    def test_embedding_float32(self, selector):
+        channel = np.random.default_rng(0).integers(0, 256, (31, 64), dtype=np.uint8)
+        watermark = [0, 128, 255]
+
+        expected = BlindDwtDctChannelEmbedder(1.0, selector).embed(channel, watermark)
+        actual = BlindDwtDctChannelEmbedder(1.0, selector, Precision.FLOAT32).embed(channel, watermark)
+
+        assert actual.dtype == np.float32
+        assert np.allclose(actual, expected, atol=1e-3)
@@ -0,0 +1,128 @@
+import sys
+
+import numpy as np
+import pytest
+
+from src.embedding.blind_dwt_dct_channel_embedder import BlindDwtDctChannelEmbedder
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.embedding.rgb_watermark_embedder import RGBWatermarkEmbedder
+from src.exceptions import ImageChannelError, WatermarkSizeError
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+from tests.stub.indices_selector_stub import IndicesSelectorStub
+
+
+class TestBlindDwtDctStackedEmbedder:
+
+    @pytest.fixture
+    def selector(self):
+        """
+        :return: Indices selector that always returns the same indices in interval (0, selection).
+        """
+        return IndicesSelectorStub(lambda _, selection: list(range(0, selection)))
+
+    @pytest.mark.parametrize('image', [np.empty((0, 0, 3)), None])
+    def test_embed_empty_image(self, selector, image):
+        with pytest.raises(ImageChannelError) as _:
+            BlindDwtDctStackedEmbedder(1.0, selector).embed(image, np.zeros((1, 1, 3)))
+
+    @pytest.mark.parametrize('watermark', [np.empty((0, 0, 3)), None])
+    def test_embed_empty_watermark(self, selector, watermark):
+        with pytest.raises(ImageChannelError) as _:
+            BlindDwtDctStackedEmbedder(1.0, selector).embed(np.zeros((8, 8, 3)), watermark)
+
+    def test_embed_watermark_too_large(self, selector):
+        with pytest.raises(WatermarkSizeError) as _:
+            BlindDwtDctStackedEmbedder(1.0, selector).embed(np.zeros((8, 8, 3)), np.zeros((1, 2, 3)))
+
+    def test_embed_without_pywt(self, selector, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'pywt', None)
+        image = np.random.default_rng(0).integers(0, 256, (16, 8, 3), dtype=np.uint8)
+
+        actual = BlindDwtDctStackedEmbedder(1.0, selector).embed(image, np.zeros((1, 1, 3), dtype=np.uint8))
+
+        assert actual.shape == image.shape
+
+    def test_embed_no_channels(self, selector):
+        image = np.full((8, 8, 3), 128, dtype=np.uint8)
+
+        actual = BlindDwtDctStackedEmbedder(1.0, selector, '').embed(image, np.zeros((1, 1, 3)))
+
+        assert np.array_equal(actual, image)
+
+    @pytest.mark.parametrize('channel_spec', ['r', 'g', 'b', 'rg', 'rb', 'gb', 'rgb'])
+    @pytest.mark.parametrize('image_shape', [(16, 8), (7, 19), (31, 64)])
+    def test_embedding_matches_channel_embedding(self, channel_spec, image_shape):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, image_shape + (3,), dtype=np.uint8)
+        watermark = rng.integers(0, 256, (1, 2, 3), dtype=np.uint8)
+
+        channel_embedder = BlindDwtDctChannelEmbedder(2.0, PermutationIndicesSelector(42))
+        expected = RGBWatermarkEmbedder(channel_embedder, channel_spec).embed(
+            tuple(np.moveaxis(image, -1, 0)), tuple(np.moveaxis(watermark, -1, 0))
+        )
+
+        actual = BlindDwtDctStackedEmbedder(2.0, PermutationIndicesSelector(42), channel_spec).embed(image, watermark)
+
+        assert actual.shape == image.shape
+        for i in range(3):
+            assert np.allclose(actual[..., i], expected[i])
+
+    @pytest.mark.parametrize('images', [np.empty((0, 8, 8, 3)), np.zeros((8, 8, 3)), None])
+    def test_embed_batch_invalid_images(self, selector, images):
+        with pytest.raises(ImageChannelError) as _:
+            BlindDwtDctStackedEmbedder(1.0, selector).embed_batch(images, np.zeros((1, 1, 3)))
+
+    def test_embed_batch_watermark_too_large(self, selector):
+        with pytest.raises(WatermarkSizeError) as _:
+            BlindDwtDctStackedEmbedder(1.0, selector).embed_batch(np.zeros((2, 8, 8, 3)), np.zeros((1, 2, 3)))
+
+    def test_embed_batch_no_channels(self, selector):
+        images = np.full((2, 8, 8, 3), 128, dtype=np.uint8)
+
+        actual = BlindDwtDctStackedEmbedder(1.0, selector, '').embed_batch(images, np.zeros((1, 1, 3)))
+
+        assert np.array_equal(actual, images)
+
+    @pytest.mark.parametrize('channel_spec', ['g', 'rb', 'rgb'])
+    @pytest.mark.parametrize('header', [False, True])
+    # Small images are transformed over a batch axis, while large ones one after another
+    @pytest.mark.parametrize('images_shape', [(5, 64, 64), (3, 47, 65), (2, 300, 260)])
+    def test_embed_batch_matches_embedding(self, channel_spec, header, images_shape):
+        rng = np.random.default_rng(0)
+        images = rng.integers(0, 256, images_shape + (3,), dtype=np.uint8)
+        watermark = rng.integers(0, 256, (2, 3, 3), dtype=np.uint8)
+
+        embedder = BlindDwtDctStackedEmbedder(2.0, PermutationIndicesSelector(42), channel_spec, header=header)
+        actual = embedder.embed_batch(images, watermark)
+
+        assert actual.shape == images.shape
+        for image, actual_image in zip(images, actual):
+            # Each image is embedded as if by a separate embedder with a fresh selector
+            expected = BlindDwtDctStackedEmbedder(
+                2.0, PermutationIndicesSelector(42), channel_spec, header=header
+            ).embed(image, watermark)
+            assert np.allclose(actual_image, expected)
+
+        # The selector of the embedder stays unused
+        assert np.allclose(embedder.embed(images[0], watermark), actual[0])
+
+    @pytest.mark.parametrize('batch_size', [1, 2, 8])
+    def test_embed_all(self, batch_size):
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, shape + (3,), dtype=np.uint8) for shape in [(32, 32)] * 3 + [(24, 40)] * 2]
+        watermark = rng.integers(0, 256, (1, 2, 3), dtype=np.uint8)
+        embedder = BlindDwtDctStackedEmbedder(2.0, PermutationIndicesSelector(42))
+
+        actual = embedder.embed_all(iter(images), watermark, batch_size)
+
+        assert not isinstance(actual, list)
+        actual = list(actual)
+        assert len(actual) == len(images)
+        for image, actual_image in zip(images, actual):
+            assert np.allclose(actual_image, BlindDwtDctStackedEmbedder(2.0, PermutationIndicesSelector(42)).embed(
+                image, watermark
+            ))
+
+    def test_embed_all_invalid_batch_size(self, selector):
+        with pytest.raises(ValueError) as _:
+            list(BlindDwtDctStackedEmbedder(1.0, selector).embed_all([np.zeros((8, 8, 3))], np.zeros((1, 1, 3)), 0))
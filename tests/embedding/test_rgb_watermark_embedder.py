@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pytest
 
@@ -48,3 +50,30 @@ class TestRGBWatermarkEmbedder:
         assert np.array_equal(actual[0], expected[0])
         assert np.array_equal(actual[1], expected[1])
         assert np.array_equal(actual[2], expected[2])
+
+    def test_channel_ids(self):
+        channel_ids = []
+
+        class _RecordingEmbedderStub(ChannelEmbedderStub):
+            def embed(self, channel, watermark_bits, channel_id=None):
+                channel_ids.append(channel_id)
+                return super().embed(channel, watermark_bits, channel_id)
+
+        rgb_embedder = RGBWatermarkEmbedder(_RecordingEmbedderStub(lambda channel, _: channel), 'rb')
+        rgb_embedder.embed((_zeros(), _zeros(), _zeros()), (_ones(), _ones(), _ones()))
+
+        assert channel_ids == ['r', 'b']
+
+    @pytest.mark.parametrize('channel_spec', ['', 'g', 'rb', 'rgb'])
+    def test_concurrent_embedding(self, channel_embedder, channel_spec):
+        input_channels = (_zeros(), _ones(), _zeros())
+        watermark_channels = (_ones(), _ones() * 2, _ones() * 3)
+
+        expected = RGBWatermarkEmbedder(channel_embedder, channel_spec).embed(input_channels, watermark_channels)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            rgb_embedder = RGBWatermarkEmbedder(channel_embedder, channel_spec, executor)
+            actual = rgb_embedder.embed(input_channels, watermark_channels)
+
+        for a, e in zip(actual, expected):
+            assert np.array_equal(a, e)
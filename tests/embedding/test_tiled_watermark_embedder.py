@@ -0,0 +1,71 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src import __main__ as cli
+
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.embedding.tiled_watermark_embedder import TiledWatermarkEmbedder
+from src.randomization.keyed_indices_selector import KeyedIndicesSelector
+from src.tiling import tiles
+from src.transformation.image import array_to_image
+
+
+class TestTiledWatermarkEmbedder:
+
+    @pytest.fixture
+    def embedder(self):
+        return BlindDwtDctStackedEmbedder(1.0, KeyedIndicesSelector(42))
+
+    @pytest.fixture
+    def image(self):
+        return np.random.default_rng(0).integers(0, 256, (70, 100, 3), dtype=np.uint8)
+
+    @pytest.fixture
+    def watermark(self):
+        return np.random.default_rng(1).integers(0, 256, (4, 4, 3), dtype=np.uint8)
+
+    @pytest.mark.parametrize('tile_size', [0, -1])
+    def test_invalid_tile_size(self, embedder, tile_size):
+        with pytest.raises(ValueError) as _:
+            TiledWatermarkEmbedder(embedder, tile_size)
+
+    def test_embedding_tiles(self, embedder, image, watermark):
+        actual = TiledWatermarkEmbedder(embedder, 32).embed(image, watermark)
+
+        assert actual.dtype == np.uint8
+        assert actual.shape == image.shape
+        for tile in tiles(image.shape, 32):
+            expected_tile = embedder.embed(image[tile], watermark).clip(0, 255).astype(np.uint8)
+            assert np.array_equal(actual[tile], expected_tile)
+
+    def test_embedding_to_output(self, embedder, image, watermark, tmp_path):
+        output = np.lib.format.open_memmap(tmp_path / 'output.npy', mode='w+', dtype=np.uint8, shape=image.shape)
+
+        expected = TiledWatermarkEmbedder(embedder, 32).embed(image, watermark)
+        actual = TiledWatermarkEmbedder(embedder, 32).embed(image, watermark, output)
+
+        assert actual is output
+        assert np.array_equal(np.load(tmp_path / 'output.npy'), expected)
+
+    def test_concurrent_embedding(self, embedder, image, watermark):
+        expected = TiledWatermarkEmbedder(embedder, 32).embed(image, watermark)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            actual = TiledWatermarkEmbedder(embedder, 32, executor).embed(image, watermark)
+
+        assert np.array_equal(actual, expected)
+
+    def test_command_line_does_not_leave_output_of_failed_embedding(self, tmp_path, monkeypatch):
+        np.save(tmp_path / 'image.npy', np.zeros((16, 16, 3), dtype=np.uint8))
+        array_to_image(str(tmp_path / 'watermark.png'), np.zeros((32, 32, 3), dtype=np.uint8))
+
+        args = ['shadowmark', '-i', str(tmp_path / 'image.npy'), '-e', str(tmp_path / 'watermark.png'),
+                '-o', str(tmp_path / 'output.npy'), '--tile', '16']
+        monkeypatch.setattr(sys, 'argv', args)
+        monkeypatch.setattr(cli, 'argv', args)
+        cli.main()
+
+        assert not (tmp_path / 'output.npy').exists()
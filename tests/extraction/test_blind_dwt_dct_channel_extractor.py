@@ -3,6 +3,8 @@ import pytest
 
 from src.exceptions import ImageChannelError, WatermarkSizeError
 from src.extraction.blind_dwt_dct_channel_extractor import BlindDwtDctChannelExtractor
+from src.transformation.dwt import DwtBackend
+from src.transformation.precision import Precision
 from tests.stub.indices_selector_stub import IndicesSelectorStub
 
 
@@ -35,9 +37,11 @@ class TestBlindDwtDctChannelExtractor:
     def test_extract_zero_watermark_size(self, selector):
         actual = BlindDwtDctChannelExtractor(selector).extract(np.array([[0, 255], [255, 0]]), 0)
 
-        assert actual == []
+        assert actual.size == 0
 
-    def test_extract(self, selector):
+    @pytest.mark.parametrize('precision', list(Precision))
+    @pytest.mark.parametrize('backend', list(DwtBackend))
+    def test_extract(self, selector, backend, precision):
         channel = np.array([
             [127, 127, 128, 128, 127, 127, 128, 128],
             [127, 127, 128, 128, 127, 127, 128, 128],
@@ -49,6 +53,6 @@ class TestBlindDwtDctChannelExtractor:
             [127, 127, 128, 128, 128, 128, 127, 127]
         ])
 
-        actual = BlindDwtDctChannelExtractor(selector).extract(channel, 1)
+        actual = BlindDwtDctChannelExtractor(selector, backend, precision).extract(channel, 1)
 
-        assert actual == [128]
+        assert np.array_equal(actual, [128])
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.exceptions import ImageChannelError, WatermarkSizeError
+from src.extraction.blind_dwt_dct_channel_extractor import BlindDwtDctChannelExtractor
+from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+from src.extraction.rgb_watermark_extractor import RGBWatermarkExtractor
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+from src.transformation.dwt import DwtBackend
+from src.transformation.precision import Precision
+from tests.stub.indices_selector_stub import IndicesSelectorStub
+
+
+class TestBlindDwtDctStackedExtractor:
+
+    @pytest.fixture
+    def selector(self):
+        """
+        :return: Indices selector that always returns the same indices in interval (0, selection).
+        """
+        return IndicesSelectorStub(lambda _, selection: list(range(0, selection)))
+
+    @pytest.mark.parametrize('image', [np.empty((0, 0, 3)), None])
+    def test_extract_empty_image(self, selector, image):
+        with pytest.raises(ImageChannelError) as _:
+            BlindDwtDctStackedExtractor(selector).extract(image, (0, 0))
+
+    def test_extract_watermark_too_large(self, selector):
+        with pytest.raises(WatermarkSizeError) as _:
+            BlindDwtDctStackedExtractor(selector).extract(np.zeros((8, 8, 3)), (2, 1))
+
+    def test_extract_zero_watermark_size(self, selector):
+        actual = BlindDwtDctStackedExtractor(selector).extract(np.zeros((8, 8, 3)), (0, 0))
+
+        assert actual.shape == (0, 0, 3)
+
+    @pytest.mark.parametrize('channel_spec', ['', 'r', 'g', 'b', 'rg', 'rb', 'gb', 'rgb'])
+    def test_extraction_matches_channel_extraction(self, channel_spec):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (64, 48, 3), dtype=np.uint8)
+
+        channel_extractor = BlindDwtDctChannelExtractor(PermutationIndicesSelector(42))
+        expected = RGBWatermarkExtractor(channel_extractor, channel_spec).extract(
+            tuple(np.moveaxis(image, -1, 0)), (4, 6)
+        )
+
+        actual = BlindDwtDctStackedExtractor(PermutationIndicesSelector(42), channel_spec).extract(image, (4, 6))
+
+        assert actual.shape == (4, 6, 3)
+        for i in range(3):
+            assert np.array_equal(actual[..., i], expected[i])
+
+    @pytest.mark.parametrize('precision', list(Precision))
+    @pytest.mark.parametrize('backend', list(DwtBackend))
+    def test_round_trip(self, selector, backend, precision):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        watermark = rng.integers(0, 256, (4, 8, 3), dtype=np.uint8)
+
+        embedded = BlindDwtDctStackedEmbedder(1.0, selector, 'rgb', precision).embed(image, watermark)
+        actual = BlindDwtDctStackedExtractor(selector, 'rgb', backend, precision).extract(embedded, (4, 8))
+
+        assert np.array_equal(actual, watermark)
@@ -0,0 +1,102 @@
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src import __main__ as cli
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.exceptions import ImageChannelError, WatermarkSizeError
+from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+from src.extraction.coefficient_analysis import CoefficientAnalysis
+from src.randomization.selection import create_indices_selector, SELECTIONS
+from src.transformation.image import array_to_image
+from src.transformation.precision import Precision
+from tests.stub.indices_selector_stub import IndicesSelectorStub
+
+
+class TestCoefficientAnalysis:
+
+    @pytest.fixture
+    def selector(self):
+        """
+        :return: Indices selector that always returns the same indices in interval (0, selection).
+        """
+        return IndicesSelectorStub(lambda _, selection: list(range(0, selection)))
+
+    @pytest.mark.parametrize('image', [np.empty((0, 0, 3)), None])
+    def test_empty_image(self, image):
+        with pytest.raises(ImageChannelError) as _:
+            CoefficientAnalysis(image)
+
+    def test_extract_watermark_too_large(self, selector):
+        with pytest.raises(WatermarkSizeError) as _:
+            CoefficientAnalysis(np.zeros((8, 8, 3))).extract(selector, (2, 1))
+
+    def test_extract_zero_watermark_size(self, selector):
+        actual = CoefficientAnalysis(np.zeros((8, 8, 3))).extract(selector, (0, 0))
+
+        assert actual.shape == (0, 0, 3)
+
+    def test_extract_without_selector(self):
+        with pytest.raises(TypeError) as _:
+            CoefficientAnalysis(np.zeros((8, 8, 3))).extract(None, (1, 1))
+
+    @pytest.mark.parametrize('channel_spec', ['', 'r', 'gb', 'bgr'])
+    def test_channels(self, channel_spec):
+        assert CoefficientAnalysis(np.zeros((8, 8, 3)), channel_spec).channels == ''.join(
+            channel for channel in 'rgb' if channel in channel_spec
+        )
+
+    @pytest.mark.parametrize('selection', SELECTIONS)
+    @pytest.mark.parametrize('channel_spec', ['', 'g', 'rb', 'rgb'])
+    @pytest.mark.parametrize('image_shape', [(64, 48, 3), (66, 50, 3)])
+    def test_extraction_matches_stacked_extraction(self, selection, channel_spec, image_shape):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, image_shape, dtype=np.uint8)
+        analysis = CoefficientAnalysis(image, channel_spec)
+
+        for seed in [0, 1, 42]:
+            for watermark_shape in [(4, 6), (3, 3), (1, 7)]:
+                expected = BlindDwtDctStackedExtractor(
+                    create_indices_selector(seed, selection), channel_spec
+                ).extract(image, watermark_shape)
+
+                actual = analysis.extract(create_indices_selector(seed, selection), watermark_shape)
+
+                assert np.array_equal(actual, expected)
+
+    @pytest.mark.parametrize('precision', list(Precision))
+    def test_round_trip(self, precision):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        watermark = rng.integers(0, 256, (4, 8, 3), dtype=np.uint8)
+
+        embedded = BlindDwtDctStackedEmbedder(
+            1.0, create_indices_selector(7, 'keyed'), 'rgb', precision
+        ).embed(image, watermark)
+        analysis = CoefficientAnalysis(embedded, precision=precision)
+
+        assert np.array_equal(analysis.extract(create_indices_selector(7, 'keyed'), (4, 8)), watermark)
+        assert not np.array_equal(analysis.extract(create_indices_selector(8, 'keyed'), (4, 8)), watermark)
+
+    def test_command_line(self, tmp_path, monkeypatch):
+        rng = np.random.default_rng(0)
+        watermark = rng.integers(0, 256, (4, 8, 3), dtype=np.uint8)
+        embedded = BlindDwtDctStackedEmbedder(10.0, create_indices_selector(7, 'compatible')).embed(
+            rng.integers(0, 256, (64, 64, 3), dtype=np.uint8), watermark
+        )
+        array_to_image(str(tmp_path / 'embedded.png'), embedded)
+
+        args = [
+            'shadowmark', '-i', str(tmp_path / 'embedded.png'), '-o', str(tmp_path / 'extracted.png'),
+            '-s', '7', '8', '-x', '8x4', '4x4'
+        ]
+        monkeypatch.setattr(sys, 'argv', args)
+        monkeypatch.setattr(cli, 'argv', args)
+        cli.main()
+
+        assert sorted(path.name for path in tmp_path.glob('extracted-*.png')) == [
+            'extracted-7-4x4.png', 'extracted-7-8x4.png', 'extracted-8-4x4.png', 'extracted-8-8x4.png'
+        ]
+        assert np.array_equal(np.asarray(Image.open(tmp_path / 'extracted-7-8x4.png')), watermark)
@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pytest
 
@@ -50,4 +52,18 @@ class TestRGBWatermarkExtractor:
 
         assert np.array_equal(actual[0], expected[0])
         assert np.array_equal(actual[1], expected[1])
-        assert np.array_equal(actual[2], expected[2])
\ No newline at end of file
+        assert np.array_equal(actual[2], expected[2])
+
+    @pytest.mark.parametrize('channel_spec', ['', 'g', 'rb', 'rgb'])
+    def test_concurrent_extraction(self, channel_spec):
+        input_channels = tuple(np.full((4, 4), value, dtype=np.uint8) for value in (1, 2, 3))
+        channel_extractor = ChannelExtractorStub(lambda channel, size: np.full(size, channel[0, 0], dtype=np.uint8))
+
+        expected = RGBWatermarkExtractor(channel_extractor, channel_spec).extract(input_channels, _default_shape)
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            rgb_extractor = RGBWatermarkExtractor(channel_extractor, channel_spec, executor)
+            actual = rgb_extractor.extract(input_channels, _default_shape)
+
+        for a, e in zip(actual, expected):
+            assert np.array_equal(a, e)
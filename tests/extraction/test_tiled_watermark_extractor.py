@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.embedding.tiled_watermark_embedder import TiledWatermarkEmbedder
+from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+from src.extraction.tiled_watermark_extractor import TiledWatermarkExtractor
+from src.randomization.keyed_indices_selector import KeyedIndicesSelector
+
+
+class TestTiledWatermarkExtractor:
+
+    @pytest.fixture
+    def extractor(self):
+        return BlindDwtDctStackedExtractor(KeyedIndicesSelector(42))
+
+    @pytest.fixture
+    def watermark(self):
+        return np.random.default_rng(1).integers(0, 256, (4, 4, 3), dtype=np.uint8)
+
+    @pytest.fixture
+    def embedded(self, watermark):
+        # Keeps pixel values away from 0 and 255, so that no embedded bits are lost by clipping
+        image = np.random.default_rng(0).integers(64, 192, (100, 100, 3), dtype=np.uint8)
+        embedder = BlindDwtDctStackedEmbedder(3.0, KeyedIndicesSelector(42))
+
+        return TiledWatermarkEmbedder(embedder, 32).embed(image, watermark)
+
+    @pytest.mark.parametrize('tile_size', [0, -1])
+    def test_invalid_tile_size(self, extractor, tile_size):
+        with pytest.raises(ValueError) as _:
+            TiledWatermarkExtractor(extractor, tile_size)
+
+    def test_round_trip(self, extractor, embedded, watermark):
+        actual = TiledWatermarkExtractor(extractor, 32).extract(embedded, (4, 4))
+
+        assert np.array_equal(actual, watermark)
+
+    def test_majority_vote(self, extractor, embedded, watermark):
+        # Destroys the watermark in the first row of tiles, which is outvoted by the other two rows
+        damaged = embedded.copy()
+        damaged[:33] = np.random.default_rng(2).integers(0, 256, damaged[:33].shape, dtype=np.uint8)
+
+        actual = TiledWatermarkExtractor(extractor, 32).extract(damaged, (4, 4))
+
+        assert np.array_equal(actual, watermark)
+
+    def test_concurrent_extraction(self, extractor, embedded):
+        expected = TiledWatermarkExtractor(extractor, 32).extract(embedded, (4, 4))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            actual = TiledWatermarkExtractor(extractor, 32, executor).extract(embedded, (4, 4))
+
+        assert np.array_equal(actual, expected)
@@ -0,0 +1,122 @@
+import json
+import sys
+
+import numpy as np
+import pytest
+
+from src import __main__ as cli
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.exceptions import ImageChannelError, WatermarkSizeError
+from src.extraction.watermark_detector import WatermarkDetector
+from src.randomization.selection import create_indices_selector, SELECTIONS
+from src.transformation.image import array_to_image
+from src.transformation.precision import Precision
+
+
+def _image(shape=(256, 256, 3)) -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+
+def _watermark(shape=(16, 16, 3)) -> np.ndarray:
+    return np.random.default_rng(1).integers(0, 256, shape, dtype=np.uint8)
+
+
+def _embedded(seed: int = 7, selection: str = 'compatible', header: bool = False, watermark=None) -> np.ndarray:
+    embedder = BlindDwtDctStackedEmbedder(10.0, create_indices_selector(seed, selection), header=header)
+    watermark = _watermark() if watermark is None else watermark
+    return np.clip(np.round(embedder.embed(_image(), watermark)), 0, 255).astype(np.uint8)
+
+
+class TestWatermarkDetector:
+
+    @pytest.mark.parametrize('image', [np.empty((0, 0, 3)), None])
+    def test_empty_image(self, image):
+        with pytest.raises(ImageChannelError) as _:
+            WatermarkDetector(create_indices_selector(7, 'compatible')).detect(image, _watermark())
+
+    def test_empty_watermark(self):
+        with pytest.raises(ImageChannelError) as _:
+            WatermarkDetector(create_indices_selector(7, 'compatible')).detect(_image(), np.empty((0, 0, 3)))
+
+    def test_watermark_too_large(self):
+        with pytest.raises(WatermarkSizeError) as _:
+            WatermarkDetector(create_indices_selector(7, 'compatible')).detect(_image(), _watermark((33, 32, 3)))
+
+    def test_without_selector(self):
+        with pytest.raises(TypeError) as _:
+            WatermarkDetector(None)
+
+    @pytest.mark.parametrize('parameters', [
+        {'agreement': 0.5},
+        {'agreement': 1.0},
+        {'false_positive_rate': 0.0},
+        {'false_negative_rate': 1.0},
+        {'false_positive_rate': 0.5, 'false_negative_rate': 0.5},
+    ])
+    def test_invalid_parameters(self, parameters):
+        with pytest.raises(ValueError) as _:
+            WatermarkDetector(create_indices_selector(7, 'compatible'), **parameters)
+
+    @pytest.mark.parametrize('selection', SELECTIONS)
+    def test_present(self, selection):
+        actual = WatermarkDetector(create_indices_selector(7, selection)).detect(_embedded(7, selection), _watermark())
+
+        assert actual.present
+        assert actual.score > 0.8
+        assert actual.p_value <= 1e-6
+        assert actual.bits < actual.total_bits // 4
+        assert actual.total_bits == 16 * 16 * 8 * 3
+
+    @pytest.mark.parametrize('image, seed, watermark', [
+        (_image(), 7, _watermark()),
+        (_embedded(), 8, _watermark()),
+        (_embedded(), 7, _watermark()[::-1]),
+    ])
+    def test_absent(self, image, seed, watermark):
+        actual = WatermarkDetector(create_indices_selector(seed, 'compatible')).detect(image, watermark)
+
+        assert not actual.present
+        assert 0.3 < actual.score < 0.7
+        assert actual.p_value > 1e-6
+        assert actual.bits < actual.total_bits // 4
+
+    def test_inconclusive(self):
+        # The error rates cannot be established by the bits of a single small watermark, so all bits are read
+        detector = WatermarkDetector(
+            create_indices_selector(7, 'compatible'), 'r', false_positive_rate=1e-300, false_negative_rate=1e-300
+        )
+        actual = detector.detect(_embedded(watermark=_watermark((1, 1, 3))), _watermark((1, 1, 3)))
+
+        assert not actual.present
+        assert actual.bits == actual.total_bits == 8
+        assert actual.score == 1.0
+
+    def test_no_channels(self):
+        actual = WatermarkDetector(create_indices_selector(7, 'compatible'), '').detect(_embedded(), _watermark())
+
+        assert actual == (False, 0.0, 1.0, 0, 0)
+
+    @pytest.mark.parametrize('precision', list(Precision))
+    def test_header(self, precision):
+        detector = WatermarkDetector(create_indices_selector(7, 'keyed'), precision=precision, header=True)
+
+        assert detector.detect(_embedded(7, 'keyed', header=True), _watermark()).present
+        assert not detector.detect(_embedded(7, 'keyed'), _watermark()).present
+
+    @pytest.mark.parametrize('seed, expected_status', [(7, 0), (8, 1)])
+    def test_command_line(self, tmp_path, monkeypatch, capsys, seed, expected_status):
+        array_to_image(str(tmp_path / 'embedded.png'), _embedded())
+        array_to_image(str(tmp_path / 'watermark.png'), _watermark())
+
+        args = [
+            'shadowmark', 'detect', '-i', str(tmp_path / 'embedded.png'), '-w', str(tmp_path / 'watermark.png'),
+            '-s', str(seed)
+        ]
+        monkeypatch.setattr(sys, 'argv', args)
+        monkeypatch.setattr(cli, 'argv', args)
+
+        with pytest.raises(SystemExit) as e:
+            cli.main()
+
+        assert e.value.code == expected_status
+        assert json.loads(capsys.readouterr().out)['present'] == (expected_status == 0)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src.randomization import cached_indices_selector
+from src.randomization.cached_indices_selector import CachedIndicesSelector
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+from src.randomization.selection import create_indices_selector, SELECTIONS
+
+
+class _CountingSelector(PermutationIndicesSelector):
+    calls = 0
+
+    def indices(self, total_range_size, selection_size, channel_id=None):
+        _CountingSelector.calls += 1
+        return super().indices(total_range_size, selection_size, channel_id)
+
+
+class TestCachedIndicesSelector:
+
+    @pytest.fixture
+    def calls(self):
+        return [(1000, 64, 'r'), (1000, 64, 'g'), (1000, 64, 'b'), (500, 10, None)]
+
+    @pytest.mark.parametrize('selection', SELECTIONS)
+    def test_same_as_fresh_selector(self, selection, calls):
+        expected_selector = create_indices_selector(42, selection)
+        expected = [np.asarray(expected_selector.indices(*call)) for call in calls]
+
+        for _ in range(2):
+            selector = CachedIndicesSelector(42, selection)
+            actual = [selector.indices(*call) for call in calls]
+
+            assert all(np.array_equal(a, e) for a, e in zip(actual, expected))
+
+    def test_depends_on_previous_calls(self):
+        selector = CachedIndicesSelector(42, 'compatible')
+        first = selector.indices(1000, 64, 'r')
+
+        assert not np.array_equal(selector.indices(1000, 64, 'r'), first)
+        assert np.array_equal(CachedIndicesSelector(42, 'compatible').indices(1000, 64, 'r'), first)
+
+    def test_previous_calls_are_not_replayed(self, calls, monkeypatch):
+        monkeypatch.setattr(cached_indices_selector, 'create_indices_selector', lambda seed, _: _CountingSelector(seed))
+        monkeypatch.setattr(_CountingSelector, 'calls', 0)
+
+        # A seed not used by other tests, so that no calls are cached yet
+        for _ in range(2):
+            selector = CachedIndicesSelector(271828, 'compatible')
+            actual = [selector.indices(*call) for call in calls]
+
+        expected_selector = PermutationIndicesSelector(271828)
+        expected = [np.asarray(expected_selector.indices(*call)) for call in calls]
+
+        assert _CountingSelector.calls == len(calls)
+        assert all(np.array_equal(a, e) for a, e in zip(actual, expected))
+
+    def test_read_only(self):
+        actual = CachedIndicesSelector(42, 'sparse').indices(1000, 64, 'r')
+
+        with pytest.raises(ValueError) as _:
+            actual[0] = 0
+
+    def test_invalid_selection(self):
+        with pytest.raises(ValueError) as _:
+            CachedIndicesSelector(42, 'unknown').indices(1000, 64, 'r')
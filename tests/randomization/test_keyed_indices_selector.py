@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.randomization.keyed_indices_selector import KeyedIndicesSelector
+
+
+class TestKeyedIndicesSelector:
+
+    @pytest.fixture
+    def seed(self):
+        return 1234567890
+
+    @pytest.mark.parametrize('total_size, selection_size', [(0, 42), (42, 0)])
+    def test_empty(self, seed, total_size, selection_size):
+        assert KeyedIndicesSelector(seed).indices(total_size, selection_size, 'r').size == 0
+
+    @pytest.mark.parametrize('total_size, selection_size', [(10, 10), (42, 43), (100_000, 1), (10_000_000, 8192)])
+    def test_selection(self, seed, total_size, selection_size):
+        actual = KeyedIndicesSelector(seed).indices(total_size, selection_size, 'g')
+
+        assert actual.size == min(total_size, selection_size)
+        assert np.unique(actual).size == actual.size
+        assert actual.min() >= 0
+        assert actual.max() < total_size
+
+    def test_independent_of_call_order(self, seed):
+        selector = KeyedIndicesSelector(seed)
+        expected = selector.indices(1000, 64, 'g')
+
+        selector.indices(1000, 64, 'r')
+
+        assert np.array_equal(selector.indices(1000, 64, 'g'), expected)
+        assert np.array_equal(KeyedIndicesSelector(seed).indices(1000, 64, 'g'), expected)
+
+    def test_channels_differ(self, seed):
+        selector = KeyedIndicesSelector(seed)
+
+        assert not np.array_equal(selector.indices(1000, 64, 'r'), selector.indices(1000, 64, 'g'))
+
+    def test_seeds_differ(self, seed):
+        assert not np.array_equal(
+            KeyedIndicesSelector(seed).indices(1000, 64, 'r'),
+            KeyedIndicesSelector(seed + 1).indices(1000, 64, 'r')
+        )
+
+    def test_shared_across_threads(self, seed):
+        selector = KeyedIndicesSelector(seed)
+        expected = [selector.indices(10_000, 512, channel_id) for channel_id in 'rgb' * 8]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            actual = list(executor.map(lambda channel_id: selector.indices(10_000, 512, channel_id), 'rgb' * 8))
+
+        for a, e in zip(actual, expected):
+            assert np.array_equal(a, e)
@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 
-from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector, SelectionMode
 
 
 class TestPermutationIndicesSelector:
@@ -36,3 +37,31 @@ class TestPermutationIndicesSelector:
         selector2 = PermutationIndicesSelector(seed)
 
         assert selector1.indices(total_size, selection_size) == selector2.indices(total_size, selection_size)
+
+    def test_compatible_sequence(self, seed):
+        selector = PermutationIndicesSelector(seed)
+
+        assert selector.indices(20, 8) == [12, 10, 9, 7, 11, 17, 8, 14]
+
+    @pytest.mark.parametrize('total_size, selection_size', [(0, 42), (42, 0)])
+    def test_sparse_empty(self, seed, total_size, selection_size):
+        actual = PermutationIndicesSelector(seed, SelectionMode.SPARSE).indices(total_size, selection_size)
+
+        assert isinstance(actual, np.ndarray)
+        assert actual.size == 0
+
+    @pytest.mark.parametrize('total_size, selection_size', [(10, 10), (42, 43), (100_000, 1), (10_000_000, 8192)])
+    def test_sparse_selection(self, seed, total_size, selection_size):
+        actual = PermutationIndicesSelector(seed, SelectionMode.SPARSE).indices(total_size, selection_size)
+
+        assert isinstance(actual, np.ndarray)
+        assert actual.size == min(total_size, selection_size)
+        assert np.unique(actual).size == actual.size
+        assert actual.min() >= 0
+        assert actual.max() < total_size
+
+    def test_sparse_consistency(self, seed):
+        selector1 = PermutationIndicesSelector(seed, SelectionMode.SPARSE)
+        selector2 = PermutationIndicesSelector(seed, 'sparse')
+
+        assert np.array_equal(selector1.indices(1000, 64), selector2.indices(1000, 64))
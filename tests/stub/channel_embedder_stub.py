@@ -8,5 +8,5 @@ class ChannelEmbedderStub(ChannelEmbedder):
     def __init__(self, function: Callable[[any, list[int]], any]):
         self._function = function
 
-    def embed(self, channel, watermark_bits):
+    def embed(self, channel, watermark_bits, channel_id=None):
         return self._function(channel, watermark_bits)
@@ -8,5 +8,5 @@ class ChannelExtractorStub(ChannelExtractor):
     def __init__(self, extraction_function: Callable[[any, int], any]):
         self._function = extraction_function
 
-    def extract(self, channel, watermark_size):
+    def extract(self, channel, watermark_size, channel_id=None):
         return self._function(channel, watermark_size)
\ No newline at end of file
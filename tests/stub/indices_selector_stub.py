@@ -8,5 +8,5 @@ class IndicesSelectorStub(IndicesSelector):
     def __init__(self, function: Callable[[int, int], list[int]]):
         self._function = function
 
-    def indices(self, n: int, l: int):
+    def indices(self, n: int, l: int, channel_id=None):
         return self._function(n, l)
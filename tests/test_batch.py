@@ -0,0 +1,235 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src import __main__ as cli
+from src.batch import walk_inputs, output_paths, shard, file_digest, process_batch, Journal, \
+    BatchResult, EmbeddingTask, ExtractionTask, ScanTask
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+
+
+class TestBatch:
+
+    @pytest.fixture
+    def watermark(self):
+        return np.random.default_rng(1).integers(0, 256, (4, 4, 3), dtype=np.uint8)
+
+    @pytest.fixture
+    def input_dir(self, tmp_path):
+        input_dir = tmp_path / 'input'
+        (input_dir / 'nested').mkdir(parents=True)
+
+        rng = np.random.default_rng(0)
+        for name in ['a.png', 'b.png', os.path.join('nested', 'c.png')]:
+            Image.fromarray(rng.integers(64, 192, (40, 48, 3), dtype=np.uint8)).save(input_dir / name)
+
+        (input_dir / '.hidden.png').write_bytes(b'')
+        return input_dir
+
+    def test_walking_directory(self, input_dir):
+        (input_dir / 'nested' / 'deeper').mkdir()
+        (input_dir / 'nested' / 'deeper' / 'd.png').write_bytes(b'')
+        (input_dir / '.hidden').mkdir()
+        (input_dir / '.hidden' / 'e.png').write_bytes(b'')
+
+        actual = walk_inputs(str(input_dir))
+
+        assert not isinstance(actual, list)
+        assert list(actual) == [
+            str(input_dir / 'a.png'), str(input_dir / 'b.png'), str(input_dir / 'nested' / 'c.png'),
+            str(input_dir / 'nested' / 'deeper' / 'd.png')
+        ]
+
+    def test_walking_glob(self, input_dir):
+        actual = walk_inputs(str(input_dir / '**' / '*.png'))
+
+        assert sorted(actual) == [
+            str(input_dir / 'a.png'), str(input_dir / 'b.png'), str(input_dir / 'nested' / 'c.png')
+        ]
+
+    def test_walking_manifest(self, input_dir, tmp_path):
+        manifest = tmp_path / 'manifest.txt'
+        manifest.write_text(f'# images\n{input_dir / "b.png"}\n\n  {input_dir / "a.png"}  \n')
+
+        actual = walk_inputs(str(manifest))
+
+        assert list(actual) == [str(input_dir / 'b.png'), str(input_dir / 'a.png')]
+
+    def test_walking_missing_source(self, tmp_path):
+        assert list(walk_inputs(str(tmp_path / 'missing'))) == []
+
+    def test_output_paths(self, tmp_path):
+        inputs = [str(tmp_path / 'in' / 'a.png'), str(tmp_path / 'in' / 'nested' / 'a.png')]
+
+        actual = output_paths(inputs, str(tmp_path / 'out'))
+
+        assert actual == [str(tmp_path / 'out' / 'a.png'), str(tmp_path / 'out' / 'nested' / 'a.png')]
+
+    def test_output_paths_of_no_inputs(self, tmp_path):
+        assert output_paths([], str(tmp_path)) == []
+
+    @pytest.mark.parametrize('count', [1, 2, 5])
+    def test_sharding(self, count):
+        paths = [f'image{i}.png' for i in range(100)]
+
+        actual = [shard(paths, index, count) for index in range(count)]
+
+        assert sorted(path for paths_of_shard in actual for path in paths_of_shard) == sorted(paths)
+        # Assignment of a path does not depend on other paths
+        assert all(shard([path], index, count) == [path] for index in range(count) for path in actual[index])
+
+    @pytest.mark.parametrize('index, count', [(-1, 2), (2, 2), (0, 0)])
+    def test_invalid_shard(self, index, count):
+        with pytest.raises(ValueError) as _:
+            shard(['image.png'], index, count)
+
+    def test_journal(self, tmp_path):
+        path = str(tmp_path / 'journal.jsonl')
+
+        with Journal(path, {'seed': 1}) as journal:
+            assert journal.completed() == set()
+            journal.record('a.png', 'aaa')
+            journal.record('b.png', 'bbb')
+
+        with Journal(path, {'seed': 2}) as journal:
+            journal.record('c.png', 'ccc')
+
+        assert Journal(path, {'seed': 1}).completed() == {('a.png', 'aaa'), ('b.png', 'bbb')}
+        assert Journal(path, {'seed': 2}).completed() == {('c.png', 'ccc')}
+
+    def test_journal_with_incomplete_record(self, tmp_path):
+        path = tmp_path / 'journal.jsonl'
+
+        with Journal(str(path), {'seed': 1}) as journal:
+            journal.record('a.png', 'aaa')
+
+        with open(path, 'a') as file:
+            file.write('{"input": "b.png", "sha')
+
+        with Journal(str(path), {'seed': 1}) as journal:
+            journal.record('c.png', 'ccc')
+
+        assert Journal(str(path), {'seed': 1}).completed() == {('a.png', 'aaa'), ('c.png', 'ccc')}
+
+    def test_embedding(self, input_dir, watermark, tmp_path):
+        inputs = list(walk_inputs(str(input_dir / '**' / '*.png')))
+        outputs = output_paths(inputs, str(tmp_path / 'output'))
+        task = EmbeddingTask(1.0, PermutationIndicesSelector(42), watermark)
+
+        actual = list(process_batch(task, zip(inputs, outputs), 2))
+
+        assert sorted(actual) == [BatchResult(path) for path in inputs]
+        for input_path, output_path in zip(inputs, outputs):
+            image = np.array(Image.open(input_path))
+            # Every image is embedded with a fresh copy of the selector, as if it was embedded alone
+            expected = BlindDwtDctStackedEmbedder(1.0, PermutationIndicesSelector(42)).embed(image, watermark)
+            assert np.array_equal(np.array(Image.open(output_path)), expected.clip(0, 255).astype(np.uint8))
+
+    def test_extraction(self, input_dir, watermark, tmp_path):
+        inputs = list(walk_inputs(str(input_dir)))
+        embedded = output_paths(inputs, str(tmp_path / 'embedded'))
+        extracted = output_paths(embedded, str(tmp_path / 'extracted'))
+
+        list(process_batch(EmbeddingTask(4.0, PermutationIndicesSelector(42), watermark), zip(inputs, embedded), 1))
+        actual = list(process_batch(ExtractionTask(PermutationIndicesSelector(42), (4, 4)), zip(embedded, extracted)))
+
+        assert sorted(actual) == [BatchResult(path) for path in embedded]
+        for path in extracted:
+            assert np.array_equal(np.array(Image.open(path)), watermark)
+
+    def test_failures_do_not_abort(self, input_dir, watermark, tmp_path):
+        broken = input_dir / 'broken.png'
+        broken.write_bytes(b'not an image')
+        inputs = [str(input_dir / 'a.png'), str(broken), str(input_dir / 'missing.png'), str(input_dir / 'b.png')]
+        outputs = output_paths(inputs, str(tmp_path / 'output'))
+
+        results = process_batch(EmbeddingTask(1.0, PermutationIndicesSelector(42), watermark), zip(inputs, outputs))
+        actual = {result.input_path: result.error for result in results}
+
+        assert actual[str(input_dir / 'a.png')] is None
+        assert actual[str(input_dir / 'b.png')] is None
+        assert actual[str(broken)] is not None
+        assert actual[str(input_dir / 'missing.png')] is not None
+        assert os.path.isfile(outputs[0]) and os.path.isfile(outputs[3])
+
+    def test_skipping_completed(self, input_dir, watermark, tmp_path):
+        inputs = list(walk_inputs(str(input_dir)))
+        outputs = output_paths(inputs, str(tmp_path / 'output'))
+        task = EmbeddingTask(1.0, PermutationIndicesSelector(42), watermark)
+        completed = {(inputs[0], file_digest(inputs[0])), (inputs[1], 'outdated')}
+
+        actual = sorted(process_batch(task, zip(inputs, outputs), 1, completed))
+
+        assert actual == [
+            BatchResult(inputs[0], digest=file_digest(inputs[0]), skipped=True),
+            BatchResult(inputs[1], digest=file_digest(inputs[1])),
+            BatchResult(inputs[2], digest=file_digest(inputs[2]))
+        ]
+        assert not os.path.exists(outputs[0])
+        assert os.path.isfile(outputs[1])
+
+    @pytest.mark.parametrize('max_bit_error_rate', [-0.1, 0.5])
+    def test_invalid_scan(self, watermark, max_bit_error_rate):
+        with pytest.raises(ValueError) as _:
+            ScanTask(PermutationIndicesSelector(42), watermark, max_bit_error_rate=max_bit_error_rate)
+
+    def test_scan(self, input_dir, watermark, tmp_path):
+        inputs = list(walk_inputs(str(input_dir)))
+        embedded = output_paths(inputs, str(tmp_path / 'embedded'))
+        list(process_batch(EmbeddingTask(4.0, PermutationIndicesSelector(42), watermark), zip(inputs, embedded), 1))
+        task = ScanTask(PermutationIndicesSelector(42), watermark)
+
+        actual = {result.input_path: result.value for result in process_batch(task, ((path, None) for path in [
+            embedded[0], inputs[1]
+        ]))}
+
+        assert actual[embedded[0]].match
+        assert actual[embedded[0]].bit_error_rates == {'r': 0.0, 'g': 0.0, 'b': 0.0}
+        assert actual[embedded[0]].decoding_time >= 0 and actual[embedded[0]].extraction_time >= 0
+        assert not actual[inputs[1]].match
+        assert all(0.2 < rate < 0.8 for rate in actual[inputs[1]].bit_error_rates.values())
+
+    def test_scan_command(self, input_dir, watermark, tmp_path, monkeypatch):
+        Image.fromarray(watermark).save(tmp_path / 'watermark.png')
+        (input_dir / 'broken.png').write_bytes(b'not an image')
+        output = tmp_path / 'scan.jsonl'
+
+        args = [
+            'shadowmark', 'scan', '-i', str(input_dir), '-w', str(tmp_path / 'watermark.png'), '-o', str(output),
+            '-p', '1'
+        ]
+        monkeypatch.setattr(sys, 'argv', args)
+        monkeypatch.setattr(cli, 'argv', args)
+
+        with pytest.raises(SystemExit) as e:
+            cli.main()
+
+        records = {record['path']: record for record in map(json.loads, output.read_text().splitlines())}
+        assert e.value.code == 1
+        assert sorted(records) == sorted(
+            str(input_dir / name) for name in ['a.png', 'b.png', 'broken.png', os.path.join('nested', 'c.png')]
+        )
+        assert 'error' in records[str(input_dir / 'broken.png')]
+        assert set(records[str(input_dir / 'a.png')]) == {'path', 'ber', 'match', 'timing'}
+        assert not records[str(input_dir / 'a.png')]['match']
+
+    def test_batch_command_walks_subdirectories(self, input_dir, watermark, tmp_path, monkeypatch):
+        Image.fromarray(watermark).save(tmp_path / 'watermark.png')
+        output_dir = tmp_path / 'output'
+
+        args = [
+            'shadowmark', 'batch', '-i', str(input_dir), '-e', str(tmp_path / 'watermark.png'), '-o', str(output_dir),
+            '-p', '1'
+        ]
+        monkeypatch.setattr(sys, 'argv', args)
+        monkeypatch.setattr(cli, 'argv', args)
+        cli.main()
+
+        assert sorted(str(path.relative_to(output_dir)) for path in output_dir.rglob('*.png')) == [
+            'a.png', 'b.png', os.path.join('nested', 'c.png')
+        ]
@@ -0,0 +1,69 @@
+import json
+import sys
+
+import pytest
+
+from benchmarks.__main__ import main
+from benchmarks.suite import BENCHMARKS, run, compare, parse_size
+
+
+class TestBenchmarks:
+
+    def test_parse_size(self):
+        assert parse_size('vga') == (480, 640)
+        assert parse_size('64x48') == (48, 64)
+
+        with pytest.raises(ValueError) as _:
+            parse_size('huge')
+
+    def test_run_all_benchmarks(self, tmp_path):
+        measurements = list(run(['64x48'], ['2x2', '8x8'], str(tmp_path), repeat=2))
+
+        # The 8x8 watermark does not fit the image, so only the 2x2 one is measured
+        assert {measurement.benchmark for measurement in measurements} == set(BENCHMARKS)
+        assert {measurement.watermark for measurement in measurements} == {None, '2x2'}
+
+        for measurement in measurements:
+            assert measurement.image == '64x48'
+            assert len(measurement.times) == 2
+            assert 0 <= measurement.best <= measurement.median
+
+    def test_unknown_benchmark(self, tmp_path):
+        with pytest.raises(ValueError) as _:
+            list(run(['64x48'], ['2x2'], str(tmp_path), ['unknown']))
+
+    def test_compare(self):
+        baseline = [
+            {'benchmark': 'zigzag.scan', 'image': '64x48', 'watermark': None, 'best': 1.0},
+            {'benchmark': 'round_trip', 'image': '64x48', 'watermark': '2x2', 'best': 1.0},
+        ]
+        results = [
+            {'benchmark': 'zigzag.scan', 'image': '64x48', 'watermark': None, 'best': 1.05},
+            {'benchmark': 'round_trip', 'image': '64x48', 'watermark': '2x2', 'best': 1.2},
+            {'benchmark': 'round_trip', 'image': '64x48', 'watermark': '4x4', 'best': 9.0},
+        ]
+
+        comparisons = compare(results, baseline, 0.1)
+
+        assert [(c.benchmark, c.regression) for c in comparisons] == [('zigzag.scan', False), ('round_trip', True)]
+        assert comparisons[1].ratio == pytest.approx(1.2)
+
+    def test_regression_exit_status(self, tmp_path, monkeypatch):
+        output = tmp_path / 'results.json'
+        baseline = tmp_path / 'baseline.json'
+        args = ['benchmarks', '-s', '64x48', '-w', '2x2', '-b', 'zigzag.scan', '-r', '1', '-o', str(output)]
+
+        monkeypatch.setattr(sys, 'argv', args)
+        assert main() == 0
+
+        report = json.loads(output.read_text())
+        assert [record['benchmark'] for record in report['results']] == ['zigzag.scan']
+        assert 'comparison' not in report
+
+        # A baseline that is infinitely fast makes every case a regression
+        report['results'][0]['best'] = 0.0
+        baseline.write_text(json.dumps(report))
+
+        monkeypatch.setattr(sys, 'argv', args + ['--baseline', str(baseline)])
+        assert main() == 1
+        assert json.loads(output.read_text())['comparison']['regressions'] == 1
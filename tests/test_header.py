@@ -0,0 +1,240 @@
+import sys
+
+import numpy as np
+import pytest
+
+from src import __main__ as cli
+from src import header
+from src.embedding.blind_dwt_dct_channel_embedder import BlindDwtDctChannelEmbedder
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.embedding.rgb_watermark_embedder import RGBWatermarkEmbedder
+from src.exceptions import HeaderError, WatermarkSizeError
+from src.extraction.blind_dwt_dct_channel_extractor import BlindDwtDctChannelExtractor
+from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+from src.extraction.coefficient_analysis import CoefficientAnalysis
+from src.extraction.rgb_watermark_extractor import RGBWatermarkExtractor
+from src.header import HEADER_COEFFICIENTS, encode_header, decode_header, payload_indices, select_indices, \
+    prepend_header
+from src.randomization.selection import create_indices_selector
+from src.transformation.image import array_to_image, image_to_array
+
+
+def _image(shape=(128, 128, 3)) -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+
+def _watermark(shape=(4, 8, 3)) -> np.ndarray:
+    return np.random.default_rng(1).integers(0, 256, shape, dtype=np.uint8)
+
+
+class TestHeader:
+
+    @pytest.mark.parametrize('watermark_shape', [(0, 0), (32, 32), (1, 3072), (65535, 65535)])
+    def test_round_trip(self, watermark_shape):
+        bits = encode_header(watermark_shape)
+
+        assert bits.shape == (HEADER_COEFFICIENTS,)
+        assert decode_header(bits.astype(np.float64)) == watermark_shape
+
+    @pytest.mark.parametrize('watermark_shape', [(65536, 1), (1, -1)])
+    def test_too_large_watermark(self, watermark_shape):
+        with pytest.raises(WatermarkSizeError) as _:
+            encode_header(watermark_shape)
+
+    def test_noisy_repetitions(self):
+        bits = encode_header((32, 32)).astype(np.float64)
+
+        # Two of five repetitions of every bit are flipped, but outweighed by the others
+        noisy = bits.reshape(5, -1).copy()
+        noisy[[0, 3]] *= -0.9
+
+        assert decode_header(noisy.reshape(-1)) == (32, 32)
+
+    def test_stacked_channels(self):
+        bits = encode_header((16, 8)).astype(np.float64)
+        stacked = np.stack([bits, bits, -0.5 * bits], axis=1)
+
+        assert decode_header(stacked) == (16, 8)
+
+    @pytest.mark.parametrize('differences', [
+        np.ones(HEADER_COEFFICIENTS),
+        np.random.default_rng(0).standard_normal(HEADER_COEFFICIENTS),
+        -encode_header((32, 32)),
+    ])
+    def test_invalid_header(self, differences):
+        with pytest.raises(HeaderError) as _:
+            decode_header(differences)
+
+    def test_too_few_differences(self):
+        with pytest.raises(HeaderError) as _:
+            decode_header(encode_header((32, 32))[:-1])
+
+    def test_unsupported_version(self, monkeypatch):
+        monkeypatch.setattr(header, 'HEADER_VERSION', 2)
+        bits = encode_header((32, 32))
+        monkeypatch.undo()
+
+        with pytest.raises(HeaderError, match='version 2') as _:
+            decode_header(bits)
+
+    def test_payload_indices(self):
+        actual = payload_indices(create_indices_selector(0, 'compatible'), HEADER_COEFFICIENTS + 100, 100)
+
+        assert sorted(actual) == list(range(HEADER_COEFFICIENTS, HEADER_COEFFICIENTS + 100))
+
+    def test_payload_too_large(self):
+        with pytest.raises(WatermarkSizeError) as _:
+            payload_indices(create_indices_selector(0, 'compatible'), HEADER_COEFFICIENTS + 100, 101)
+
+    @pytest.mark.parametrize('with_header', [False, True])
+    def test_select_indices(self, with_header):
+        expected_selector = create_indices_selector(0, 'keyed')
+        if with_header:
+            expected = payload_indices(expected_selector, HEADER_COEFFICIENTS + 100, 10, 'g')
+        else:
+            expected = expected_selector.indices(HEADER_COEFFICIENTS + 100, 10, 'g')
+
+        actual = select_indices(create_indices_selector(0, 'keyed'), HEADER_COEFFICIENTS + 100, 10, 'g', with_header)
+
+        assert actual.dtype == np.intp
+        assert np.array_equal(actual, expected)
+
+    def test_prepend_header(self):
+        bits, indices = prepend_header((4, 8), np.ones(10, dtype=np.int8), np.arange(300, 310))
+
+        assert np.array_equal(bits[:HEADER_COEFFICIENTS], encode_header((4, 8)))
+        assert np.array_equal(indices, np.concatenate((np.arange(HEADER_COEFFICIENTS), np.arange(300, 310))))
+
+    def test_prepend_header_to_stacked_channels(self):
+        bits, indices = prepend_header((4, 8), np.ones((10, 3), dtype=np.int8), np.full((10, 3), 300))
+
+        assert bits.shape == indices.shape == (HEADER_COEFFICIENTS + 10, 3)
+
+        for column in range(3):
+            assert np.array_equal(bits[:HEADER_COEFFICIENTS, column], encode_header((4, 8)))
+            assert np.array_equal(indices[:HEADER_COEFFICIENTS, column], np.arange(HEADER_COEFFICIENTS))
+
+    # Only keyed selection allows extracting a subset of the embedded channels
+    @pytest.mark.parametrize('selection, channel_spec', [('compatible', 'rgb'), ('keyed', 'rb')])
+    def test_channel_round_trip(self, selection, channel_spec):
+        image = _image()
+        watermark = _watermark()
+
+        embedder = RGBWatermarkEmbedder(
+            BlindDwtDctChannelEmbedder(1.0, create_indices_selector(7, selection), header=True)
+        )
+        embedded = embedder.embed(tuple(np.moveaxis(image, -1, 0)), tuple(np.moveaxis(watermark, -1, 0)))
+
+        extractor = RGBWatermarkExtractor(
+            BlindDwtDctChannelExtractor(create_indices_selector(7, selection), header=True), channel_spec
+        )
+        actual = extractor.extract(embedded, None)
+
+        for i, channel_id in enumerate('rgb'):
+            expected = watermark[..., i] if channel_id in channel_spec else np.zeros((4, 8))
+            assert np.array_equal(actual[i], expected)
+
+    def test_channel_bytes(self):
+        embedded = BlindDwtDctChannelEmbedder(1.0, create_indices_selector(7, 'compatible'), header=True).embed(
+            _image()[..., 0], b'shadowmark'
+        )
+        actual = BlindDwtDctChannelExtractor(create_indices_selector(7, 'compatible'), header=True).extract(
+            embedded, None
+        )
+
+        assert actual.tobytes() == b'shadowmark'
+        assert actual.shape == (1, 10)
+
+    def test_channel_extraction_of_known_size(self):
+        embedded = BlindDwtDctChannelEmbedder(1.0, create_indices_selector(7, 'compatible'), header=True).embed(
+            _image()[..., 0], b'shadowmark'
+        )
+        actual = BlindDwtDctChannelExtractor(create_indices_selector(7, 'compatible'), header=True).extract(
+            embedded, 10
+        )
+
+        assert actual.tobytes() == b'shadowmark'
+
+    def test_channel_extraction_without_header(self):
+        with pytest.raises(TypeError) as _:
+            BlindDwtDctChannelExtractor(create_indices_selector(7, 'compatible')).extract(_image()[..., 0], None)
+
+    @pytest.mark.parametrize('channel_spec', ['g', 'rgb'])
+    def test_stacked_round_trip(self, channel_spec):
+        watermark = _watermark()
+        embedded = BlindDwtDctStackedEmbedder(
+            1.0, create_indices_selector(7, 'compatible'), channel_spec, header=True
+        ).embed(_image(), watermark)
+
+        actual = BlindDwtDctStackedExtractor(
+            create_indices_selector(7, 'compatible'), channel_spec, header=True
+        ).extract(embedded, None)
+
+        expected = np.zeros_like(watermark)
+        for i, channel_id in enumerate('rgb'):
+            if channel_id in channel_spec:
+                expected[..., i] = watermark[..., i]
+
+        assert np.array_equal(actual, expected)
+
+    def test_stacked_matches_channel_embedding(self):
+        image = _image()
+        watermark = _watermark()
+
+        expected = RGBWatermarkEmbedder(
+            BlindDwtDctChannelEmbedder(1.0, create_indices_selector(7, 'compatible'), header=True)
+        ).embed(tuple(np.moveaxis(image, -1, 0)), tuple(np.moveaxis(watermark, -1, 0)))
+
+        actual = BlindDwtDctStackedEmbedder(1.0, create_indices_selector(7, 'compatible'), header=True).embed(
+            image, watermark
+        )
+
+        for i in range(3):
+            assert np.allclose(actual[..., i], expected[i])
+
+    def test_stacked_watermark_too_large(self):
+        # The largest watermark without a header leaves no room for the header
+        with pytest.raises(WatermarkSizeError) as _:
+            BlindDwtDctStackedEmbedder(1.0, create_indices_selector(7, 'compatible'), header=True).embed(
+                _image(), _watermark((16, 16, 3))
+            )
+
+    def test_stacked_extraction_without_header(self):
+        embedded = BlindDwtDctStackedEmbedder(1.0, create_indices_selector(7, 'compatible')).embed(
+            _image(), _watermark()
+        )
+
+        with pytest.raises(HeaderError) as _:
+            BlindDwtDctStackedExtractor(create_indices_selector(7, 'compatible'), header=True).extract(embedded, None)
+
+    def test_analysis(self):
+        watermark = _watermark()
+        embedded = BlindDwtDctStackedEmbedder(1.0, create_indices_selector(7, 'sparse'), header=True).embed(
+            _image(), watermark
+        )
+
+        analysis = CoefficientAnalysis(embedded, header=True)
+
+        assert analysis.read_header() == (4, 8)
+        assert np.array_equal(analysis.extract(create_indices_selector(7, 'sparse'), None), watermark)
+        assert not np.array_equal(analysis.extract(create_indices_selector(8, 'sparse'), None), watermark)
+
+    def test_analysis_without_header(self):
+        with pytest.raises(HeaderError, match='without a header') as _:
+            CoefficientAnalysis(_image()).read_header()
+
+    def test_command_line(self, tmp_path, monkeypatch):
+        watermark = _watermark()
+        array_to_image(str(tmp_path / 'image.png'), _image())
+        array_to_image(str(tmp_path / 'watermark.png'), watermark)
+
+        for args in [
+            ['-i', 'image.png', '-e', 'watermark.png', '-o', 'embedded.png', '-g', '10', '--header'],
+            ['-i', 'embedded.png', '-o', 'extracted.png', '--header'],
+        ]:
+            args = ['shadowmark'] + [str(tmp_path / arg) if arg.endswith('.png') else arg for arg in args]
+            monkeypatch.setattr(sys, 'argv', args)
+            monkeypatch.setattr(cli, 'argv', args)
+            cli.main()
+
+        assert np.array_equal(image_to_array(str(tmp_path / 'extracted.png')), watermark)
@@ -0,0 +1,174 @@
+import json
+import sys
+import threading
+import tracemalloc
+from time import sleep
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src import __main__ as cli
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+from src.profiling import span, add_listener, remove_listener, Profiler
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+from src.transformation import dct
+from src.transformation.dct import DctImplementation
+
+_EMBEDDING_STAGES = [
+    *(f'embed/{stage}' for stage in ['import', 'dwt', 'zigzag', 'dct', 'bits', 'selection', 'modulation',
+                                     'inverse_dct', 'inverse_zigzag', 'inverse_dwt']),
+    'embed'
+]
+_PREPARATION_TIME = 0.2
+
+
+class _SlowlyPreparedDct(DctImplementation):
+    """
+    The NumPy DCT with a preparation as slow as an import of a large module.
+    """
+
+    def prepare(self):
+        sleep(_PREPARATION_TIME)
+
+    def transform(self, vector, axis):
+        return dct.BACKENDS.get('numpy').transform(vector, axis)
+
+    def inverse(self, coefficients, axis):
+        return dct.BACKENDS.get('numpy').inverse(coefficients, axis)
+
+
+class TestProfiling:
+
+    def test_disabled_spans_are_shared(self):
+        assert span('dct') is span('dwt')
+
+        with span('dct'):
+            pass
+
+    def test_listener(self):
+        spans = []
+        add_listener(spans.append)
+
+        try:
+            with span('embed'):
+                with span('dct'):
+                    pass
+        finally:
+            remove_listener(spans.append)
+
+        assert [(record.name, record.path) for record in spans] == [('dct', 'embed/dct'), ('embed', 'embed')]
+        assert spans[1].elapsed >= spans[0].elapsed >= 0
+        assert span('dct') is span('dwt')
+
+    def test_remove_unknown_listener(self):
+        with pytest.raises(ValueError) as _:
+            remove_listener(print)
+
+    def test_allocated_memory(self):
+        with Profiler() as profiler:
+            with span('outer'):
+                with span('inner'):
+                    data = np.ones(1 << 20)
+                    del data
+
+                data = np.ones(1 << 18)
+                del data
+
+        inner, outer = profiler.spans
+
+        assert inner.allocated >= 8 << 20
+        assert outer.allocated >= inner.allocated
+        assert not tracemalloc.is_tracing()
+
+    def test_without_memory(self):
+        with Profiler(trace_memory=False) as profiler:
+            with span('dct'):
+                pass
+
+        assert profiler.spans[0].allocated is None
+
+    def test_spans_of_threads(self):
+        def run():
+            with span('worker'):
+                pass
+
+        with Profiler() as profiler:
+            threads = [threading.Thread(target=run) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert profiler.report()['stages']['worker']['count'] == 4
+
+    def test_embedding_stages(self):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        watermark = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+
+        with Profiler() as profiler:
+            BlindDwtDctStackedEmbedder(1.0, PermutationIndicesSelector(0)).embed(image, watermark)
+
+        report = profiler.report()
+
+        assert list(report['stages']) == _EMBEDDING_STAGES
+        assert report['elapsed'] >= report['stages']['embed']['elapsed']
+        assert report['stages']['embed']['elapsed'] >= sum(
+            stage['elapsed'] for path, stage in report['stages'].items() if path != 'embed'
+        )
+        assert all(record['start'] >= 0 for record in report['spans'])
+
+    def test_embedding_and_extraction_stages(self):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        watermark = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+
+        with Profiler() as profiler:
+            embedded = BlindDwtDctStackedEmbedder(1.0, PermutationIndicesSelector(0)).embed(image, watermark)
+            BlindDwtDctStackedExtractor(PermutationIndicesSelector(0)).extract(embedded, (4, 4))
+
+        stages = profiler.report()['stages']
+
+        assert stages['embed/dct']['count'] == stages['extract/dct']['count'] == 1
+        assert 'dct' not in stages
+
+    def test_preparation_is_not_attributed_to_stages(self):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+        watermark = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+        selected = dct.BACKENDS.selected
+        dct.BACKENDS.register('slowly_prepared', _SlowlyPreparedDct())
+        dct.BACKENDS.select('slowly_prepared')
+
+        try:
+            with Profiler() as profiler:
+                BlindDwtDctStackedEmbedder(1.0, PermutationIndicesSelector(0)).embed(image, watermark)
+        finally:
+            dct.BACKENDS.select(selected)
+            dct.BACKENDS.unregister('slowly_prepared')
+
+        stages = profiler.report()['stages']
+
+        assert stages['embed/import']['elapsed'] >= _PREPARATION_TIME
+        assert stages['embed/dct']['elapsed'] < _PREPARATION_TIME
+
+    def test_profile_option(self, tmp_path, monkeypatch):
+        image = str(tmp_path / 'image.png')
+        watermark = str(tmp_path / 'watermark.png')
+        profile = str(tmp_path / 'profile.json')
+        Image.fromarray(np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)).save(image)
+        Image.fromarray(np.random.default_rng(1).integers(0, 256, (4, 4, 3), dtype=np.uint8)).save(watermark)
+
+        args = ['shadowmark', '-i', image, '-e', watermark, '-o', str(tmp_path / 'output.png'), '--profile', profile]
+        monkeypatch.setattr(sys, 'argv', args)
+        monkeypatch.setattr(cli, 'argv', args)
+        cli.main()
+
+        with open(profile, encoding='utf-8') as file:
+            report = json.load(file)
+
+        assert list(report['stages']) == ['image.decode', *_EMBEDDING_STAGES, 'image.encode']
+        assert report['stages']['image.decode']['count'] == 2
+        assert report['arguments']['profile'] == profile
@@ -0,0 +1,87 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src import server as server_module
+from src.client import WatermarkClient, EXTRACT_PATH
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.exceptions import ServerError
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+from src.server import WatermarkServer
+from src.transformation.image import decode_image_array, encode_image_array
+
+
+@pytest.fixture(scope='module')
+def client():
+    """
+    A client of a server shared by the tests of the module, so that its caches stay warm between them.
+    """
+    server = WatermarkServer(('127.0.0.1', 0), 2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield WatermarkClient(f'http://127.0.0.1:{server.server_port}')
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+class TestWatermarkServer:
+
+    @pytest.fixture
+    def parameters(self):
+        return {'seed': 42, 'channels': 'rgb', 'selection': 'compatible', 'precision': 'float64', 'format': 'png'}
+
+    @pytest.fixture
+    def image(self):
+        return np.random.default_rng(0).integers(64, 192, (40, 48, 3), dtype=np.uint8)
+
+    @pytest.fixture
+    def watermark(self):
+        return np.random.default_rng(1).integers(0, 256, (4, 4, 3), dtype=np.uint8)
+
+    def test_embedding(self, client, parameters, image, watermark):
+        actual = client.embed(encode_image_array(image, 'png'), encode_image_array(watermark, 'png'),
+                              {**parameters, 'gain': 2.0})
+
+        expected = BlindDwtDctStackedEmbedder(2.0, PermutationIndicesSelector(42)).embed(image, watermark)
+        assert np.array_equal(decode_image_array(actual), expected.clip(0, 255).astype(np.uint8))
+
+    def test_round_trip(self, client, parameters, image, watermark):
+        embedded = client.embed(encode_image_array(image, 'png'), encode_image_array(watermark, 'png'),
+                                {**parameters, 'gain': 4.0})
+
+        # Repeated requests are served from the warm caches with the same result
+        for _ in range(2):
+            actual = client.extract(embedded, {**parameters, 'shape': '4x4'})
+            assert np.array_equal(decode_image_array(actual), watermark)
+
+    @pytest.mark.parametrize('parameter, value', [
+        ('seed', 'abc'), ('selection', 'unknown'), ('precision', 'float16'), ('format', 'foo'), ('shape', '4')
+    ])
+    def test_invalid_parameter(self, client, parameters, image, parameter, value):
+        with pytest.raises(ServerError) as _:
+            client.extract(encode_image_array(image, 'png'), {**parameters, 'shape': '4x4', parameter: value})
+
+    def test_missing_parameter(self, client, parameters, image):
+        with pytest.raises(ServerError, match='Missing parameter shape') as _:
+            client.extract(encode_image_array(image, 'png'), parameters)
+
+    def test_invalid_image(self, client, parameters):
+        with pytest.raises(ServerError, match='Cannot decode image') as _:
+            client.extract(b'not an image', {**parameters, 'shape': '4x4'})
+
+    def test_too_large_watermark(self, client, parameters, image):
+        with pytest.raises(ServerError, match='too large') as _:
+            client.embed(encode_image_array(image, 'png'), encode_image_array(image, 'png'), {**parameters, 'gain': 1})
+
+    def test_unexpected_error(self, client, parameters, image, monkeypatch):
+        def fail(*_):
+            raise KeyError('unexpected')
+
+        monkeypatch.setitem(server_module._OPERATIONS, EXTRACT_PATH, fail)
+
+        with pytest.raises(ServerError, match='Internal server error') as _:
+            client.extract(encode_image_array(image, 'png'), {**parameters, 'shape': '4x4'})
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Time budgets in seconds for running the command line tool in a fresh interpreter, excluding the interpreter startup
+_HELP_BUDGET = 0.5
+_RUN_BUDGET = 2.0
+
+_RUNS = 3
+_BACKENDS = ('numpy', 'scipy', 'pywt', 'PIL')
+
+_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from src.__main__ import main
+sys.argv = ['shadowmark'] + sys.argv[1:]
+try:
+    main()
+except SystemExit:
+    pass
+print(json.dumps({'elapsed': time.perf_counter() - start, 'modules': sorted(sys.modules)}), file=sys.stderr)
+"""
+
+
+def _run(args: list[str]) -> tuple[float, set[str]]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+
+    for _ in range(_RUNS):
+        process = subprocess.run(
+            [sys.executable, '-c', _SCRIPT, *args], cwd=root, capture_output=True, text=True, check=True
+        )
+        results.append(json.loads(process.stderr.splitlines()[-1]))
+
+    modules = {module.split('.')[0] for module in results[0]['modules']}
+    return min(result['elapsed'] for result in results), modules
+
+
+class TestStartup:
+
+    @pytest.fixture
+    def image(self, tmp_path):
+        path = str(tmp_path / 'image.png')
+        Image.fromarray(np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)).save(path)
+        return path
+
+    @pytest.fixture
+    def watermark(self, tmp_path):
+        path = str(tmp_path / 'watermark.png')
+        Image.fromarray(np.random.default_rng(1).integers(0, 256, (4, 4, 3), dtype=np.uint8)).save(path)
+        return path
+
+    @pytest.mark.parametrize('args', [
+        ['--help'],
+        ['batch', '--help'],
+        ['serve', '--help'],
+        ['client', '--help'],
+        ['--image', 'image.png', '--output', 'output.png', '--threads', '2'],
+        ['--image', 'image.png', '--output', 'output.png', '--extract', '32'],
+    ])
+    def test_help_and_validation(self, args):
+        elapsed, modules = _run(args)
+
+        assert modules.isdisjoint(_BACKENDS)
+        assert elapsed < _HELP_BUDGET
+
+    def test_embedding(self, image, watermark, tmp_path):
+        output = str(tmp_path / 'embedded.png')
+
+        elapsed, modules = _run(['--image', image, '--embed', watermark, '--output', output, '--extract', '4x4'])
+
+        assert os.path.isfile(output)
+        assert 'pywt' not in modules
+        assert elapsed < _RUN_BUDGET
+
+    def test_extraction(self, image, tmp_path):
+        output = str(tmp_path / 'extracted.png')
+
+        elapsed, modules = _run(['--image', image, '--output', output, '--extract', '4x4'])
+
+        assert os.path.isfile(output)
+        assert 'pywt' not in modules
+        assert elapsed < _RUN_BUDGET
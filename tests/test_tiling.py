@@ -0,0 +1,24 @@
+import pytest
+
+from src.tiling import tiles
+
+
+class TestTiling:
+
+    @pytest.mark.parametrize('shape, tile_size, expected_rows, expected_cols', [
+        ((100, 100), 100, [(0, 100)], [(0, 100)]),
+        ((50, 30, 3), 100, [(0, 50)], [(0, 30)]),
+        ((100, 250), 100, [(0, 100)], [(0, 125), (125, 250)]),
+        ((299, 100), 100, [(0, 149), (149, 299)], [(0, 100)]),
+        ((300, 100), 100, [(0, 100), (100, 200), (200, 300)], [(0, 100)]),
+    ])
+    def test_tiles(self, shape, tile_size, expected_rows, expected_cols):
+        actual = tiles(shape, tile_size)
+
+        expected = [(rows, cols) for rows in expected_rows for cols in expected_cols]
+        assert [((r.start, r.stop), (c.start, c.stop)) for r, c in actual] == expected
+
+    @pytest.mark.parametrize('tile_size', [0, -1])
+    def test_invalid_tile_size(self, tile_size):
+        with pytest.raises(ValueError) as _:
+            tiles((10, 10), tile_size)
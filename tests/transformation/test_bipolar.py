@@ -1,4 +1,17 @@
-from src.transformation.bipolar import vector_to_bipolar_bits, bipolar_bits_to_vector
+import numpy as np
+import pytest
+
+from src.transformation.bipolar import vector_to_bipolar_bits, bipolar_bits_to_vector, bytes_to_bipolar_bits, \
+    bipolar_bits_to_bytes
+
+_bytes = [0, 2, 4, 8, 255]
+_bipolar_bits = [
+    -1, -1, -1, -1, -1, -1, -1, -1,
+    -1, -1, -1, -1, -1, -1, 1, -1,
+    -1, -1, -1, -1, -1, 1, -1, -1,
+    -1, -1, -1, -1, 1, -1, -1, -1,
+    1, 1, 1, 1, 1, 1, 1, 1
+]
 
 
 class TestBipolar:
@@ -28,3 +41,36 @@ class TestBipolar:
             1, 1, 1, 1, 1, 1, 1, 1
         ]
         assert bipolar_bits_to_vector(bipolar_bits) == [0, 2, 4, 8, 255]
+
+    @pytest.mark.parametrize('data', [
+        np.array(_bytes, dtype=np.uint8),
+        np.array(_bytes, dtype=np.uint8).reshape(1, 5),
+        bytes(_bytes),
+        memoryview(bytes(_bytes)),
+        _bytes
+    ])
+    def test_bytes_to_bits(self, data):
+        actual = bytes_to_bipolar_bits(data)
+
+        assert isinstance(actual, np.ndarray)
+        assert np.array_equal(actual, _bipolar_bits)
+
+    def test_bytes_to_bits_empty(self):
+        assert bytes_to_bipolar_bits(b'').size == 0
+
+    def test_bits_to_bytes(self):
+        actual = bipolar_bits_to_bytes(np.array(_bipolar_bits, dtype=np.int8))
+
+        assert actual.dtype == np.uint8
+        assert np.array_equal(actual, _bytes)
+
+    def test_bits_to_bytes_empty(self):
+        assert bipolar_bits_to_bytes(np.empty(0, dtype=np.int8)).size == 0
+
+    def test_codec_matches_list_conversion(self):
+        values = np.random.default_rng(0).integers(0, 256, 1024, dtype=np.uint8)
+
+        bits = bytes_to_bipolar_bits(values)
+
+        assert bits.tolist() == vector_to_bipolar_bits(values.tolist())
+        assert bipolar_bits_to_bytes(bits).tolist() == bipolar_bits_to_vector(bits.tolist())
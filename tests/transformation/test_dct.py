@@ -1,6 +1,8 @@
 import numpy as np
+import pytest
 
-from src.transformation.dct import inverse, transform
+from src.transformation import dct
+from src.transformation.dct import inverse, transform, transform_difference
 
 
 class TestDct:
@@ -10,4 +12,37 @@ class TestDct:
         actual = inverse(transform(expected))
 
         # Uses uint8 due to floating-point rounding errors
-        assert np.array_equal(actual.astype(np.uint8), expected)
\ No newline at end of file
+        assert np.array_equal(actual.astype(np.uint8), expected)
+
+    @pytest.mark.parametrize('size', [1, 2, 9, 1000])
+    @pytest.mark.parametrize('dtype', [np.float64, np.float32, np.uint8])
+    def test_numpy_backend(self, size, dtype):
+        vector = (np.random.default_rng(0).random((3, size)) * 255).astype(dtype)
+        scipy, numpy = dct.BACKENDS.get('scipy'), dct.BACKENDS.get('numpy')
+
+        for expected, actual in [
+            (scipy.transform(vector, 1), numpy.transform(vector, 1)),
+            (scipy.inverse(vector, 1), numpy.inverse(vector, 1)),
+        ]:
+            assert actual.dtype == expected.dtype
+            assert np.allclose(actual, expected, rtol=1e-4, atol=1e-3)
+
+    def test_stacked_vectors(self):
+        stacked = np.random.default_rng(0).random((9, 3))
+
+        actual = transform(stacked)
+
+        for i in range(3):
+            assert np.allclose(actual[:, i], transform(stacked[:, i]))
+
+        assert np.allclose(inverse(actual), stacked)
+
+    @pytest.mark.parametrize('size1, size2', [(10, 10), (11, 10)])
+    def test_transform_difference(self, size1, size2):
+        rng = np.random.default_rng(0)
+        vector1 = rng.random((size1, 3))
+        vector2 = rng.random((size2, 3))
+
+        expected = transform(vector1)[:size2] - transform(vector2)
+
+        assert np.allclose(transform_difference(vector1, vector2), expected)
@@ -1,13 +1,110 @@
+import sys
+
 import numpy as np
+import pytest
+
+from src.transformation.dwt import first_level, first_level_inverse, first_level_approximation, \
+    add_approximation_delta, DwtBackend
 
-from src.transformation.dwt import first_level, first_level_inverse
+_shapes = [(1, 1), (1, 6), (6, 1), (5, 7), (8, 8), (7, 4, 3)]
 
 
 class TestDwt:
 
-    def test_consistency(self):
+    @pytest.mark.parametrize('backend', list(DwtBackend))
+    def test_consistency(self, backend):
         expected = np.array([[0, 1, 2, 4], [8, 16, 32, 64]])
-        actual = first_level_inverse(*first_level(expected))
+        actual = first_level_inverse(*first_level(expected, backend), backend=backend)
 
         # Uses uint8 due to floating-point rounding errors
-        assert np.array_equal(actual.astype(np.uint8), expected)
\ No newline at end of file
+        assert np.array_equal(actual.astype(np.uint8), expected)
+
+    @pytest.mark.parametrize('dtype', [np.uint8, np.int64, np.float32, np.float64])
+    @pytest.mark.parametrize('shape', _shapes)
+    def test_haar_matches_pywt(self, shape, dtype):
+        data = (np.random.default_rng(0).random(shape) * 255).astype(dtype)
+
+        expected = first_level(data, DwtBackend.PYWT)
+        actual = first_level(data, DwtBackend.HAAR)
+
+        for a, e in zip(actual, expected):
+            assert a.shape == e.shape
+            assert a.dtype == e.dtype
+            assert np.allclose(a, e, rtol=1e-5, atol=1e-3)
+
+        expected_inverse = first_level_inverse(*expected, backend=DwtBackend.PYWT)
+        actual_inverse = first_level_inverse(*actual, backend=DwtBackend.HAAR)
+
+        assert actual_inverse.shape == expected_inverse.shape
+        assert actual_inverse.dtype == expected_inverse.dtype
+        assert np.allclose(actual_inverse, expected_inverse, rtol=1e-5, atol=1e-3)
+
+    @pytest.mark.parametrize('backend', list(DwtBackend))
+    def test_output_buffers(self, backend):
+        data = np.random.default_rng(0).integers(0, 256, (5, 7, 3), dtype=np.uint8)
+        expected = first_level(data, backend)
+        out = tuple(np.empty_like(band) for band in expected)
+
+        actual = first_level(data, backend, out)
+
+        assert all(a is o for a, o in zip(actual, out))
+        assert all(np.allclose(a, e) for a, e in zip(actual, expected))
+
+        inverse_out = np.empty((6, 8, 3))
+        actual_inverse = first_level_inverse(*actual, backend=backend, out=inverse_out)
+
+        assert actual_inverse is inverse_out
+        assert np.allclose(actual_inverse[:5, :7], data)
+
+    def test_haar_without_pywt(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'pywt', None)
+        data = np.random.default_rng(0).random((5, 7))
+
+        assert np.allclose(first_level_inverse(*first_level(data))[:5, :7], data)
+
+        with pytest.raises(ImportError) as _:
+            first_level(data, DwtBackend.PYWT)
+
+    def test_stacked_channels(self):
+        stacked = np.random.default_rng(0).random((5, 7, 3))
+
+        actual = first_level(stacked)
+
+        for i in range(3):
+            for a, e in zip(actual, first_level(stacked[..., i])):
+                assert np.allclose(a[..., i], e)
+
+        assert np.allclose(first_level_inverse(*actual)[:5, :7], stacked)
+
+    @pytest.mark.parametrize('backend', list(DwtBackend))
+    @pytest.mark.parametrize('shape', _shapes)
+    def test_approximation_matches_first_level(self, shape, backend):
+        data = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+        expected, _, _, _ = first_level(data, DwtBackend.PYWT)
+        actual = first_level_approximation(data, backend)
+
+        assert actual.shape == expected.shape
+        assert np.allclose(actual, expected)
+
+    @pytest.mark.parametrize('backend', list(DwtBackend))
+    def test_approximation_dtype(self, backend):
+        data = np.random.default_rng(0).integers(0, 256, (5, 7), dtype=np.uint8)
+
+        actual = first_level_approximation(data, backend, np.float32)
+
+        assert actual.dtype == np.float32
+        assert np.allclose(actual, first_level_approximation(data, backend))
+
+    @pytest.mark.parametrize('shape', _shapes)
+    def test_approximation_delta_matches_inverse(self, shape):
+        rng = np.random.default_rng(0)
+        data = rng.integers(0, 256, shape).astype(np.float64)
+
+        ll, hl, lh, hh = first_level(data)
+        ll_delta = rng.random(ll.shape)
+        expected = first_level_inverse(ll + ll_delta, hl, lh, hh)[:shape[0], :shape[1]]
+
+        add_approximation_delta(data, ll_delta)
+
+        assert np.allclose(data, expected)
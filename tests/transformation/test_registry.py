@@ -0,0 +1,59 @@
+import pytest
+
+from src.transformation.dwt import DwtBackend
+from src.transformation.registry import Registry
+
+
+class TestRegistry:
+
+    @pytest.fixture
+    def registry(self):
+        registry = Registry('stage', reference='slow')
+        registry.register('fast', 'fast backend')
+        registry.register('slow', 'slow backend')
+        return registry
+
+    def test_first_registered_selected(self, registry):
+        assert registry.selected == 'fast'
+        assert registry.get() == 'fast backend'
+        assert registry.names() == ['fast', 'slow']
+
+    def test_select(self, registry):
+        registry.select('slow')
+
+        assert registry.selected == 'slow'
+        assert registry.get() == 'slow backend'
+        assert registry.get('fast') == 'fast backend'
+
+    def test_tunable_names(self, registry):
+        registry.register('reference', 'reference backend', tunable=False)
+
+        assert registry.default == 'fast'
+        assert registry.tunable_names() == ['fast', 'slow']
+        assert registry.names() == ['fast', 'slow', 'reference']
+
+    def test_duplicate_name(self, registry):
+        with pytest.raises(ValueError) as _:
+            registry.register('fast', 'another backend')
+
+    def test_unknown_name(self, registry):
+        with pytest.raises(ValueError) as _:
+            registry.get('unknown')
+
+        with pytest.raises(ValueError) as _:
+            registry.select('unknown')
+
+        assert registry.selected == 'fast'
+
+    def test_unregister_selected(self, registry):
+        registry.unregister('fast')
+
+        assert registry.names() == ['slow']
+        assert registry.get() == 'slow backend'
+
+    def test_enum_names(self):
+        registry = Registry('dwt', reference=DwtBackend.PYWT)
+        registry.register(DwtBackend.HAAR, 'haar backend')
+
+        assert registry.reference == 'pywt'
+        assert registry.get('haar') == registry.get(DwtBackend.HAAR) == 'haar backend'
@@ -0,0 +1,173 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.embedding.blind_dwt_dct_stacked_embedder import BlindDwtDctStackedEmbedder
+from src.extraction.blind_dwt_dct_stacked_extractor import BlindDwtDctStackedExtractor
+from src.randomization.permutation_indices_selector import PermutationIndicesSelector
+from src.transformation import bipolar, dct, dwt, tuning, zigzag
+from src.transformation.dct import DctImplementation
+from src.transformation.image import image_to_array
+
+_MEDIA = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'blob', 'media')
+_REGISTRIES = (dwt.BACKENDS, zigzag.BACKENDS, dct.BACKENDS, bipolar.BACKENDS)
+
+
+class _ScaledDct(DctImplementation):
+    """
+    A fast DCT that does not conform to the reference.
+    """
+
+    def transform(self, vector, axis):
+        return np.asarray(vector, dtype=np.float64) * 2
+
+    def inverse(self, coefficients, axis):
+        return np.asarray(coefficients, dtype=np.float64) / 2
+
+
+class _UnavailableDct(DctImplementation):
+
+    def transform(self, vector, axis):
+        raise ImportError('No module named fancy_dct')
+
+    def inverse(self, coefficients, axis):
+        raise ImportError('No module named fancy_dct')
+
+
+class TestTuning:
+
+    @pytest.fixture(autouse=True)
+    def restore_selection(self):
+        selected = [registry.selected for registry in _REGISTRIES]
+        yield
+        for registry, name in zip(_REGISTRIES, selected):
+            registry.select(name)
+
+    @pytest.fixture
+    def registered(self):
+        """
+        Registers the given DCT backends for a single test.
+        """
+        names = []
+
+        def register(name, backend):
+            dct.BACKENDS.register(name, backend)
+            names.append(name)
+
+        yield register
+
+        for name in names:
+            dct.BACKENDS.unregister(name)
+
+    def test_samples_conform(self):
+        images = [image_to_array(path) for path in sorted(glob.glob(os.path.join(_MEDIA, '*')))]
+
+        results = tuning.check_conformance(images)
+
+        assert images
+        assert {(result.stage, result.backend) for result in results} == {
+            (registry.stage, name) for registry in _REGISTRIES for name in registry.names()
+        }
+        assert [result for result in results if result.error is not None] == []
+
+    def test_nonconforming_backend(self, registered):
+        registered('scaled', _ScaledDct())
+        image = np.random.default_rng(0).integers(0, 256, (16, 16, 3), dtype=np.uint8)
+
+        errors = {result.backend: result.error for result in tuning.check_conformance([image]) if result.stage == 'dct'}
+
+        assert errors['scipy'] is None
+        assert errors['numpy'] is None
+        assert 'Relative error' in errors['scaled']
+        assert tuning.autotune((16, 16, 3), repeat=1)['dct'] != 'scaled'
+
+    def test_unavailable_backend(self, registered):
+        registered('unavailable', _UnavailableDct())
+        image = np.random.default_rng(0).integers(0, 256, (16, 16, 3), dtype=np.uint8)
+
+        errors = {result.backend: result.error for result in tuning.check_conformance([image]) if result.stage == 'dct'}
+
+        assert 'fancy_dct' in errors['unavailable']
+        assert tuning.autotune((16, 16, 3), repeat=1)['dct'] in ('scipy', 'numpy')
+
+    def test_autotune_chooses_registered_backends(self):
+        choices = tuning.autotune((33, 20), repeat=1)
+
+        assert set(choices) == {registry.stage for registry in _REGISTRIES}
+        for registry in _REGISTRIES:
+            assert choices[registry.stage] in registry.names()
+
+    def test_tuned_backends_persisted(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'cache' / 'backends.json')
+
+        choices = tuning.tuned_backends((64, 64, 3), path, repeat=1)
+
+        with open(path, encoding='utf-8') as file:
+            assert json.load(file) == {'64x64x3': choices}
+
+        for registry in _REGISTRIES:
+            assert registry.selected == choices[registry.stage]
+
+        def autotune(*_):
+            raise AssertionError('Persisted choices must not be tuned again')
+
+        monkeypatch.setattr(tuning, 'autotune', autotune)
+
+        assert tuning.tuned_backends((64, 64, 3), path) == choices
+
+    def test_reference_only_backends_not_chosen(self, tmp_path):
+        # Warm walks through the zigzag may win by noise, but every new process pays the cold walk
+        path = str(tmp_path / 'backends.json')
+
+        tuning.tuned_backends((3000, 4000, 3), path, repeat=1)
+
+        choices = tuning.load_choices(path)['3000x4000x3']
+        assert choices['zigzag'] != 'walk'
+        assert choices['bits'] != 'list'
+
+    def test_tuned_again_if_backend_is_not_registered(self, tmp_path):
+        path = str(tmp_path / 'backends.json')
+
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'64x64x3': {'dwt': 'haar', 'zigzag': 'plan', 'dct': 'removed', 'bits': 'numpy'}}, file)
+
+        choices = tuning.tuned_backends((64, 64, 3), path, repeat=1)
+
+        assert choices['dct'] in dct.BACKENDS.names()
+        assert tuning.load_choices(path) == {'64x64x3': choices}
+
+    def test_corrupted_choices(self, tmp_path):
+        path = str(tmp_path / 'backends.json')
+
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('{"64x64x3": ')
+
+        assert tuning.load_choices(path) == {}
+
+    def test_select_backends(self):
+        tuning.select_backends({'dct': 'numpy', 'bits': 'list'})
+
+        assert dct.BACKENDS.selected == 'numpy'
+        assert bipolar.BACKENDS.selected == 'list'
+
+        with pytest.raises(ValueError) as _:
+            tuning.select_backends({'dct': 'unknown'})
+
+    def test_watermarking_with_alternative_backends(self):
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (64, 48, 3), dtype=np.uint8)
+        watermark = rng.integers(0, 256, (4, 4, 3), dtype=np.uint8)
+
+        def run():
+            embedded = BlindDwtDctStackedEmbedder(1.0, PermutationIndicesSelector(1)).embed(image, watermark)
+            return embedded, BlindDwtDctStackedExtractor(PermutationIndicesSelector(1)).extract(embedded, (4, 4))
+
+        expected_embedded, expected_extracted = run()
+        tuning.select_backends({'dwt': 'pywt', 'zigzag': 'walk', 'dct': 'numpy', 'bits': 'list'})
+        actual_embedded, actual_extracted = run()
+
+        assert np.allclose(actual_embedded, expected_embedded)
+        assert np.array_equal(actual_extracted, expected_extracted)
@@ -1,7 +1,7 @@
 import numpy as np
 import pytest
 
-from src.transformation.zigzag import scan, inverse
+from src.transformation.zigzag import scan, inverse, _plan
 
 test_data = [
     (
@@ -117,3 +117,38 @@ class TestZigzag:
 
         assert np.array_equal(actual_vector, expected_vector)
         assert np.array_equal(actual_matrix, expected_matrix)
+
+    def test_plan_cached_per_shape(self):
+        _plan.cache_clear()
+
+        scan(np.zeros((6, 10)))
+        inverse(np.zeros(60), (6, 10))
+        scan(np.zeros((10, 6)))
+
+        assert _plan.cache_info().hits == 1
+        assert _plan.cache_info().misses == 2
+        assert not _plan(6, 10).flags.writeable
+
+    def test_scan_preserves_values_of_large_matrix(self):
+        matrix = np.random.default_rng(0).random((33, 57))
+
+        actual_vector = scan(matrix)
+
+        assert np.array_equal(np.sort(actual_vector), np.sort(matrix.ravel()))
+        assert np.array_equal(inverse(actual_vector, matrix.shape), matrix)
+
+    @pytest.mark.parametrize('matrix, expected', test_data[:-1])
+    def test_stacked_matrices(self, matrix, expected):
+        stacked = np.dstack([np.array(matrix), np.array(matrix) * 2])
+
+        actual_vector = scan(stacked)
+        actual_matrix = inverse(actual_vector, stacked.shape)
+
+        assert np.array_equal(actual_vector, np.stack([expected, np.array(expected) * 2], axis=1))
+        assert np.array_equal(actual_matrix, stacked)
+
+    def test_inverse_dtype(self):
+        actual = inverse(np.arange(6, dtype=np.float32), (2, 3), np.float32)
+
+        assert actual.dtype == np.float32
+        assert np.array_equal(actual, [[0, 1, 4], [2, 3, 5]])